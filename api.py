@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+api.py - API HTTP/JSON do FiadoFácil para caixas (PDV)
+=======================================================
+
+Servidor sem interface gráfica, para que o PDV (leitor de código de barras,
+outros caixas da rede local) consulte clientes e registre compras e
+pagamentos direto no banco, pelas mesmas funções do database.py.
+
+O servidor usa asyncio (um único laço atende todas as conexões, com
+keep-alive). O acesso ao banco roda em um conjunto fixo de threads, cada
+uma com a própria conexão SQLite (get_conexao), que funciona como pool de
+conexões. No máximo "max_requisicoes" requisições ficam em andamento ao
+mesmo tempo; as excedentes recebem 503 na hora, para o caixa tentar de
+novo, em vez de acumular espera.
+
+Iniciado por main.py:
+    python main.py --api
+    python main.py --api --host 0.0.0.0 --porta 8765
+
+Rotas:
+    GET  /clientes?busca=ana&devedores=1   Busca clientes (com saldo)
+    GET  /clientes/<id>                    Dados e saldo de um cliente
+    GET  /clientes/<id>/saldo              Somente o saldo
+    POST /clientes/<id>/compras            {"descricao": "...", "valor": 12.5}
+                                           (402 se passar do limite; reenviar
+                                           com "liberar_excesso": true)
+    POST /clientes/<id>/pagamentos         {"valor": 10, "observacao": "..."}
+    GET  /estatisticas                     Estatísticas gerais
+    GET  /resumos/diario                   Resumo por dia (?inicio=...&fim=...)
+    GET  /resumos/mensal                   Resumo por mês
+"""
+
+import asyncio
+import json
+import re
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import InvalidOperation
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import database as db
+from config import get_config_api
+
+# Maior corpo aceito em uma requisição (compras e pagamentos são pequenos)
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+
+# Maior valor aceito em uma compra ou pagamento, em reais (valores maiores
+# são erro de digitação ou do leitor, e somados estourariam o INTEGER do SQLite)
+VALOR_MAXIMO = 1_000_000
+
+# Tempo máximo sem receber uma requisição em uma conexão keep-alive
+TEMPO_OCIOSO_S = 30
+
+# Espera máxima pelas threads do pool ao fechar as conexões delas
+TEMPO_ENCERRAMENTO_S = 5
+
+
+class ErroAPI(Exception):
+    """Erro devolvido ao cliente da API com o status HTTP correspondente."""
+    
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# ==================== ROTAS ====================
+# Cada rota roda em uma thread do pool, com a conexão daquela thread.
+
+def ler_cliente_ativo(cliente_id):
+    """Retorna o cliente ativo ou gera 404."""
+    cliente = db.buscar_cliente_por_id(cliente_id)
+    if cliente is None or not cliente['ativo']:
+        raise ErroAPI(HTTPStatus.NOT_FOUND, f"Cliente não encontrado: {cliente_id}")
+    return cliente
+
+def ler_valor(dados, campo='valor'):
+    """Lê um valor em reais positivo do corpo JSON."""
+    valor = dados.get(campo)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise ErroAPI(HTTPStatus.BAD_REQUEST, f"Campo '{campo}' obrigatório (número em reais)")
+    
+    try:
+        centavos = db.para_centavos(valor)
+    except (InvalidOperation, ValueError):
+        raise ErroAPI(HTTPStatus.BAD_REQUEST, f"Valor inválido: {valor}")
+    
+    if centavos <= 0:
+        raise ErroAPI(HTTPStatus.BAD_REQUEST, "O valor deve ser maior que zero")
+    if centavos > db.para_centavos(VALOR_MAXIMO):
+        raise ErroAPI(HTTPStatus.BAD_REQUEST, f"Valor acima do máximo aceito ({VALOR_MAXIMO}): {valor}")
+    return db.para_reais(centavos)
+
+def rota_buscar_clientes(consulta, dados):
+    """GET /clientes: busca clientes por nome ou telefone, com o saldo de cada um."""
+    termo = consulta.get('busca', [''])[0].strip()
+    somente_devedores = consulta.get('devedores', ['0'])[0] in ('1', 'true')
+    ordem = 'relevancia' if termo else 'nome'
+    
+    clientes = db.buscar_clientes_com_saldo(termo, somente_devedores, ordem)
+    return HTTPStatus.OK, {'clientes': [dict(cliente) for cliente in clientes]}
+
+def rota_cliente(consulta, dados, cliente_id):
+    """GET /clientes/<id>: dados e saldo de um cliente ativo."""
+    cliente = ler_cliente_ativo(cliente_id)
+    return HTTPStatus.OK, {**dict(cliente), 'saldo': db.calcular_saldo_cliente(cliente_id)}
+
+def rota_saldo(consulta, dados, cliente_id):
+    """GET /clientes/<id>/saldo: somente o saldo de um cliente ativo."""
+    ler_cliente_ativo(cliente_id)
+    return HTTPStatus.OK, {'cliente_id': cliente_id, 'saldo': db.calcular_saldo_cliente(cliente_id)}
+
+# Status HTTP de cada resultado da autorização de compra
+STATUS_AUTORIZACAO = {
+    db.AUTORIZACAO_APROVADA: HTTPStatus.CREATED,
+    db.AUTORIZACAO_REQUER_LIBERACAO: HTTPStatus.PAYMENT_REQUIRED,
+    db.AUTORIZACAO_NEGADA: HTTPStatus.NOT_FOUND,
+}
+
+def rota_registrar_compra(consulta, dados, cliente_id):
+    """POST /clientes/<id>/compras: registra uma compra fiada, respeitando o limite."""
+    descricao = str(dados.get('descricao') or '').strip()
+    if not descricao:
+        raise ErroAPI(HTTPStatus.BAD_REQUEST, "Campo 'descricao' obrigatório")
+    valor = ler_valor(dados)
+    
+    # Limite e registro em uma única transação (ver autorizar_e_registrar_compra)
+    autorizacao = db.autorizar_e_registrar_compra(
+        cliente_id, valor, descricao, bool(dados.get('liberar_excesso'))
+    )
+    
+    return STATUS_AUTORIZACAO[autorizacao['resultado']], {
+        'id': autorizacao['transacao_id'],
+        'cliente_id': cliente_id,
+        'valor': valor,
+        **autorizacao
+    }
+
+def rota_registrar_pagamento(consulta, dados, cliente_id):
+    """POST /clientes/<id>/pagamentos: registra um pagamento e devolve o novo saldo."""
+    valor = ler_valor(dados)
+    observacao = str(dados.get('observacao') or '').strip()
+    
+    ler_cliente_ativo(cliente_id)
+    pagamento_id = db.adicionar_pagamento(cliente_id, valor, observacao)
+    
+    return HTTPStatus.CREATED, {
+        'id': pagamento_id,
+        'cliente_id': cliente_id,
+        'valor': valor,
+        'saldo': db.calcular_saldo_cliente(cliente_id)
+    }
+
+def rota_estatisticas(consulta, dados):
+    """GET /estatisticas: totais gerais (clientes, dívidas, pagamentos e devedores)."""
+    return HTTPStatus.OK, db.obter_estatisticas()
+
+def rota_resumo(consulta, dados, tabela):
+    """GET /resumos/diario ou /resumos/mensal: resumo por período, entre inicio e fim."""
+    inicio = consulta.get('inicio', [None])[0]
+    fim = consulta.get('fim', [None])[0]
+    
+    linhas = db.buscar_resumo(f'resumo_{tabela}', inicio, fim)
+    return HTTPStatus.OK, {'resumo': [dict(linha) for linha in linhas]}
+
+# (método, caminho) -> função; grupos do caminho viram argumentos (os numéricos, int)
+ROTAS = [
+    ('GET', re.compile(r'/clientes'), rota_buscar_clientes),
+    ('GET', re.compile(r'/clientes/(\d+)'), rota_cliente),
+    ('GET', re.compile(r'/clientes/(\d+)/saldo'), rota_saldo),
+    ('POST', re.compile(r'/clientes/(\d+)/compras'), rota_registrar_compra),
+    ('POST', re.compile(r'/clientes/(\d+)/pagamentos'), rota_registrar_pagamento),
+    ('GET', re.compile(r'/estatisticas'), rota_estatisticas),
+    ('GET', re.compile(r'/resumos/(diario|mensal)'), rota_resumo),
+]
+
+def encontrar_rota(metodo, caminho):
+    """Retorna (função, argumentos) da rota, ou gera 404/405."""
+    metodo_invalido = False
+    
+    for metodo_rota, padrao, funcao in ROTAS:
+        encontrado = padrao.fullmatch(caminho.rstrip('/') or '/')
+        if not encontrado:
+            continue
+        if metodo_rota != metodo:
+            metodo_invalido = True
+            continue
+        return funcao, [int(grupo) if grupo.isdigit() else grupo for grupo in encontrado.groups()]
+    
+    if metodo_invalido:
+        raise ErroAPI(HTTPStatus.METHOD_NOT_ALLOWED, f"Método não permitido: {metodo}")
+    raise ErroAPI(HTTPStatus.NOT_FOUND, f"Rota não encontrada: {caminho}")
+
+
+# ==================== SERVIDOR ====================
+
+class ServidorAPI:
+    """Servidor HTTP/1.1 assíncrono que atende as rotas da API."""
+    
+    def __init__(self, host='127.0.0.1', porta=8765, conexoes=4, max_requisicoes=64):
+        self.host = host
+        self.porta = porta
+        self.conexoes = conexoes
+        self.max_requisicoes = max_requisicoes
+        
+        # Pool de conexões: cada thread abre (uma vez) a própria conexão
+        self._pool = ThreadPoolExecutor(max_workers=conexoes, thread_name_prefix='api-banco')
+        self._em_andamento = 0
+        self._servidor = None
+        self._conexoes = {}  # Tarefa de cada conexão aberta -> writer
+    
+    async def iniciar(self):
+        """Abre a porta e começa a aceitar conexões."""
+        self._servidor = await asyncio.start_server(self._atender_conexao, self.host, self.porta)
+        # Com porta 0 o sistema escolhe uma porta livre
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self
+    
+    async def executar_ate_parar(self, parar=None):
+        """Atende requisições até o evento parar ser definido (ou para sempre)."""
+        try:
+            async with self._servidor:
+                if parar is None:
+                    await self._servidor.serve_forever()
+                else:
+                    await parar.wait()
+        finally:
+            # Conexões keep-alive ociosas não terminam sozinhas: fechá-las
+            # encerra a leitura pendente, e a resposta em andamento é concluída
+            for writer in list(self._conexoes.values()):
+                writer.close()
+            await asyncio.gather(*self._conexoes, return_exceptions=True)
+    
+    def encerrar(self):
+        """Fecha a porta, fecha a conexão com o banco de cada thread do pool e encerra o pool."""
+        if self._servidor is not None:
+            self._servidor.close()
+        
+        # Uma tarefa por thread: a barreira segura cada thread até todas terem
+        # pegado a sua, então nenhuma fecha duas vezes e nenhuma fica de fora
+        barreira = threading.Barrier(self.conexoes)
+        
+        def fechar_conexao_da_thread():
+            db.fechar_conexao()
+            try:
+                barreira.wait(TEMPO_ENCERRAMENTO_S)
+            except threading.BrokenBarrierError:
+                pass
+        
+        for _ in range(self.conexoes):
+            self._pool.submit(fechar_conexao_da_thread)
+        self._pool.shutdown(wait=True)
+    
+    async def _atender_conexao(self, reader, writer):
+        """Lê requisições da conexão (keep-alive) até o cliente encerrar."""
+        tarefa = asyncio.current_task()
+        self._conexoes[tarefa] = writer
+        try:
+            while True:
+                try:
+                    cabecalho = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), TEMPO_OCIOSO_S)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError):
+                    break
+                
+                manter_aberta = await self._atender_requisicao(cabecalho, reader, writer)
+                await writer.drain()
+                if not manter_aberta:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._conexoes.pop(tarefa, None)
+            writer.close()
+    
+    async def _atender_requisicao(self, cabecalho, reader, writer):
+        """Responde uma requisição; retorna se a conexão continua aberta."""
+        manter_aberta = False
+        
+        try:
+            linhas = cabecalho.decode('latin-1').split('\r\n')
+            try:
+                metodo, alvo, versao = linhas[0].split(' ')
+            except ValueError:
+                raise ErroAPI(HTTPStatus.BAD_REQUEST, "Requisição malformada")
+            
+            cabecalhos = {}
+            for linha in linhas[1:]:
+                if ':' in linha:
+                    nome, valor = linha.split(':', 1)
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+            
+            conexao = cabecalhos.get('connection', '').lower()
+            manter_aberta = conexao == 'keep-alive' if versao == 'HTTP/1.0' else conexao != 'close'
+            
+            # Sem um tamanho válido não se sabe onde a próxima requisição começa,
+            # então a conexão é fechada junto com o erro
+            tamanho = cabecalhos.get('content-length') or '0'
+            if not re.fullmatch(r'[0-9]+', tamanho):
+                manter_aberta = False
+                raise ErroAPI(HTTPStatus.BAD_REQUEST, f"Content-Length inválido: {tamanho}")
+            tamanho = int(tamanho)
+            if tamanho > TAMANHO_MAXIMO_CORPO:
+                manter_aberta = False
+                raise ErroAPI(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo da requisição grande demais")
+            corpo = await reader.readexactly(tamanho) if tamanho else b''
+            
+            status, resposta = await self._despachar(metodo, alvo, corpo)
+        except ErroAPI as e:
+            status, resposta = e.status, {'erro': e.mensagem}
+        except Exception as e:
+            print(f"[ERRO] API: {e}")
+            status, resposta = HTTPStatus.INTERNAL_SERVER_ERROR, {'erro': 'Erro interno'}
+        
+        conteudo = json.dumps(resposta, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(conteudo)}\r\n'
+            f'Connection: {"keep-alive" if manter_aberta else "close"}\r\n'
+            f'\r\n'.encode('latin-1') + conteudo
+        )
+        
+        return manter_aberta
+    
+    async def _despachar(self, metodo, alvo, corpo):
+        """Executa a rota no pool, respeitando o limite de requisições em andamento."""
+        endereco = urlsplit(alvo)
+        funcao, argumentos = encontrar_rota(metodo, endereco.path)
+        consulta = parse_qs(endereco.query)
+        
+        dados = {}
+        if corpo:
+            try:
+                dados = json.loads(corpo)
+            except ValueError:
+                raise ErroAPI(HTTPStatus.BAD_REQUEST, "Corpo não é um JSON válido")
+            if not isinstance(dados, dict):
+                raise ErroAPI(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON")
+        
+        if self._em_andamento >= self.max_requisicoes:
+            raise ErroAPI(HTTPStatus.SERVICE_UNAVAILABLE, "Servidor ocupado, tente novamente")
+        
+        self._em_andamento += 1
+        try:
+            laco = asyncio.get_running_loop()
+            return await laco.run_in_executor(self._pool, funcao, consulta, dados, *argumentos)
+        finally:
+            self._em_andamento -= 1
+
+
+def iniciar_api(host=None, porta=None):
+    """Roda o servidor da API até Ctrl+C (ou SIGTERM).
+    
+    Host, porta e limites vêm de config.json ("api"), exceto quando
+    informados aqui.
+    """
+    configuracao = get_config_api()
+    servidor = ServidorAPI(
+        host or configuracao['host'],
+        porta if porta is not None else configuracao['porta'],
+        configuracao['conexoes'],
+        configuracao['max_requisicoes']
+    )
+    
+    async def rodar():
+        parar = asyncio.Event()
+        laco = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                laco.add_signal_handler(sinal, parar.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C chega como KeyboardInterrupt
+        
+        await servidor.iniciar()
+        print(f"[INFO] API ouvindo em http://{servidor.host}:{servidor.porta}")
+        await servidor.executar_ate_parar(parar)
+    
+    try:
+        asyncio.run(rodar())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.encerrar()
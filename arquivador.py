@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arquivador.py - Arquivamento do histórico do FiadoFácil
+=======================================================
+
+Move para o arquivo morto (fiado_facil_arquivo.db, ao lado do banco) o
+histórico já quitado mais antigo que a idade configurada e os clientes
+excluídos. As tabelas do dia a dia ficam pequenas e rápidas; os saldos não
+mudam, e o histórico arquivado continua disponível na tela do cliente.
+
+Uso:
+    python arquivador.py
+    python arquivador.py --idade-dias 180 --compactar
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import database as db
+from config import get_arquivamento, get_lojas
+
+
+def main():
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Arquiva o histórico quitado antigo e os clientes excluídos."
+    )
+    parser.add_argument(
+        '--idade-dias', type=int, default=get_arquivamento()['idade_dias'],
+        help="Arquiva lançamentos mais antigos que isso (padrão: config.json)"
+    )
+    parser.add_argument(
+        '--compactar', action='store_true',
+        help="Compacta o banco principal (VACUUM) depois de arquivar"
+    )
+    parser.add_argument(
+        '--loja', choices=sorted(get_lojas()) or None,
+        help="Loja a arquivar (padrão: a loja do config.json)"
+    )
+    args = parser.parse_args()
+
+    db.selecionar_loja(args.loja)
+    db.inicializar_banco()
+
+    inicio = datetime.now()
+
+    try:
+        resumo = db.arquivar_historico(args.idade_dias, compactar=args.compactar)
+    except db.sqlite3.Error as e:
+        print(f"[ERRO] Arquivamento cancelado, nada foi removido do banco: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.fechar_conexoes()
+
+    segundos = (datetime.now() - inicio).total_seconds()
+    print(
+        f"[INFO] Arquivados em {segundos:.1f}s: {resumo['clientes']} cliente(s) excluído(s), "
+        f"{resumo['transacoes']} compra(s) e {resumo['pagamentos']} pagamento(s)."
+    )
+    print(f"[INFO] Arquivo morto: {db.caminho_arquivo_morto()}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,8 +13,35 @@ CONFIG_PADRAO = {
         "telefone": "(00) 00000-0000"
     },
     "limite_fiado_padrao": 500.00,
+    "loja": None,
+    "lojas": {},
     "backup_dir": "backups",
     "backup_automatico": True,
+    "backup_retencao": {
+        "manter_ultimos": 10,
+        "diarios": 7,
+        "semanais": 4,
+        "mensais": 12
+    },
+    "concorrencia": {
+        "busy_timeout_ms": 5000,
+        "tentativas": 5,
+        "espera_maxima_ms": 200
+    },
+    "escrita_agrupada": {
+        "ativa": False,
+        "janela_ms": 2,
+        "max_lote": 200
+    },
+    "arquivamento": {
+        "idade_dias": 365
+    },
+    "api": {
+        "host": "127.0.0.1",
+        "porta": 8765,
+        "conexoes": 4,
+        "max_requisicoes": 64
+    },
     "interface": {
         "tema": "claro",
         "font_size": 10,
@@ -63,3 +90,44 @@ def get_nome_empresa():
     """Retorna o nome da empresa."""
     config = carregar_config()
     return config.get("empresa", {}).get("nome", "FiadoFácil")
+
+def get_retencao_backup():
+    """Retorna a política de retenção de backups (None desativa a limpeza)."""
+    config = carregar_config()
+    retencao = config.get("backup_retencao", CONFIG_PADRAO["backup_retencao"])
+    if not retencao:
+        return None
+    return {**CONFIG_PADRAO["backup_retencao"], **retencao}
+
+def get_escrita_agrupada():
+    """Retorna a configuração da escrita agrupada (None se desativada)."""
+    config = carregar_config()
+    escrita = {**CONFIG_PADRAO["escrita_agrupada"], **(config.get("escrita_agrupada") or {})}
+    if not escrita.get("ativa"):
+        return None
+    return escrita
+
+def get_concorrencia():
+    """Retorna a configuração de espera e novas tentativas com o banco ocupado."""
+    config = carregar_config()
+    return {**CONFIG_PADRAO["concorrencia"], **(config.get("concorrencia") or {})}
+
+def get_arquivamento():
+    """Retorna a configuração do arquivamento de histórico quitado."""
+    config = carregar_config()
+    return {**CONFIG_PADRAO["arquivamento"], **(config.get("arquivamento") or {})}
+
+def get_lojas():
+    """Retorna o dicionário {nome da loja: arquivo do banco} configurado."""
+    config = carregar_config()
+    return config.get("lojas") or {}
+
+def get_loja():
+    """Retorna o nome da loja em uso (None usa o banco padrão)."""
+    config = carregar_config()
+    return config.get("loja")
+
+def get_config_api():
+    """Retorna a configuração do servidor da API (host, porta e limites)."""
+    config = carregar_config()
+    return {**CONFIG_PADRAO["api"], **(config.get("api") or {})}
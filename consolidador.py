@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+consolidador.py - Relatórios consolidados das lojas do FiadoFácil
+=================================================================
+
+Lê os bancos de todas as lojas configuradas em config.json ("lojas") e
+junta estatísticas, devedores e exportações em um único relatório.
+
+Cada loja é processada em um processo separado (até um por núcleo), com
+a própria conexão SQLite: o tempo total acompanha a loja mais lenta, e não
+a soma de todas. Os dados das lojas são apenas lidos (um banco de versão
+antiga é atualizado pelas migrações, como ao abrir o sistema).
+
+Uso:
+    python consolidador.py
+    python consolidador.py --exportar relatorios
+    python consolidador.py --processos 4
+"""
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import database as db
+from config import get_lojas
+
+# Campos de obter_estatisticas() somados entre as lojas
+CAMPOS_CONTAGEM = ('total_clientes', 'clientes_com_divida')
+CAMPOS_VALOR = ('total_aberto', 'total_dividas', 'total_pagamentos')
+
+
+def resumir_loja(nome, arquivo, pasta_exportacao=None):
+    """Lê estatísticas e devedores de uma loja (executada em outro processo).
+
+    Args:
+        nome: Nome da loja
+        arquivo: Banco de dados da loja
+        pasta_exportacao: Se informada, grava ali o relatório CSV da loja
+
+    Returns:
+        Dicionário com loja, estatisticas, devedores e exportacao
+    """
+    if not os.path.exists(arquivo):
+        raise FileNotFoundError(f"Banco da loja não encontrado: {arquivo}")
+
+    db.selecionar_banco(arquivo)
+    try:
+        db.inicializar_banco()
+
+        exportacao = None
+        if pasta_exportacao:
+            exportacao = db.exportar_relatorio_csv(os.path.join(pasta_exportacao, f'{nome}.csv'))
+
+        return {
+            'loja': nome,
+            'estatisticas': db.obter_estatisticas(),
+            'devedores': db.obter_clientes_com_divida(),
+            'exportacao': exportacao
+        }
+    finally:
+        db.fechar_conexoes()
+
+
+def somar_estatisticas(estatisticas):
+    """Soma as estatísticas das lojas (valores somados em centavos, sem erro de arredondamento)."""
+    total = {campo: 0 for campo in CAMPOS_CONTAGEM + CAMPOS_VALOR}
+
+    for loja in estatisticas:
+        for campo in CAMPOS_CONTAGEM:
+            total[campo] += loja[campo]
+        for campo in CAMPOS_VALOR:
+            total[campo] += db.para_centavos(loja[campo])
+
+    for campo in CAMPOS_VALOR:
+        total[campo] = db.para_reais(total[campo])
+
+    return total
+
+
+def consolidar(lojas, pasta_exportacao=None, processos=None):
+    """Processa as lojas em paralelo e junta os resultados.
+
+    Args:
+        lojas: Dicionário {nome da loja: arquivo do banco}
+        pasta_exportacao: Se informada, grava ali o CSV de cada loja
+        processos: Máximo de processos (padrão: um por núcleo)
+
+    Returns:
+        Dicionário com lojas (resultado de cada uma, em ordem de nome),
+        estatisticas (somadas), devedores (de todas as lojas, maiores
+        saldos primeiro, com o nome da loja) e erros ({loja: mensagem})
+    """
+    if pasta_exportacao:
+        os.makedirs(pasta_exportacao, exist_ok=True)
+
+    resultados = []
+    erros = {}
+
+    processos = min(processos or os.cpu_count() or 1, max(1, len(lojas)))
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {
+            executor.submit(resumir_loja, nome, arquivo, pasta_exportacao): nome
+            for nome, arquivo in lojas.items()
+        }
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                erros[nome] = str(e)
+
+    resultados.sort(key=lambda resultado: resultado['loja'])
+
+    devedores = [
+        {'loja': resultado['loja'], **devedor}
+        for resultado in resultados
+        for devedor in resultado['devedores']
+    ]
+    devedores.sort(key=lambda devedor: (-devedor['saldo'], devedor['nome']))
+
+    return {
+        'lojas': resultados,
+        'estatisticas': somar_estatisticas(r['estatisticas'] for r in resultados),
+        'devedores': devedores,
+        'erros': erros
+    }
+
+
+def exportar_consolidado_csv(caminho_arquivo, consolidado):
+    """Grava o resumo por loja e a lista consolidada de devedores em CSV."""
+    with open(caminho_arquivo, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+
+        writer.writerow(['=== RELATÓRIO CONSOLIDADO FIADOFÁCIL ==='])
+        writer.writerow(['Data de Geração:', datetime.now().strftime('%d/%m/%Y %H:%M:%S')])
+        writer.writerow([])
+        writer.writerow(['=== RESUMO POR LOJA ==='])
+        writer.writerow(['Loja', 'Clientes', 'Devedores', 'Em Aberto'])
+
+        linhas = [(r['loja'], r['estatisticas']) for r in consolidado['lojas']]
+        linhas.append(('TOTAL', consolidado['estatisticas']))
+        for loja, estatisticas in linhas:
+            writer.writerow([
+                loja,
+                estatisticas['total_clientes'],
+                estatisticas['clientes_com_divida'],
+                f"R$ {estatisticas['total_aberto']:.2f}"
+            ])
+
+        writer.writerow([])
+        writer.writerow(['=== DEVEDORES ==='])
+        writer.writerow(['Loja', 'Nome', 'Telefone', 'Saldo Devedor'])
+        writer.writerows(
+            [devedor['loja'], devedor['nome'], devedor['telefone'] or '', f"R$ {devedor['saldo']:.2f}"]
+            for devedor in consolidado['devedores']
+        )
+
+    return caminho_arquivo
+
+
+def main():
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Consolida estatísticas, devedores e relatórios de todas as lojas."
+    )
+    parser.add_argument(
+        '--exportar', metavar='PASTA',
+        help="Grava nesta pasta o relatório de cada loja e o consolidado (CSV)"
+    )
+    parser.add_argument('--processos', type=int, help="Máximo de processos (padrão: um por núcleo)")
+    args = parser.parse_args()
+
+    lojas = get_lojas()
+    if not lojas:
+        print("[ERRO] Nenhuma loja configurada em config.json (\"lojas\").", file=sys.stderr)
+        return 1
+
+    inicio = datetime.now()
+    consolidado = consolidar(lojas, args.exportar, args.processos)
+    segundos = (datetime.now() - inicio).total_seconds()
+
+    for resultado in consolidado['lojas']:
+        estatisticas = resultado['estatisticas']
+        print(
+            f"  {resultado['loja']}: {estatisticas['total_clientes']} cliente(s), "
+            f"{estatisticas['clientes_com_divida']} devedor(es), "
+            f"R$ {estatisticas['total_aberto']:.2f} em aberto"
+        )
+
+    total = consolidado['estatisticas']
+    print(
+        f"[INFO] {len(consolidado['lojas'])} loja(s) em {segundos:.1f}s: "
+        f"{total['total_clientes']} cliente(s), {total['clientes_com_divida']} devedor(es), "
+        f"R$ {total['total_aberto']:.2f} em aberto."
+    )
+
+    if args.exportar:
+        caminho = exportar_consolidado_csv(os.path.join(args.exportar, 'consolidado.csv'), consolidado)
+        print(f"[INFO] Relatórios salvos em {args.exportar} (consolidado: {caminho})")
+
+    for loja, erro in consolidado['erros'].items():
+        print(f"[ERRO] {loja}: {erro}", file=sys.stderr)
+
+    return 1 if consolidado['erros'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
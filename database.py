@@ -2,350 +2,3232 @@
 # Responsável por todas as operações com SQLite
 
 import sqlite3
+import json
 import os
-import shutil
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
-from config import carregar_config, get_limite_padrao
+from decimal import Decimal, ROUND_HALF_UP
+from config import (carregar_config, get_limite_padrao, get_retencao_backup, get_escrita_agrupada,
+                    get_arquivamento, get_loja, get_lojas, get_concorrencia)
 
 ARQUIVO_DB = "fiado_facil.db"
 
+# Loja cujo banco está em uso (None = banco padrão, sem loja configurada)
+LOJA_ATUAL = None
+
+# PRAGMAs aplicados uma única vez ao abrir cada conexão
+PRAGMAS_CONEXAO = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',     # ~16 MB de cache de páginas
+    'PRAGMA mmap_size = 268435456',   # 256 MB mapeados em memória
+    'PRAGMA temp_store = MEMORY',
+)
+
+# Uma conexão por thread, reaproveitada entre as chamadas
+_local = threading.local()
+_conexoes_abertas = []
+_lock_conexoes = threading.Lock()
+
 def get_conexao():
-    """Retorna uma conexão com o banco de dados."""
-    conn = sqlite3.connect(ARQUIVO_DB)
+    """Retorna a conexão com o banco de dados da thread atual.
+    
+    A conexão é aberta na primeira chamada de cada thread e reaproveitada
+    nas seguintes. Use fechar_conexoes() ao encerrar o sistema.
+    """
+    conn = getattr(_local, 'conexao', None)
+    if conn is not None:
+        return conn
+    
+    # check_same_thread=False apenas para permitir o fechamento no encerramento;
+    # cada conexão continua sendo usada somente pela thread que a abriu.
+    # timeout = busy_timeout: com o banco ocupado por outro processo, espera
+    # em vez de falhar na hora com "database is locked"
+    conn = sqlite3.connect(
+        ARQUIVO_DB,
+        timeout=configuracao_concorrencia()['busy_timeout_ms'] / 1000,
+        check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+    for pragma in PRAGMAS_CONEXAO:
+        conn.execute(pragma)
+    
+    _local.conexao = conn
+    with _lock_conexoes:
+        _conexoes_abertas.append(conn)
+    
     return conn
 
+def fechar_conexao():
+    """Fecha a conexão da thread atual (útil ao final de threads auxiliares)."""
+    conn = getattr(_local, 'conexao', None)
+    if conn is None:
+        return
+    
+    _local.conexao = None
+    with _lock_conexoes:
+        if conn in _conexoes_abertas:
+            _conexoes_abertas.remove(conn)
+    conn.close()
+
+def fechar_conexoes():
+    """Fecha todas as conexões abertas. Chamado no encerramento do sistema."""
+    with _lock_conexoes:
+        conexoes = list(_conexoes_abertas)
+        _conexoes_abertas.clear()
+    
+    for conn in conexoes:
+        try:
+            conn.execute('PRAGMA optimize')
+        except sqlite3.OperationalError as e:
+            # Outro processo gravando: a otimização fica para o próximo encerramento
+            if not banco_ocupado(e):
+                print(f"Erro ao otimizar o banco: {e}")
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Erro ao fechar conexão: {e}")
+    
+    _local.conexao = None
+
+def selecionar_banco(arquivo):
+    """Passa a usar outro arquivo de banco de dados.
+    
+    As conexões abertas (do banco anterior) são fechadas e o cache de
+    leitura é esvaziado; as próximas chamadas abrem o novo arquivo.
+    """
+    global ARQUIVO_DB
+    
+    if _conexoes_abertas:
+        fechar_conexoes()
+    
+    ARQUIVO_DB = arquivo
+    limpar_cache()
+
+def selecionar_loja(nome=None):
+    """Passa a usar o banco da loja informada (padrão: a "loja" do config.json).
+    
+    Sem loja configurada, continua com o banco padrão.
+    
+    Returns:
+        Caminho do banco em uso
+    """
+    global LOJA_ATUAL
+    
+    if nome is None:
+        nome = get_loja()
+    if nome is None:
+        return ARQUIVO_DB
+    
+    lojas = get_lojas()
+    if nome not in lojas:
+        raise ValueError(f"Loja não configurada em config.json: {nome}")
+    
+    selecionar_banco(lojas[nome])
+    LOJA_ATUAL = nome
+    
+    return ARQUIVO_DB
+
+# ==================== CONCORRÊNCIA ENTRE PROCESSOS ====================
+# Vários processos (caixas, API, arquivador) podem gravar no mesmo banco.
+# Com WAL, leituras nunca bloqueiam a gravação nem são bloqueadas por ela;
+# entre gravações, o SQLite admite um único escritor por vez.
+#
+# Toda transação de escrita começa com BEGIN IMMEDIATE: o bloqueio de
+# escrita é obtido logo no início, esperando até busy_timeout_ms se outro
+# processo estiver gravando. Uma transação comum (deferred) que lê antes de
+# gravar pode falhar com "database is locked" ao tentar promover o bloqueio,
+# sem esperar. Se o prazo esgotar, o BEGIN é repetido após uma espera
+# aleatória crescente (jitter), para que os processos não voltem todos juntos.
+
+# Lida do config.json uma única vez (evita reler o arquivo a cada gravação)
+_concorrencia = None
+
+def configuracao_concorrencia():
+    """Retorna busy_timeout_ms, tentativas e espera_maxima_ms do config.json."""
+    global _concorrencia
+    if _concorrencia is None:
+        _concorrencia = get_concorrencia()
+    return _concorrencia
+
+def banco_ocupado(erro):
+    """Indica se o erro é de banco bloqueado/ocupado por outra conexão."""
+    mensagem = str(erro).lower()
+    return 'locked' in mensagem or 'busy' in mensagem
+
+def iniciar_transacao_escrita(conn):
+    """Executa BEGIN IMMEDIATE, repetindo com espera aleatória se o banco estiver ocupado."""
+    concorrencia = configuracao_concorrencia()
+    tentativas = max(1, concorrencia['tentativas'])
+    espera_maxima = concorrencia['espera_maxima_ms'] / 1000
+    
+    for tentativa in range(tentativas):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as e:
+            if not banco_ocupado(e) or tentativa == tentativas - 1:
+                raise
+        
+        # Espera exponencial com jitter completo: 0 a min(máximo, 10 ms * 2^n)
+        time.sleep(random.uniform(0, min(espera_maxima, 0.01 * 2 ** tentativa)))
+
+@contextmanager
+def transacao_escrita(conn=None):
+    """Transação de escrita: BEGIN IMMEDIATE (com novas tentativas), commit ou rollback.
+    
+    Uso:
+        with transacao_escrita(conn) as cursor:
+            cursor.execute('INSERT ...')
+    """
+    if conn is None:
+        conn = get_conexao()
+    iniciar_transacao_escrita(conn)
+    
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+# ==================== VALORES MONETÁRIOS ====================
+# Valores em dinheiro são gravados como INTEGER, em centavos, para que somas
+# e saldos sejam exatos. A conversão acontece somente neste módulo: quem o
+# usa continua informando e recebendo valores em reais.
+
+def para_centavos(valor):
+    """Converte um valor em reais (float, int, str ou Decimal) para centavos."""
+    if valor is None:
+        return None
+    
+    # str() evita herdar o erro binário do float (0.285 -> '0.285' -> 29)
+    centavos = (Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return int(centavos)
+
+def para_reais(centavos):
+    """Converte um valor em centavos para reais."""
+    return centavos / 100
+
+# ==================== CACHE DE LEITURA ====================
+# Clientes e saldos são lidos muitas vezes seguidas pelo mesmo ID (seleção,
+# diálogo de pagamento, atualização da tela). O cache guarda essas leituras
+# e é invalidado item a item pelas funções de escrita deste módulo.
+#
+# Gravações de outros processos (ou feitas por fora destas funções) são
+# detectadas pelo PRAGMA data_version, que muda quando outra conexão faz
+# commit, junto com o contador de alterações: se o contador avançou além
+# das gravações registradas por este processo, o cache inteiro é descartado.
+
+# Quantidade máxima de itens no cache (clientes + saldos)
+TAMANHO_CACHE_LEITURA = 1024
+
+class CacheLRU:
+    """Cache LRU limitado, compartilhado entre as threads."""
+    
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Avança a cada invalidação: leituras iniciadas antes não são guardadas
+        self._geracao = 0
+        
+        # Valor de controle_alteracoes.contador já refletido no cache
+        self._contador = None
+    
+    def obter(self, chave):
+        """Retorna (encontrado, valor, geracao) e atualiza os contadores."""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return True, self._itens[chave], self._geracao
+            
+            self.falhas += 1
+            return False, None, self._geracao
+    
+    def guardar(self, chave, valor, geracao):
+        """Guarda o valor lido, se nada foi invalidado desde o início da leitura."""
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            if len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+    
+    def invalidar(self, *chaves):
+        """Remove as chaves informadas."""
+        with self._lock:
+            self._geracao += 1
+            for chave in chaves:
+                self._itens.pop(chave, None)
+    
+    def limpar(self):
+        """Remove todos os itens."""
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+    
+    def sincronizar(self, contador, alteracoes_proprias=0):
+        """Confere o contador de alterações do banco com o conhecido pelo cache.
+        
+        Args:
+            contador: Valor atual de controle_alteracoes.contador
+            alteracoes_proprias: Quantas alterações deste processo o contador
+                inclui além das já conhecidas (já invalidadas pelo chamador)
+        """
+        with self._lock:
+            if self._contador is None or self._contador != contador - alteracoes_proprias:
+                # Alguém gravou por fora: nada do que está no cache é confiável
+                self._geracao += 1
+                self._itens.clear()
+            self._contador = contador
+
+_cache_leitura = CacheLRU(TAMANHO_CACHE_LEITURA)
+
+def ler_contador_alteracoes(cursor):
+    """Retorna o valor atual de controle_alteracoes.contador."""
+    cursor.execute('SELECT contador FROM controle_alteracoes WHERE id = 1')
+    return cursor.fetchone()[0]
+
+def verificar_alteracoes_externas():
+    """Descarta o cache se outra conexão gravou algo não registrado por este processo."""
+    conn = get_conexao()
+    versao = conn.execute('PRAGMA data_version').fetchone()[0]
+    if versao == getattr(_local, 'data_version', None):
+        return  # Nenhum commit de outra conexão desde a última verificação
+    
+    _local.data_version = versao
+    _cache_leitura.sincronizar(ler_contador_alteracoes(conn.cursor()))
+
+def registrar_escrita(cursor, linhas):
+    """Registra no cache as `linhas` alteradas por esta transação (sem commit).
+    
+    Chamado pelas funções de escrita depois do INSERT/UPDATE, ainda dentro
+    da transação; os itens afetados são invalidados por elas após o commit.
+    """
+    _cache_leitura.sincronizar(ler_contador_alteracoes(cursor), linhas)
+
+def ler_com_cache(chave, carregar, *args):
+    """Retorna o valor da chave no cache ou o lê com carregar(*args)."""
+    verificar_alteracoes_externas()
+    
+    encontrado, valor, geracao = _cache_leitura.obter(chave)
+    if encontrado:
+        return valor
+    
+    valor = carregar(*args)
+    _cache_leitura.guardar(chave, valor, geracao)
+    return valor
+
+def invalidar_cliente(cliente_id):
+    """Remove do cache o cliente e o saldo informados."""
+    _cache_leitura.invalidar(('cliente', int(cliente_id)), ('saldo', int(cliente_id)))
+
+def limpar_cache():
+    """Esvazia o cache de leitura (usado após gravações em lote)."""
+    _cache_leitura.limpar()
+
+def obter_estatisticas_cache():
+    """Retorna acertos, falhas, itens e taxa de acerto do cache de leitura."""
+    acertos = _cache_leitura.acertos
+    falhas = _cache_leitura.falhas
+    total = acertos + falhas
+    
+    return {
+        'acertos': acertos,
+        'falhas': falhas,
+        'itens': len(_cache_leitura._itens),
+        'tamanho': _cache_leitura.tamanho,
+        'taxa_acerto': acertos / total if total else 0.0
+    }
+
 def inicializar_banco():
     """Cria as tabelas do banco de dados se não existirem."""
     conn = get_conexao()
-    cursor = conn.cursor()
     
-    # Tabela de Clientes
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        # Tabela de Clientes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS clientes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT NOT NULL,
+                telefone TEXT,
+                limite_fiado REAL DEFAULT 500.00,
+                data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP,
+                ativo INTEGER DEFAULT 1
+            )
+        ''')
+        
+        # Tabela de Transações (Dívidas)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transacoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id INTEGER NOT NULL,
+                descricao TEXT NOT NULL,
+                valor REAL NOT NULL,
+                data TEXT DEFAULT CURRENT_TIMESTAMP,
+                pago INTEGER DEFAULT 0,
+                FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+            )
+        ''')
+        
+        # Tabela de Pagamentos
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pagamentos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id INTEGER NOT NULL,
+                valor REAL NOT NULL,
+                observacao TEXT,
+                data TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+            )
+        ''')
+    
+    # Anexado antes (ATTACH não roda dentro de transação): os resumos
+    # calculados pelas migrações incluem o histórico arquivado
+    anexar_arquivo_morto(conn)
+    
+    # Atualiza o esquema (índices, tabelas auxiliares...) até a versão atual
+    aplicar_migracoes(conn)
+    
+    print("Banco de dados inicializado com sucesso!")
+
+# ==================== MIGRAÇÕES DE ESQUEMA ====================
+# A versão do esquema fica gravada em PRAGMA user_version. Cada migração
+# roda uma única vez, em ordem, dentro da própria transação, de modo que
+# bancos já existentes nas lojas são atualizados automaticamente ao iniciar.
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações ainda não executadas neste banco."""
+    for versao, migracao in enumerate(MIGRACOES, start=1):
+        cursor = conn.cursor()
+        
+        # BEGIN IMMEDIATE impede que duas instâncias apliquem a mesma migração
+        iniciar_transacao_escrita(conn)
+        try:
+            versao_atual = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if versao_atual >= versao:
+                conn.rollback()
+                continue
+            
+            migracao(cursor)
+            cursor.execute(f'PRAGMA user_version = {versao}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        print(f"Migração {versao} aplicada: {migracao.__doc__}")
+
+def migracao_saldos(cursor):
+    """Tabela de saldos mantida por gatilhos"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS saldos (
+            cliente_id INTEGER PRIMARY KEY,
+            total_dividas REAL NOT NULL DEFAULT 0,
+            total_pagamentos REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+        )
+    ''')
+    
+    criar_gatilhos_saldos(cursor)
+    
+    # Bancos antigos já possuem histórico: calcula os saldos uma única vez
+    recalcular_saldos(cursor)
+
+def migracao_indices(cursor):
+    """Índices para histórico, saldos e lista de clientes"""
+    criar_indices(cursor)
+    
+    # Estatísticas para o planejador de consultas
+    cursor.execute('ANALYZE')
+
+def criar_indices(cursor):
+    """Cria os índices das tabelas de dados."""
+    # Histórico e saldos por cliente, já na ordem de data
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_cliente_data
+        ON transacoes (cliente_id, data)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_pagamentos_cliente_data
+        ON pagamentos (cliente_id, data)
+    ''')
+    
+    # Lista de clientes ativos ordenada por nome
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_clientes_ativos_nome
+        ON clientes (nome) WHERE ativo = 1
+    ''')
+    
+    # Relatórios por período
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (data)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pagamentos_data ON pagamentos (data)')
+    
+    # Compras ainda não quitadas (quitação FIFO e envelhecimento das dívidas)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_abertas
+        ON transacoes (cliente_id, data) WHERE pago = 0
+    ''')
+
+def criar_gatilhos_saldos(cursor):
+    """Cria os gatilhos que mantêm a tabela de saldos sempre atualizada."""
+    
+    # Todo cliente novo começa com saldo zerado
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_saldo_ai
+        AFTER INSERT ON clientes
+        BEGIN
+            INSERT OR IGNORE INTO saldos (cliente_id) VALUES (NEW.id);
+        END
+    ''')
+    
+    # Transações: todas as compras compõem a dívida, e os pagamentos a abatem.
+    # A coluna pago só indica quais compras já foram quitadas (FIFO)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transacoes_saldo_ai
+        AFTER INSERT ON transacoes
+        BEGIN
+            INSERT INTO saldos (cliente_id, total_dividas)
+            VALUES (NEW.cliente_id, NEW.valor)
+            ON CONFLICT (cliente_id) DO UPDATE
+            SET total_dividas = total_dividas + excluded.total_dividas;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transacoes_saldo_au
+        AFTER UPDATE OF cliente_id, valor ON transacoes
+        BEGIN
+            UPDATE saldos
+            SET total_dividas = total_dividas - OLD.valor
+            WHERE cliente_id = OLD.cliente_id;
+            INSERT INTO saldos (cliente_id, total_dividas)
+            VALUES (NEW.cliente_id, NEW.valor)
+            ON CONFLICT (cliente_id) DO UPDATE
+            SET total_dividas = total_dividas + excluded.total_dividas;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transacoes_saldo_ad
+        AFTER DELETE ON transacoes
+        BEGIN
+            UPDATE saldos
+            SET total_dividas = total_dividas - OLD.valor
+            WHERE cliente_id = OLD.cliente_id;
+        END
+    ''')
+    
+    # Pagamentos
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_saldo_ai
+        AFTER INSERT ON pagamentos
+        BEGIN
+            INSERT INTO saldos (cliente_id, total_pagamentos)
+            VALUES (NEW.cliente_id, NEW.valor)
+            ON CONFLICT (cliente_id) DO UPDATE
+            SET total_pagamentos = total_pagamentos + excluded.total_pagamentos;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_saldo_au
+        AFTER UPDATE OF cliente_id, valor ON pagamentos
+        BEGIN
+            UPDATE saldos
+            SET total_pagamentos = total_pagamentos - OLD.valor
+            WHERE cliente_id = OLD.cliente_id;
+            INSERT INTO saldos (cliente_id, total_pagamentos)
+            VALUES (NEW.cliente_id, NEW.valor)
+            ON CONFLICT (cliente_id) DO UPDATE
+            SET total_pagamentos = total_pagamentos + excluded.total_pagamentos;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_saldo_ad
+        AFTER DELETE ON pagamentos
+        BEGIN
+            UPDATE saldos
+            SET total_pagamentos = total_pagamentos - OLD.valor
+            WHERE cliente_id = OLD.cliente_id;
+        END
+    ''')
+
+def recalcular_saldos(cursor):
+    """Refaz a tabela de saldos a partir do histórico (sem commit)."""
+    cursor.execute('DELETE FROM saldos')
+    cursor.execute('''
+        INSERT INTO saldos (cliente_id, total_dividas, total_pagamentos)
+        SELECT c.id,
+               COALESCE((SELECT SUM(t.valor) FROM transacoes t
+                         WHERE t.cliente_id = c.id), 0),
+               COALESCE((SELECT SUM(p.valor) FROM pagamentos p
+                         WHERE p.cliente_id = c.id), 0)
+        FROM clientes c
+    ''')
+
+def reconstruir_saldos():
+    """Recalcula a tabela de saldos a partir do histórico completo.
+    
+    Executado automaticamente pela migração que cria a tabela; pode ser
+    chamado novamente para corrigir saldos alterados manualmente.
+    """
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        recalcular_saldos(conn.cursor())
+    
+    limpar_cache()
+
+def migracao_busca_textual(cursor):
+    """Índice FTS5 (trigramas) para a busca de clientes"""
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+                nome, telefone,
+                content = 'clientes', content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite sem FTS5 ou sem o tokenizador trigram: a busca continua com LIKE
+        print(f"Busca textual indisponível ({e}); usando busca simples.")
+        return
+    
+    criar_gatilhos_busca(cursor)
+    
+    # Indexa os clientes já cadastrados
+    cursor.execute("INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')")
+
+def criar_gatilhos_busca(cursor):
+    """Cria os gatilhos que mantêm o índice clientes_fts sincronizado."""
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_ai
+        AFTER INSERT ON clientes
+        BEGIN
+            INSERT INTO clientes_fts (rowid, nome, telefone)
+            VALUES (NEW.id, NEW.nome, NEW.telefone);
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_au
+        AFTER UPDATE OF nome, telefone ON clientes
+        BEGIN
+            INSERT INTO clientes_fts (clientes_fts, rowid, nome, telefone)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.telefone);
+            INSERT INTO clientes_fts (rowid, nome, telefone)
+            VALUES (NEW.id, NEW.nome, NEW.telefone);
+        END
+    ''')
+    
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS clientes (
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_ad
+        AFTER DELETE ON clientes
+        BEGIN
+            INSERT INTO clientes_fts (clientes_fts, rowid, nome, telefone)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.telefone);
+        END
+    ''')
+
+def migracao_controle_alteracoes(cursor):
+    """Contador de alterações usado para pular backups repetidos"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS controle_alteracoes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            contador INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO controle_alteracoes (id, contador) VALUES (1, 0)')
+    
+    criar_gatilhos_alteracoes(cursor)
+
+def criar_gatilhos_alteracoes(cursor):
+    """Cria os gatilhos que avançam o contador de alterações."""
+    # Qualquer gravação nas tabelas de dados avança o contador
+    for tabela in ('clientes', 'transacoes', 'pagamentos'):
+        for evento, sufixo in (('INSERT', 'ai'), ('UPDATE', 'au'), ('DELETE', 'ad')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_alteracao_{sufixo}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE controle_alteracoes SET contador = contador + 1 WHERE id = 1;
+                END
+            ''')
+
+# Linhas copiadas por etapa ao converter as tabelas para centavos
+LINHAS_POR_ETAPA_MIGRACAO = 50000
+
+# Tabela -> (definição com valores em centavos, colunas, expressões de cópia)
+TABELAS_EM_CENTAVOS = {
+    'clientes': (
+        '''
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nome TEXT NOT NULL,
             telefone TEXT,
-            limite_fiado REAL DEFAULT 500.00,
+            limite_fiado INTEGER DEFAULT 50000,
             data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP,
             ativo INTEGER DEFAULT 1
-        )
-    ''')
-    
-    # Tabela de Transações (Dívidas)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transacoes (
+        ''',
+        'id, nome, telefone, limite_fiado, data_cadastro, ativo',
+        'id, nome, telefone, CAST(ROUND(limite_fiado * 100) AS INTEGER), data_cadastro, ativo'
+    ),
+    'transacoes': (
+        '''
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             cliente_id INTEGER NOT NULL,
             descricao TEXT NOT NULL,
-            valor REAL NOT NULL,
+            valor INTEGER NOT NULL,
             data TEXT DEFAULT CURRENT_TIMESTAMP,
             pago INTEGER DEFAULT 0,
             FOREIGN KEY (cliente_id) REFERENCES clientes(id)
-        )
-    ''')
-    
-    # Tabela de Pagamentos
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pagamentos (
+        ''',
+        'id, cliente_id, descricao, valor, data, pago',
+        'id, cliente_id, descricao, CAST(ROUND(valor * 100) AS INTEGER), data, pago'
+    ),
+    'pagamentos': (
+        '''
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             cliente_id INTEGER NOT NULL,
-            valor REAL NOT NULL,
+            valor INTEGER NOT NULL,
             observacao TEXT,
             data TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+        ''',
+        'id, cliente_id, valor, observacao, data',
+        'id, cliente_id, CAST(ROUND(valor * 100) AS INTEGER), observacao, data'
+    ),
+}
+
+def migracao_centavos(cursor):
+    """Valores monetários em centavos (INTEGER)"""
+    # Gatilhos que citam uma tabela removida impedem o RENAME: todos são
+    # removidos agora e recriados no final, junto com os índices
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    for gatilho in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER "{gatilho["name"]}"')
+    
+    for tabela, (definicao, colunas, expressoes) in TABELAS_EM_CENTAVOS.items():
+        cursor.execute(f'CREATE TABLE {tabela}_nova ({definicao})')
+        copiar_em_etapas(cursor, tabela, colunas, expressoes)
+        
+        # Preserva o próximo ID do AUTOINCREMENT, mesmo de linhas já apagadas
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (tabela,))
+        sequencia = cursor.fetchone()
+        
+        cursor.execute(f'DROP TABLE {tabela}')
+        cursor.execute(f'ALTER TABLE {tabela}_nova RENAME TO {tabela}')
+        
+        if sequencia is not None:
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (tabela,))
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)',
+                (tabela, sequencia['seq'])
+            )
+    
+    # Os saldos são derivados: basta recriar a tabela e recalcular
+    cursor.execute('DROP TABLE IF EXISTS saldos')
+    cursor.execute('''
+        CREATE TABLE saldos (
+            cliente_id INTEGER PRIMARY KEY,
+            total_dividas INTEGER NOT NULL DEFAULT 0,
+            total_pagamentos INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
         )
     ''')
     
-    conn.commit()
-    conn.close()
-    print("Banco de dados inicializado com sucesso!")
+    criar_indices(cursor)
+    criar_gatilhos_saldos(cursor)
+    criar_gatilhos_alteracoes(cursor)
+    if busca_textual_disponivel(cursor):
+        criar_gatilhos_busca(cursor)
+    
+    recalcular_saldos(cursor)
+    cursor.execute('ANALYZE')
+
+def copiar_em_etapas(cursor, tabela, colunas, expressoes):
+    """Copia `tabela` para `tabela`_nova em blocos ordenados por ID.
+    
+    Tudo acontece na transação da migração: se for interrompida, o banco
+    continua inteiro na versão anterior.
+    """
+    copiadas = 0
+    ultimo_id = 0
+    
+    while True:
+        cursor.execute(f'''
+            INSERT INTO {tabela}_nova ({colunas})
+            SELECT {expressoes} FROM {tabela}
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (ultimo_id, LINHAS_POR_ETAPA_MIGRACAO))
+        
+        if cursor.rowcount <= 0:
+            break
+        
+        copiadas += cursor.rowcount
+        ultimo_id = cursor.execute(f'SELECT MAX(id) FROM {tabela}_nova').fetchone()[0]
+        
+        if copiadas >= LINHAS_POR_ETAPA_MIGRACAO:
+            print(f"  {tabela}: {copiadas} linhas convertidas...")
+
+def migracao_estatisticas(cursor):
+    """Estatísticas gerais mantidas por gatilhos"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estatisticas (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_clientes INTEGER NOT NULL DEFAULT 0,
+            total_dividas INTEGER NOT NULL DEFAULT 0,
+            total_pagamentos INTEGER NOT NULL DEFAULT 0,
+            clientes_com_divida INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    criar_gatilhos_estatisticas(cursor)
+    recalcular_estatisticas(cursor)
+
+def criar_gatilhos_estatisticas(cursor):
+    """Cria os gatilhos que mantêm a linha de estatisticas atualizada.
+    
+    Os totais acompanham as mudanças da tabela saldos (que já recebe todas
+    as compras e pagamentos) e do status ativo dos clientes. Um cliente é
+    devedor quando está ativo e total_dividas > total_pagamentos.
+    """
+    
+    # Saldos: soma as diferenças e conta quem passou a dever ou quitou
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_estatisticas_ai
+        AFTER INSERT ON saldos
+        BEGIN
+            UPDATE estatisticas
+            SET total_dividas = total_dividas + NEW.total_dividas,
+                total_pagamentos = total_pagamentos + NEW.total_pagamentos,
+                clientes_com_divida = clientes_com_divida
+                    + ((NEW.total_dividas > NEW.total_pagamentos)
+                       * EXISTS (SELECT 1 FROM clientes WHERE id = NEW.cliente_id AND ativo IS 1))
+            WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_estatisticas_au
+        AFTER UPDATE ON saldos
+        BEGIN
+            UPDATE estatisticas
+            SET total_dividas = total_dividas + NEW.total_dividas - OLD.total_dividas,
+                total_pagamentos = total_pagamentos + NEW.total_pagamentos - OLD.total_pagamentos,
+                clientes_com_divida = clientes_com_divida
+                    + (((NEW.total_dividas > NEW.total_pagamentos)
+                        - (OLD.total_dividas > OLD.total_pagamentos))
+                       * EXISTS (SELECT 1 FROM clientes WHERE id = NEW.cliente_id AND ativo IS 1))
+            WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_estatisticas_ad
+        AFTER DELETE ON saldos
+        BEGIN
+            UPDATE estatisticas
+            SET total_dividas = total_dividas - OLD.total_dividas,
+                total_pagamentos = total_pagamentos - OLD.total_pagamentos,
+                clientes_com_divida = clientes_com_divida
+                    - ((OLD.total_dividas > OLD.total_pagamentos)
+                       * EXISTS (SELECT 1 FROM clientes WHERE id = OLD.cliente_id AND ativo IS 1))
+            WHERE id = 1;
+        END
+    ''')
+    
+    # Clientes: cadastro, exclusão lógica e remoção
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_estatisticas_ai
+        AFTER INSERT ON clientes
+        BEGIN
+            UPDATE estatisticas
+            SET total_clientes = total_clientes + (NEW.ativo IS 1),
+                clientes_com_divida = clientes_com_divida
+                    + ((NEW.ativo IS 1) * EXISTS (
+                        SELECT 1 FROM saldos WHERE cliente_id = NEW.id
+                        AND total_dividas > total_pagamentos))
+            WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_estatisticas_au
+        AFTER UPDATE OF ativo ON clientes
+        BEGIN
+            UPDATE estatisticas
+            SET total_clientes = total_clientes + (NEW.ativo IS 1) - (OLD.ativo IS 1),
+                clientes_com_divida = clientes_com_divida
+                    + (((NEW.ativo IS 1) - (OLD.ativo IS 1)) * EXISTS (
+                        SELECT 1 FROM saldos WHERE cliente_id = NEW.id
+                        AND total_dividas > total_pagamentos))
+            WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_estatisticas_ad
+        AFTER DELETE ON clientes
+        BEGIN
+            UPDATE estatisticas
+            SET total_clientes = total_clientes - (OLD.ativo IS 1),
+                clientes_com_divida = clientes_com_divida
+                    - ((OLD.ativo IS 1) * EXISTS (
+                        SELECT 1 FROM saldos WHERE cliente_id = OLD.id
+                        AND total_dividas > total_pagamentos))
+            WHERE id = 1;
+        END
+    ''')
+
+# Estatísticas calculadas do zero a partir do histórico (valores em centavos)
+SQL_ESTATISTICAS_COMPLETAS = '''
+    SELECT
+        (SELECT COUNT(*) FROM clientes WHERE ativo = 1) as total_clientes,
+        (SELECT COALESCE(SUM(valor), 0) FROM transacoes) as total_dividas,
+        (SELECT COALESCE(SUM(valor), 0) FROM pagamentos) as total_pagamentos,
+        (SELECT COUNT(*) FROM clientes c
+         WHERE c.ativo = 1
+           AND COALESCE((SELECT SUM(t.valor) FROM transacoes t
+                         WHERE t.cliente_id = c.id), 0)
+             > COALESCE((SELECT SUM(p.valor) FROM pagamentos p
+                         WHERE p.cliente_id = c.id), 0)
+        ) as clientes_com_divida
+'''
+
+def recalcular_estatisticas(cursor):
+    """Refaz a linha de estatisticas a partir do histórico (sem commit)."""
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO estatisticas
+            (id, total_clientes, total_dividas, total_pagamentos, clientes_com_divida)
+        SELECT 1, * FROM ({SQL_ESTATISTICAS_COMPLETAS})
+    ''')
+
+def verificar_estatisticas(corrigir=False):
+    """Confere as estatísticas mantidas pelos gatilhos com um cálculo completo.
+    
+    Args:
+        corrigir: Se True, grava os valores recalculados quando houver diferença
+    
+    Returns:
+        Dicionário {campo: (valor_mantido, valor_calculado)} apenas com os
+        campos divergentes (vazio quando tudo confere), em centavos
+    """
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        mantidas = cursor.execute('SELECT * FROM estatisticas WHERE id = 1').fetchone()
+        calculadas = cursor.execute(SQL_ESTATISTICAS_COMPLETAS).fetchone()
+        
+        divergencias = {
+            campo: (mantidas[campo] if mantidas else None, calculadas[campo])
+            for campo in calculadas.keys()
+            if mantidas is None or mantidas[campo] != calculadas[campo]
+        }
+        
+        if divergencias and corrigir:
+            recalcular_estatisticas(cursor)
+    
+    return divergencias
+
+def migracao_saldos_mensais(cursor):
+    """Saldo de fechamento de cada cliente por mês"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS saldos_mensais (
+            cliente_id INTEGER NOT NULL,
+            mes TEXT NOT NULL,
+            saldo INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (cliente_id, mes)
+        ) WITHOUT ROWID
+    ''')
+    
+    criar_gatilhos_saldos_mensais(cursor)
+    recalcular_saldos_mensais(cursor)
+
+# Aplica um movimento (em centavos, positivo = dívida) ao mês da data e aos
+# meses seguintes: o mês ganha uma linha com o saldo do mês anterior, se
+# ainda não tiver, e todos os fechamentos a partir dele mudam pelo valor.
+# Lançamentos do mês atual (o caso comum) alteram uma única linha.
+SQL_MOVIMENTO_MENSAL = '''
+    INSERT INTO saldos_mensais (cliente_id, mes, saldo)
+    VALUES ({cliente}, substr({data}, 1, 7), COALESCE((
+        SELECT saldo FROM saldos_mensais
+        WHERE cliente_id = {cliente} AND mes < substr({data}, 1, 7)
+        ORDER BY mes DESC LIMIT 1
+    ), 0))
+    ON CONFLICT (cliente_id, mes) DO NOTHING;
+    UPDATE saldos_mensais SET saldo = saldo + ({valor})
+    WHERE cliente_id = {cliente} AND mes >= substr({data}, 1, 7);
+'''
+
+def movimento_mensal(linha, valor):
+    """SQL de SQL_MOVIMENTO_MENSAL para a linha NEW ou OLD de um gatilho."""
+    return SQL_MOVIMENTO_MENSAL.format(
+        cliente=f'{linha}.cliente_id',
+        data=f'{linha}.data',
+        valor=valor.format(linha=linha)
+    )
+
+def criar_gatilhos_saldos_mensais(cursor):
+    """Cria os gatilhos que mantêm os saldos mensais (mesma regra da tabela saldos)."""
+    divida = '{linha}.valor'
+    pagamento = '-{linha}.valor'
+    
+    for tabela, valor, colunas in (
+        ('transacoes', divida, 'cliente_id, valor, data'),
+        ('pagamentos', pagamento, 'cliente_id, valor, data'),
+    ):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_mensal_ai
+            AFTER INSERT ON {tabela}
+            BEGIN
+                {movimento_mensal('NEW', valor)}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_mensal_au
+            AFTER UPDATE OF {colunas} ON {tabela}
+            BEGIN
+                {movimento_mensal('OLD', f'-({valor})')}
+                {movimento_mensal('NEW', valor)}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_mensal_ad
+            AFTER DELETE ON {tabela}
+            BEGIN
+                {movimento_mensal('OLD', f'-({valor})')}
+            END
+        ''')
+
+def recalcular_saldos_mensais(cursor):
+    """Refaz os saldos mensais a partir do histórico, em uma única consulta (sem commit).
+    
+    Cada tabela é lida uma vez e agrupada por cliente e mês; a soma
+    acumulada (função de janela) transforma os movimentos do mês em saldo
+    de fechamento.
+    """
+    cursor.execute('DELETE FROM saldos_mensais')
+    cursor.execute('''
+        INSERT INTO saldos_mensais (cliente_id, mes, saldo)
+        SELECT cliente_id, mes,
+               SUM(SUM(valor)) OVER (PARTITION BY cliente_id ORDER BY mes)
+        FROM (
+            SELECT cliente_id, substr(data, 1, 7) as mes, valor
+            FROM transacoes
+            UNION ALL
+            SELECT cliente_id, substr(data, 1, 7) as mes, -valor
+            FROM pagamentos
+        )
+        GROUP BY cliente_id, mes
+    ''')
+
+def reconstruir_saldos_mensais():
+    """Recalcula todos os saldos mensais a partir do histórico completo."""
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        recalcular_saldos_mensais(conn.cursor())
+
+def migracao_quitacao_fifo(cursor):
+    """Quitação FIFO das compras (pago e valor_pago)"""
+    cursor.execute('ALTER TABLE transacoes ADD COLUMN valor_pago INTEGER NOT NULL DEFAULT 0')
+    
+    # A coluna pago deixa de alterar os saldos: os gatilhos que a usavam são recriados
+    for gatilho in ('saldo_ai', 'saldo_au', 'saldo_ad', 'mensal_ai', 'mensal_au', 'mensal_ad'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_transacoes_{gatilho}')
+    criar_gatilhos_saldos(cursor)
+    criar_gatilhos_saldos_mensais(cursor)
+    
+    criar_indices(cursor)
+    
+    recalcular_quitacoes(cursor)
+    recalcular_saldos(cursor)
+    recalcular_saldos_mensais(cursor)
+    recalcular_estatisticas(cursor)
+
+def migracao_resumos(cursor):
+    """Resumos diário e mensal (vendido, recebido, a receber e devedores)"""
+    for tabela, periodo in TABELAS_RESUMO.items():
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                {periodo} TEXT PRIMARY KEY,
+                vendido INTEGER NOT NULL DEFAULT 0,
+                recebido INTEGER NOT NULL DEFAULT 0,
+                compras INTEGER NOT NULL DEFAULT 0,
+                pagamentos INTEGER NOT NULL DEFAULT 0,
+                variacao_devedores INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+    
+    # Sinal para as cargas em lote, que somam o lote inteiro de uma vez
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS controle_resumos (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            suspenso INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO controle_resumos (id, suspenso) VALUES (1, 0)')
+    
+    criar_gatilhos_resumos(cursor)
+    recalcular_resumos(cursor)
+
+# Tabela de resumo -> coluna do período ('AAAA-MM-DD' ou 'AAAA-MM')
+TABELAS_RESUMO = {
+    'resumo_diario': 'dia',
+    'resumo_mensal': 'mes',
+}
+
+# Tamanho do prefixo de data que forma o período de cada tabela
+TAMANHO_PERIODO_RESUMO = {
+    'resumo_diario': 10,
+    'resumo_mensal': 7,
+}
+
+# Soma um movimento às colunas do período (a linha é criada na primeira vez).
+# Cada compra ou pagamento altera uma única linha por tabela, qualquer que
+# seja a data, então lançamentos retroativos custam o mesmo que os do dia.
+SQL_MOVIMENTO_RESUMO = '''
+    INSERT INTO {tabela} ({periodo}, {colunas})
+    VALUES ({valor_periodo}, {valores})
+    ON CONFLICT ({periodo}) DO UPDATE SET {atualizacao};
+'''
+
+def movimento_resumo(tabela, valor_periodo, colunas):
+    """SQL que soma {coluna: expressão} à linha do período em uma tabela de resumo."""
+    return SQL_MOVIMENTO_RESUMO.format(
+        tabela=tabela,
+        periodo=TABELAS_RESUMO[tabela],
+        valor_periodo=valor_periodo,
+        colunas=', '.join(colunas),
+        valores=', '.join(colunas.values()),
+        atualizacao=', '.join(f'{coluna} = {coluna} + excluded.{coluna}' for coluna in colunas)
+    )
+
+def movimentos_resumo(linha, sinal, valor, contagem):
+    """SQL dos movimentos de uma compra (ou pagamento) nas duas tabelas de resumo."""
+    return ''.join(
+        movimento_resumo(tabela, f'substr({linha}.data, 1, {tamanho})', {
+            valor: f'{sinal}{linha}.valor',
+            contagem: f'{sinal}1',
+        })
+        for tabela, tamanho in TAMANHO_PERIODO_RESUMO.items()
+    )
+
+def variacao_devedores(expressao):
+    """SQL que soma `expressao` aos devedores de hoje nas duas tabelas de resumo."""
+    return ''.join(
+        movimento_resumo(tabela, f"substr(datetime('now'), 1, {tamanho})", {
+            'variacao_devedores': expressao,
+        })
+        for tabela, tamanho in TAMANHO_PERIODO_RESUMO.items()
+    )
+
+def criar_gatilhos_resumos(cursor):
+    """Cria os gatilhos que mantêm os resumos diário e mensal.
+    
+    Vendido, recebido e as contagens acompanham as compras e pagamentos,
+    pela data de cada lançamento. Os devedores são os clientes ativos com
+    saldo (a mesma regra de estatisticas.clientes_com_divida) e acompanham
+    as tabelas saldos e clientes: quando um cliente passa a dever, quita ou
+    é excluído, a variação entra no dia de hoje (a data dos lançamentos
+    feitos pelo sistema). Durante uma carga em lote os gatilhos ficam
+    suspensos (ver carga_em_lote_resumos), e o lote entra de uma vez.
+    """
+    # Fora das cargas em lote, que suspendem os gatilhos
+    ativos = 'NOT (SELECT suspenso FROM controle_resumos WHERE id = 1)'
+    
+    for tabela, valor, contagem in (
+        ('transacoes', 'vendido', 'compras'),
+        ('pagamentos', 'recebido', 'pagamentos'),
+    ):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_ai
+            AFTER INSERT ON {tabela}
+            WHEN {ativos}
+            BEGIN
+                {movimentos_resumo('NEW', '', valor, contagem)}
+            END
+        ''')
+    
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_au
+            AFTER UPDATE OF valor, data ON {tabela}
+            WHEN {ativos}
+            BEGIN
+                {movimentos_resumo('OLD', '-', valor, contagem)}
+                {movimentos_resumo('NEW', '', valor, contagem)}
+            END
+        ''')
+    
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_ad
+            AFTER DELETE ON {tabela}
+            WHEN {ativos}
+            BEGIN
+                {movimentos_resumo('OLD', '-', valor, contagem)}
+            END
+        ''')
+    
+    # Devedores (clientes ativos com saldo): só quando o cliente cruza o zero
+    # ou muda de status, como em criar_gatilhos_estatisticas
+    deve_novo = '(NEW.total_dividas > NEW.total_pagamentos)'
+    deve_antigo = '(OLD.total_dividas > OLD.total_pagamentos)'
+    ativo = 'EXISTS (SELECT 1 FROM clientes WHERE id = {linha}.cliente_id AND ativo IS 1)'
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_resumo_ai
+        AFTER INSERT ON saldos
+        WHEN {deve_novo} AND {ativo.format(linha='NEW')} AND {ativos}
+        BEGIN
+            {variacao_devedores('1')}
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_resumo_au
+        AFTER UPDATE ON saldos
+        WHEN {deve_novo} != {deve_antigo} AND {ativo.format(linha='NEW')} AND {ativos}
+        BEGIN
+            {variacao_devedores(f'{deve_novo} - {deve_antigo}')}
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_saldos_resumo_ad
+        AFTER DELETE ON saldos
+        WHEN {deve_antigo} AND {ativo.format(linha='OLD')} AND {ativos}
+        BEGIN
+            {variacao_devedores('-1')}
+        END
+    ''')
+    
+    # Clientes: cadastro, exclusão lógica e remoção de quem tem saldo
+    com_saldo = '''EXISTS (SELECT 1 FROM saldos WHERE cliente_id = {linha}.id
+                                AND total_dividas > total_pagamentos)'''
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_resumo_ai
+        AFTER INSERT ON clientes
+        WHEN NEW.ativo IS 1 AND {com_saldo.format(linha='NEW')} AND {ativos}
+        BEGIN
+            {variacao_devedores('1')}
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_resumo_au
+        AFTER UPDATE OF ativo ON clientes
+        WHEN (NEW.ativo IS 1) != (OLD.ativo IS 1) AND {com_saldo.format(linha='NEW')} AND {ativos}
+        BEGIN
+            {variacao_devedores('(NEW.ativo IS 1) - (OLD.ativo IS 1)')}
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_resumo_ad
+        AFTER DELETE ON clientes
+        WHEN OLD.ativo IS 1 AND {com_saldo.format(linha='OLD')} AND {ativos}
+        BEGIN
+            {variacao_devedores('-1')}
+        END
+    ''')
+
+def recalcular_resumos(cursor):
+    """Refaz os resumos diário e mensal a partir do histórico (sem commit).
+    
+    Em uma única consulta: os lançamentos são agrupados por dia; o saldo
+    de cada cliente ao fim de cada dia com movimento vem da soma acumulada
+    (função de janela), e a variação de devedores, de quando esse saldo
+    passa a ser positivo ou deixa de ser. O mês é a soma dos seus dias.
+    
+    Com o arquivo morto anexado, o histórico arquivado entra no lugar dos
+    lançamentos de "saldo anterior", e os resumos antigos não mudam com o
+    arquivamento. A data em que um cliente foi excluído não fica gravada:
+    os devedores de todos os períodos contam só os clientes hoje ativos.
+    """
+    anexados = {linha[1] for linha in cursor.execute('PRAGMA database_list').fetchall()}
+    if ESQUEMA_ARQUIVO_MORTO in anexados:
+        esquemas = ['main', ESQUEMA_ARQUIVO_MORTO]
+        filtros = ('WHERE descricao IS NOT :anterior', 'WHERE observacao IS NOT :anterior')
+    else:
+        esquemas = ['main']
+        filtros = ('', '')
+    
+    movimentos = ' UNION ALL '.join(
+        f'''SELECT cliente_id, substr(data, 1, 10) as dia, valor as vendido, 0 as recebido,
+                   1 as compras, 0 as pagamentos
+            FROM {esquema}.transacoes {filtros[0]}
+            UNION ALL
+            SELECT cliente_id, substr(data, 1, 10), 0, valor, 0, 1
+            FROM {esquema}.pagamentos {filtros[1]}'''
+        for esquema in esquemas
+    )
+    
+    cursor.execute('DELETE FROM resumo_diario')
+    cursor.execute(f'''
+        INSERT INTO resumo_diario (dia, vendido, recebido, compras, pagamentos, variacao_devedores)
+        WITH movimentos AS ({movimentos}),
+        saldos_dia AS (
+            SELECT cliente_id, dia,
+                   SUM(SUM(vendido - recebido)) OVER (PARTITION BY cliente_id ORDER BY dia) as saldo
+            FROM movimentos
+            WHERE cliente_id IN (SELECT id FROM main.clientes WHERE ativo = 1)
+            GROUP BY cliente_id, dia
+        ),
+        variacoes AS (
+            SELECT dia, SUM(variacao) as variacao
+            FROM (
+                SELECT dia, (saldo > 0) - COALESCE(
+                           LAG(saldo > 0) OVER (PARTITION BY cliente_id ORDER BY dia), 0
+                       ) as variacao
+                FROM saldos_dia
+            )
+            GROUP BY dia
+        )
+        SELECT m.dia, SUM(m.vendido), SUM(m.recebido), SUM(m.compras), SUM(m.pagamentos),
+               COALESCE(v.variacao, 0)
+        FROM movimentos m
+        LEFT JOIN variacoes v ON v.dia = m.dia
+        GROUP BY m.dia
+    ''', {'anterior': DESCRICAO_SALDO_ANTERIOR})
+    
+    cursor.execute('DELETE FROM resumo_mensal')
+    cursor.execute('''
+        INSERT INTO resumo_mensal (mes, vendido, recebido, compras, pagamentos, variacao_devedores)
+        SELECT substr(dia, 1, 7), SUM(vendido), SUM(recebido), SUM(compras), SUM(pagamentos),
+               SUM(variacao_devedores)
+        FROM resumo_diario
+        GROUP BY substr(dia, 1, 7)
+    ''')
+
+def reconstruir_resumos():
+    """Recalcula os resumos diário e mensal a partir do histórico completo (inclusive o arquivado)."""
+    conn = get_conexao()
+    anexar_arquivo_morto(conn)
+    
+    with transacao_escrita(conn):
+        recalcular_resumos(conn.cursor())
+
+@contextmanager
+def carga_em_lote_resumos(cursor, tabela):
+    """Suspende os gatilhos dos resumos durante uma carga em lote em `tabela` (sem commit).
+    
+    Dentro do bloco, as linhas incluídas não passam pelos gatilhos dos
+    resumos, linha a linha; ao sair, o lote entra nos resumos de uma vez.
+    Se o bloco marcar carga['retroativas'] (datas informadas), os resumos
+    são refeitos com recalcular_resumos(), já que quem passou a dever, e
+    quando, só o histórico completo diz; senão, as compras (ou pagamentos)
+    novas são somadas por período e a variação de devedores, tirada de
+    estatisticas.clientes_com_divida, entra no dia de hoje.
+    
+    A suspensão é gravada na mesma transação da carga, então as outras
+    conexões nunca a enxergam.
+    
+    Args:
+        cursor: Cursor dentro de uma transação de escrita
+        tabela: 'transacoes' ou 'pagamentos'
+    """
+    valor, contagem = {'transacoes': ('vendido', 'compras'), 'pagamentos': ('recebido', 'pagamentos')}[tabela]
+    
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {tabela}')
+    ultimo_id = cursor.fetchone()[0]
+    cursor.execute('SELECT clientes_com_divida FROM estatisticas WHERE id = 1')
+    devedores = cursor.fetchone()[0]
+    
+    cursor.execute('UPDATE controle_resumos SET suspenso = 1 WHERE id = 1')
+    carga = {'retroativas': False}
+    yield carga
+    cursor.execute('UPDATE controle_resumos SET suspenso = 0 WHERE id = 1')
+    
+    if carga['retroativas']:
+        recalcular_resumos(cursor)
+        return
+    
+    for resumo, tamanho in TAMANHO_PERIODO_RESUMO.items():
+        periodo = TABELAS_RESUMO[resumo]
+        cursor.execute(f'''
+            INSERT INTO {resumo} ({periodo}, {valor}, {contagem})
+            SELECT substr(data, 1, {tamanho}), SUM(valor), COUNT(*)
+            FROM {tabela} WHERE id > ?
+            GROUP BY substr(data, 1, {tamanho})
+            ON CONFLICT ({periodo}) DO UPDATE SET
+                {valor} = {valor} + excluded.{valor},
+                {contagem} = {contagem} + excluded.{contagem}
+        ''', (ultimo_id,))
+    
+    cursor.execute('SELECT clientes_com_divida - ? FROM estatisticas WHERE id = 1', (devedores,))
+    variacao = cursor.fetchone()[0]
+    if variacao:
+        for resumo, tamanho in TAMANHO_PERIODO_RESUMO.items():
+            cursor.execute(movimento_resumo(
+                resumo, f"substr(datetime('now'), 1, {tamanho})", {'variacao_devedores': str(variacao)}
+            ))
+
+def migracao_exportacao_incremental(cursor):
+    """Versão das linhas alteradas e marcas da exportação incremental"""
+    for tabela in COLUNAS_VERSIONADAS:
+        cursor.execute(f'ALTER TABLE {tabela} ADD COLUMN versao INTEGER NOT NULL DEFAULT 0')
+    
+        # Só as linhas já alteradas entram no índice (as incluídas ficam com 0)
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_{tabela}_versao
+            ON {tabela} (versao) WHERE versao > 0
+        ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS marcas_exportacao (
+            tabela TEXT PRIMARY KEY,
+            ultimo_id INTEGER NOT NULL,
+            ultima_versao INTEGER NOT NULL,
+            exportado_em TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    
+    criar_gatilhos_versao(cursor)
+
+# Tabela -> colunas cuja alteração faz a linha voltar na exportação incremental
+# (todas as de dados: são também as que avançam o contador de alterações)
+COLUNAS_VERSIONADAS = {
+    'clientes': 'nome, telefone, limite_fiado, ativo',
+    'transacoes': 'cliente_id, descricao, valor, data, pago, valor_pago',
+    'pagamentos': 'cliente_id, valor, observacao, data',
+}
+
+def criar_gatilhos_versao(cursor):
+    """Troca os gatilhos de alteração (UPDATE) por outros que também carimbam a versão.
+    
+    O mesmo gatilho avança o contador de alterações uma única vez por linha,
+    como antes, e grava o novo valor em versao: o cache de leitura continua
+    vendo uma alteração por linha (ver registrar_escrita), e o carimbo, que
+    só muda a coluna versao, não dispara gatilho nenhum. Como as gravações
+    são serializadas (BEGIN IMMEDIATE), uma alteração confirmada depois de
+    uma exportação tem sempre versão maior que o contador lido por ela.
+    Linhas novas ficam com versão 0 e são reconhecidas pelo ID.
+    """
+    for tabela, colunas in COLUNAS_VERSIONADAS.items():
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_{tabela}_alteracao_au')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_{tabela}_alteracao_au
+            AFTER UPDATE OF {colunas} ON {tabela}
+            BEGIN
+                UPDATE controle_alteracoes SET contador = contador + 1 WHERE id = 1;
+                UPDATE {tabela} SET versao = (SELECT contador FROM controle_alteracoes WHERE id = 1)
+                WHERE id = NEW.id;
+            END
+        ''')
+
+# Lista ordenada de migrações: a posição (a partir de 1) é a versão do esquema
+MIGRACOES = [
+    migracao_saldos,
+    migracao_indices,
+    migracao_busca_textual,
+    migracao_controle_alteracoes,
+    migracao_centavos,
+    migracao_estatisticas,
+    migracao_saldos_mensais,
+    migracao_quitacao_fifo,
+    migracao_resumos,
+    migracao_exportacao_incremental,
+]
+
+# ==================== OPERAÇÕES COM CLIENTES ====================
+
+def adicionar_cliente(nome, telefone="", limite_fiado=None):
+    """Adiciona um novo cliente ao banco de dados."""
+    if limite_fiado is None:
+        limite_fiado = get_limite_padrao()
+    
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT INTO clientes (nome, telefone, limite_fiado)
+            VALUES (?, ?, ?)
+        ''', (nome, telefone, para_centavos(limite_fiado)))
+        
+        cliente_id = cursor.lastrowid
+        registrar_escrita(cursor, 1)
+    
+    invalidar_cliente(cliente_id)  # Uma busca anterior pode ter guardado "não existe"
+    
+    return cliente_id
+
+def atualizar_cliente(cliente_id, nome, telefone, limite_fiado):
+    """Atualiza os dados de um cliente existente."""
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE clientes 
+            SET nome = ?, telefone = ?, limite_fiado = ?
+            WHERE id = ?
+        ''', (nome, telefone, para_centavos(limite_fiado), cliente_id))
+        registrar_escrita(cursor, cursor.rowcount)
+    
+    invalidar_cliente(cliente_id)
+
+def excluir_cliente(cliente_id):
+    """Marca um cliente como inativo (exclusão lógica)."""
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        cursor.execute('UPDATE clientes SET ativo = 0 WHERE id = ?', (cliente_id,))
+        registrar_escrita(cursor, cursor.rowcount)
+    
+    invalidar_cliente(cliente_id)
+
+# Colunas de clientes devolvidas pelas consultas, com o limite em reais
+COLUNAS_CLIENTE = '''c.id, c.nome, c.telefone, c.limite_fiado / 100.0 as limite_fiado,
+               c.data_cadastro, c.ativo'''
+
+# A busca textual usa o índice FTS5 (trigramas) a partir deste tamanho de termo
+TAMANHO_MINIMO_BUSCA_FTS = 3
+
+def busca_textual_disponivel(cursor):
+    """Indica se o índice de busca clientes_fts existe neste banco."""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'"
+    )
+    return cursor.fetchone() is not None
+
+def montar_filtro_busca(cursor, termo):
+    """Monta o filtro de busca por nome ou telefone.
+    
+    Usa o índice FTS5 quando disponível e o termo tem ao menos três
+    caracteres; caso contrário recorre ao LIKE.
+    
+    Returns:
+        Tupla (juncao, filtro, parametros, ordem_relevancia)
+    """
+    if len(termo) >= TAMANHO_MINIMO_BUSCA_FTS and busca_textual_disponivel(cursor):
+        # Frase entre aspas: o trigram encontra o termo em qualquer posição
+        frase = '"' + termo.replace('"', '""') + '"'
+        return (
+            'JOIN clientes_fts f ON f.rowid = c.id',
+            'clientes_fts MATCH ?',
+            [frase],
+            'f.rank, c.nome'
+        )
+    
+    return (
+        '',
+        '(c.nome LIKE ? OR c.telefone LIKE ?)',
+        [f'%{termo}%', f'%{termo}%'],
+        'c.nome'
+    )
+
+def buscar_clientes(termo=""):
+    """Busca clientes por nome ou telefone, os mais relevantes primeiro."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    if termo:
+        juncao, filtro, parametros, ordem = montar_filtro_busca(cursor, termo)
+        cursor.execute(f'''
+            SELECT {COLUNAS_CLIENTE}
+            FROM clientes c
+            {juncao}
+            WHERE c.ativo = 1 AND {filtro}
+            ORDER BY {ordem}
+        ''', parametros)
+    else:
+        cursor.execute(f'''
+            SELECT {COLUNAS_CLIENTE}
+            FROM clientes c
+            WHERE c.ativo = 1
+            ORDER BY c.nome
+        ''')
+    
+    clientes = cursor.fetchall()
+    
+    return clientes
+
+# Ordenações aceitas por buscar_clientes_com_saldo
+ORDENS_CLIENTES = {
+    'nome': 'c.nome',
+    'saldo': 'saldo DESC, c.nome',
+    'relevancia': None,  # Definida pelo filtro de busca
+}
+
+def buscar_clientes_com_saldo(termo="", somente_devedores=False, ordem='nome'):
+    """Busca clientes ativos junto com o saldo devedor em uma única consulta.
+    
+    Args:
+        termo: Filtro por nome ou telefone (opcional)
+        somente_devedores: Se True, retorna apenas clientes com saldo > 0
+        ordem: 'nome', 'saldo' (maiores dívidas primeiro) ou 'relevancia'
+            (melhores resultados da busca primeiro)
+    
+    Returns:
+        Lista de linhas com id, nome, telefone, limite_fiado e saldo
+    """
+    return iterar_clientes_com_saldo(termo, somente_devedores, ordem).fetchall()
+
+def iterar_clientes_com_saldo(termo="", somente_devedores=False, ordem='nome'):
+    """Mesma consulta de buscar_clientes_com_saldo, mas devolve o cursor.
+    
+    As linhas são lidas uma a uma conforme o cursor é percorrido, sem
+    carregar todos os clientes na memória (usado na exportação).
+    """
+    if ordem not in ORDENS_CLIENTES:
+        raise ValueError(f"Ordem inválida: {ordem}")
+    
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    juncao = ''
+    filtros = ['c.ativo = 1']
+    parametros = []
+    ordenacao = ORDENS_CLIENTES[ordem] or 'c.nome'
+    
+    if termo:
+        juncao, filtro, parametros, ordem_relevancia = montar_filtro_busca(cursor, termo)
+        filtros.append(filtro)
+        if ordem == 'relevancia':
+            ordenacao = ordem_relevancia
+    
+    if somente_devedores:
+        filtros.append('COALESCE(s.total_dividas - s.total_pagamentos, 0) > 0')
+    
+    cursor.execute(f'''
+        SELECT c.id, c.nome, c.telefone, c.limite_fiado / 100.0 as limite_fiado,
+               MAX(0, COALESCE(s.total_dividas - s.total_pagamentos, 0)) / 100.0 as saldo
+        FROM clientes c
+        {juncao}
+        LEFT JOIN saldos s ON s.cliente_id = c.id
+        WHERE {' AND '.join(filtros)}
+        ORDER BY {ordenacao}
+    ''', parametros)
+    
+    return cursor
+
+def buscar_cliente_por_id(cliente_id):
+    """Busca um cliente específico pelo ID (passando pelo cache de leitura)."""
+    return ler_com_cache(('cliente', int(cliente_id)), ler_cliente_por_id, cliente_id)
+
+def ler_cliente_por_id(cliente_id):
+    """Lê o cliente direto do banco, sem o cache."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute(f'SELECT {COLUNAS_CLIENTE} FROM clientes c WHERE c.id = ?', (cliente_id,))
+    cliente = cursor.fetchone()
+    
+    return cliente
+
+# ==================== OPERAÇÕES COM TRANSAÇÕES ====================
+
+def adicionar_transacao(cliente_id, descricao, valor):
+    """Registra uma nova transação (venda fiada).
+    
+    Com a fila de escrita ativa, a gravação é agrupada com as de outras
+    threads em uma única transação; a função só retorna depois do commit.
+    """
+    transacao_id = executar_escrita(inserir_transacao, cliente_id, descricao, valor)
+    invalidar_cliente(cliente_id)
+    
+    return transacao_id
+
+def inserir_transacao(cursor, cliente_id, descricao, valor):
+    """Insere uma transação, aplica o crédito do cliente e retorna o ID (sem commit)."""
+    cursor.execute('''
+        INSERT INTO transacoes (cliente_id, descricao, valor)
+        VALUES (?, ?, ?)
+    ''', (cliente_id, descricao, para_centavos(valor)))
+    
+    transacao_id = cursor.lastrowid
+    
+    # Um crédito anterior do cliente já quita (parte d)a nova compra
+    credito = credito_apos_compra(cursor, cliente_id, para_centavos(valor))
+    registrar_escrita(cursor, 1 + quitar_compras(cursor, cliente_id, credito))
+    
+    return transacao_id
+
+# ==================== AUTORIZAÇÃO DE CRÉDITO ====================
+# A verificação do limite e o registro da compra acontecem na mesma
+# transação de escrita (BEGIN IMMEDIATE): nenhuma outra venda do mesmo
+# cliente entra entre a leitura do saldo e o INSERT, em qualquer caixa.
+# O saldo vem da tabela saldos (mantida pelos gatilhos), então a
+# verificação é uma única leitura pela chave primária.
+
+# Resultados de autorizar_e_registrar_compra
+AUTORIZACAO_APROVADA = 'aprovada'
+AUTORIZACAO_NEGADA = 'negada'
+AUTORIZACAO_REQUER_LIBERACAO = 'requer_liberacao'  # Passa do limite: precisa de liberação
+
+def autorizar_e_registrar_compra(cliente_id, valor, descricao="Compra", liberar_excesso=False):
+    """Verifica o limite de fiado e registra a compra, atomicamente.
+    
+    Args:
+        cliente_id: ID do cliente
+        valor: Valor da compra em reais
+        descricao: Descrição da compra
+        liberar_excesso: Se True, registra mesmo acima do limite (liberação
+            dada por quem pode autorizar)
+    
+    Returns:
+        Dicionário com resultado (AUTORIZACAO_APROVADA, AUTORIZACAO_NEGADA ou
+        AUTORIZACAO_REQUER_LIBERACAO), motivo, transacao_id (None se não
+        registrou), saldo (depois da compra, se registrada), limite,
+        disponivel (antes da compra) e excedente (quanto passa do limite)
+    """
+    resultado = executar_escrita(autorizar_compra, cliente_id, valor, descricao, liberar_excesso)
+    if resultado['transacao_id'] is not None:
+        invalidar_cliente(cliente_id)
+    
+    return resultado
+
+def autorizar_compra(cursor, cliente_id, valor, descricao, liberar_excesso=False):
+    """Verifica o limite e insere a compra na transação do cursor (sem commit)."""
+    valor_centavos = para_centavos(valor)
+    if valor_centavos is None or valor_centavos <= 0:
+        raise ValueError("O valor da compra deve ser maior que zero")
+    
+    cursor.execute('''
+        SELECT c.ativo, c.limite_fiado,
+               COALESCE(s.total_dividas - s.total_pagamentos, 0) as saldo
+        FROM clientes c
+        LEFT JOIN saldos s ON s.cliente_id = c.id
+        WHERE c.id = ?
+    ''', (cliente_id,))
+    cliente = cursor.fetchone()
+    
+    if cliente is None or not cliente['ativo']:
+        return {
+            'resultado': AUTORIZACAO_NEGADA,
+            'motivo': 'Cliente não encontrado ou excluído',
+            'transacao_id': None,
+            'saldo': None,
+            'limite': None,
+            'disponivel': None,
+            'excedente': None
+        }
+    
+    saldo = max(0, cliente['saldo'])
+    limite = cliente['limite_fiado']
+    excedente = max(0, saldo + valor_centavos - limite)
+    
+    limites = {
+        'limite': para_reais(limite),
+        'disponivel': para_reais(max(0, limite - saldo)),
+        'excedente': para_reais(excedente)
+    }
+    
+    if excedente and not liberar_excesso:
+        return {
+            'resultado': AUTORIZACAO_REQUER_LIBERACAO,
+            'motivo': f'Ultrapassa o limite de fiado em R$ {para_reais(excedente):.2f}',
+            'transacao_id': None,
+            'saldo': para_reais(saldo),
+            **limites
+        }
+    
+    transacao_id = inserir_transacao(cursor, cliente_id, descricao, para_reais(valor_centavos))
+    
+    return {
+        'resultado': AUTORIZACAO_APROVADA,
+        'motivo': 'Limite ultrapassado, com liberação' if excedente else 'Dentro do limite',
+        'transacao_id': transacao_id,
+        'saldo': para_reais(saldo + valor_centavos),
+        **limites
+    }
+
+def buscar_transacoes_cliente(cliente_id):
+    """Busca todas as transações de um cliente."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, cliente_id, descricao, valor / 100.0 as valor, data, pago,
+               valor_pago / 100.0 as valor_pago
+        FROM transacoes
+        WHERE cliente_id = ?
+        ORDER BY data DESC
+    ''', (cliente_id,))
+    
+    transacoes = cursor.fetchall()
+    
+    return transacoes
+
+# ==================== OPERAÇÕES COM PAGAMENTOS ====================
+
+def adicionar_pagamento(cliente_id, valor, observacao=""):
+    """Registra um novo pagamento (agrupado pela fila de escrita, se ativa)."""
+    pagamento_id = executar_escrita(inserir_pagamento, cliente_id, valor, observacao)
+    invalidar_cliente(cliente_id)
+    
+    return pagamento_id
+
+def inserir_pagamento(cursor, cliente_id, valor, observacao=""):
+    """Insere um pagamento, quita as compras mais antigas e retorna o ID (sem commit)."""
+    cursor.execute('''
+        INSERT INTO pagamentos (cliente_id, valor, observacao)
+        VALUES (?, ?, ?)
+    ''', (cliente_id, para_centavos(valor), observacao))
+    
+    pagamento_id = cursor.lastrowid
+    credito = credito_apos_pagamento(cursor, cliente_id, para_centavos(valor))
+    registrar_escrita(cursor, 1 + quitar_compras(cursor, cliente_id, credito))
+    
+    return pagamento_id
+
+def buscar_pagamentos_cliente(cliente_id):
+    """Busca todos os pagamentos de um cliente."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, cliente_id, valor / 100.0 as valor, observacao, data
+        FROM pagamentos
+        WHERE cliente_id = ?
+        ORDER BY data DESC
+    ''', (cliente_id,))
+    
+    pagamentos = cursor.fetchall()
+    
+    return pagamentos
+
+# ==================== QUITAÇÃO FIFO ====================
+# Cada pagamento quita as compras em aberto mais antigas primeiro. O quanto
+# de cada compra já foi pago fica em valor_pago, e pago = 1 quando ela foi
+# quitada por inteiro. O saldo não depende disso (compras - pagamentos);
+# as colunas apenas permitem que relatórios leiam só as compras em aberto.
+#
+# O crédito do cliente (pagamentos ainda não aplicados) é o que resta em
+# aberto menos o saldo: quando há crédito, não há compra em aberto, e vice-
+# versa. Assim, na compra ou no pagamento avulso, o crédito sai direto do
+# saldo (tabela saldos), e as compras em aberto só são lidas quando há
+# crédito a aplicar, e apenas as mais antigas, que ele quita.
+
+# Compras em aberto lidas por vez ao aplicar um pagamento
+COMPRAS_POR_LOTE_QUITACAO = 32
+
+def quitar_compras(cursor, cliente_id, credito=None):
+    """Aplica o crédito do cliente às compras em aberto mais antigas (sem commit).
+    
+    Chamada depois de cada compra ou pagamento gravado.
+    
+    Args:
+        cursor: Cursor da transação em andamento
+        cliente_id: ID do cliente
+        credito: Crédito a aplicar, em centavos, quando quem chama já o
+            conhece pelo saldo (ver credito_apos_compra e
+            credito_apos_pagamento); None soma as compras em aberto
+    
+    Returns:
+        Quantidade de compras atualizadas
+    """
+    if credito is None:
+        cursor.execute('''
+            SELECT COALESCE(SUM(t.valor - t.valor_pago), 0) - s.total_dividas + s.total_pagamentos
+            FROM saldos s
+            LEFT JOIN transacoes t ON t.cliente_id = s.cliente_id AND t.pago = 0
+            WHERE s.cliente_id = ?
+        ''', (cliente_id,))
+        resultado = cursor.fetchone()
+        credito = resultado[0] if resultado and resultado[0] is not None else 0
+    
+    atualizadas = 0
+    while credito > 0:
+        # Em pequenos lotes: um pagamento costuma quitar só as primeiras compras.
+        # As quitadas por inteiro saem do índice parcial (pago = 1) e não voltam
+        # no lote seguinte; a última só fica parcial quando o crédito acaba.
+        cursor.execute('''
+            SELECT id, valor - valor_pago as restante
+            FROM transacoes
+            WHERE cliente_id = ? AND pago = 0
+            ORDER BY data, id
+            LIMIT ?
+        ''', (cliente_id, COMPRAS_POR_LOTE_QUITACAO))
+        abertas = cursor.fetchall()
+        if not abertas:
+            break
+    
+        for compra in abertas:
+            if credito <= 0:
+                break
+    
+            aplicado = min(credito, compra['restante'])
+            cursor.execute('''
+                UPDATE transacoes
+                SET valor_pago = valor_pago + ?, pago = (valor_pago + ? >= valor)
+                WHERE id = ?
+            ''', (aplicado, aplicado, compra['id']))
+    
+            credito -= aplicado
+            atualizadas += 1
+    
+    return atualizadas
+
+def ler_saldo_centavos(cursor, cliente_id):
+    """Saldo do cliente em centavos (negativo = crédito), na transação do cursor."""
+    cursor.execute(
+        'SELECT total_dividas - total_pagamentos FROM saldos WHERE cliente_id = ?',
+        (cliente_id,)
+    )
+    resultado = cursor.fetchone()
+    return resultado[0] if resultado else 0
+
+def credito_apos_compra(cursor, cliente_id, valor):
+    """Crédito a aplicar depois de gravar uma compra de `valor` centavos.
+    
+    Só havia crédito se o saldo antes da compra era negativo, e nesse caso
+    não havia compra em aberto: o crédito cobre (parte d)a nova compra.
+    """
+    saldo_anterior = ler_saldo_centavos(cursor, cliente_id) - valor
+    return max(0, -saldo_anterior)
+
+def credito_apos_pagamento(cursor, cliente_id, valor):
+    """Crédito a aplicar depois de gravar um pagamento de `valor` centavos.
+    
+    Se o saldo antes do pagamento era positivo, não havia crédito e o
+    pagamento inteiro quita compras; caso contrário não há compra em aberto.
+    """
+    saldo_anterior = ler_saldo_centavos(cursor, cliente_id) + valor
+    return valor if saldo_anterior > 0 else 0
+
+def recalcular_quitacoes(cursor, clientes=None):
+    """Refaz pago e valor_pago das compras a partir do histórico (sem commit).
+    
+    Em uma única consulta: o total pago por cada cliente cobre as compras
+    em ordem de data, pela soma acumulada (função de janela). Apenas as
+    compras que mudam são gravadas.
+    
+    Args:
+        cursor: Cursor da transação em andamento
+        clientes: IDs dos clientes a refazer (None refaz todos)
+    """
+    filtro = ''
+    if clientes is not None:
+        cursor.execute('DROP TABLE IF EXISTS temp.quitacoes_clientes')
+        cursor.execute('CREATE TEMP TABLE quitacoes_clientes (cliente_id INTEGER PRIMARY KEY)')
+        cursor.executemany(
+            'INSERT OR IGNORE INTO temp.quitacoes_clientes (cliente_id) VALUES (?)',
+            ((cliente_id,) for cliente_id in clientes)
+        )
+        filtro = 'WHERE {linha}.cliente_id IN (SELECT cliente_id FROM temp.quitacoes_clientes)'
+    
+    cursor.execute('DROP TABLE IF EXISTS temp.quitacoes')
+    cursor.execute('''
+        CREATE TEMP TABLE quitacoes (
+            id INTEGER PRIMARY KEY,
+            valor_pago INTEGER NOT NULL,
+            pago INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute(f'''
+        INSERT INTO temp.quitacoes (id, valor_pago, pago)
+        WITH pagos AS (
+            SELECT cliente_id, SUM(valor) as total
+            FROM pagamentos {filtro.format(linha='pagamentos')}
+            GROUP BY cliente_id
+        ),
+        compras AS (
+            SELECT t.id, t.valor, t.valor_pago as valor_pago_atual, t.pago as pago_atual,
+                   COALESCE(p.total, 0) - (
+                       SUM(t.valor) OVER (
+                           PARTITION BY t.cliente_id ORDER BY t.data, t.id
+                           ROWS UNBOUNDED PRECEDING
+                       ) - t.valor
+                   ) as disponivel
+            FROM transacoes t
+            LEFT JOIN pagos p ON p.cliente_id = t.cliente_id
+            {filtro.format(linha='t')}
+        ),
+        quitadas AS (
+            SELECT id, valor, valor_pago_atual, pago_atual,
+                   MAX(0, MIN(valor, disponivel)) as valor_pago
+            FROM compras
+        )
+        SELECT id, valor_pago, valor_pago >= valor
+        FROM quitadas
+        WHERE valor_pago IS NOT valor_pago_atual OR (valor_pago >= valor) IS NOT pago_atual
+    ''')
+    cursor.execute('''
+        UPDATE transacoes
+        SET valor_pago = (SELECT q.valor_pago FROM temp.quitacoes q WHERE q.id = transacoes.id),
+            pago = (SELECT q.pago FROM temp.quitacoes q WHERE q.id = transacoes.id)
+        WHERE id IN (SELECT id FROM temp.quitacoes)
+    ''')
+    cursor.execute('DROP TABLE temp.quitacoes')
+    cursor.execute('DROP TABLE IF EXISTS temp.quitacoes_clientes')
+
+def reconstruir_quitacoes():
+    """Refaz a quitação FIFO de todas as compras (após correções manuais no histórico)."""
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        recalcular_quitacoes(conn.cursor())
+    
+    limpar_cache()
+
+# ==================== ESCRITA AGRUPADA ====================
+# Em horário de pico, cada venda com o próprio commit custa um fsync, o
+# gargalo em SSDs baratos e cartões SD. A fila de escrita junta as gravações
+# que chegam em poucos milissegundos em uma única transação (group commit):
+# um fsync para o grupo todo. Cada operação roda em um SAVEPOINT, então a
+# falha de uma não desfaz as demais, e os resultados só são entregues depois
+# do commit, em uma conexão com synchronous = FULL (gravação já no disco).
+
+class FilaEscrita:
+    """Thread que grava em grupo as operações enviadas por outras threads."""
+    
+    def __init__(self, janela_ms=2, max_lote=200):
+        self.janela = janela_ms / 1000
+        self.max_lote = max_lote
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._trabalhar, name='fila-escrita', daemon=True)
+        self._thread.start()
+    
+    def enviar(self, funcao, *args):
+        """Agenda funcao(cursor, *args) e retorna um Future com o resultado.
+        
+        O Future é concluído somente depois do commit do grupo.
+        """
+        futuro = Future()
+        self._fila.put((futuro, funcao, args))
+        return futuro
+    
+    def encerrar(self):
+        """Grava as operações pendentes e termina a thread."""
+        self._fila.put(None)
+        self._thread.join()
+    
+    def na_thread_de_escrita(self):
+        """Indica se a thread atual é a própria thread da fila."""
+        return threading.current_thread() is self._thread
+    
+    def _trabalhar(self):
+        conn = get_conexao()
+        conn.execute('PRAGMA synchronous = FULL')  # Commit só retorna com o WAL no disco
+        
+        encerrar = False
+        while not encerrar:
+            item = self._fila.get()
+            if item is None:
+                break
+            
+            # Junta o que chegar dentro da janela, até o tamanho máximo do grupo
+            lote = [item]
+            prazo = time.monotonic() + self.janela
+            while len(lote) < self.max_lote:
+                restante = prazo - time.monotonic()
+                try:
+                    item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    encerrar = True
+                    break
+                lote.append(item)
+            
+            self._gravar_lote(conn, lote)
+        
+        fechar_conexao()
+    
+    def _gravar_lote(self, conn, lote):
+        """Grava o grupo em uma transação e conclui os Futures após o commit."""
+        cursor = conn.cursor()
+        resultados = []
+        
+        try:
+            iniciar_transacao_escrita(conn)
+            for futuro, funcao, args in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                
+                cursor.execute('SAVEPOINT operacao')
+                try:
+                    resultados.append((futuro, funcao(cursor, *args), None))
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO operacao')
+                    resultados.append((futuro, None, e))
+                cursor.execute('RELEASE operacao')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for futuro, _, _ in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        
+        for futuro, resultado, erro in resultados:
+            if erro is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(erro)
+
+# Fila de escrita em uso (None = cada gravação faz o próprio commit)
+_fila_escrita = None
+
+def iniciar_fila_escrita(janela_ms=None, max_lote=None):
+    """Ativa a escrita agrupada conforme config.json (ou os valores informados).
+    
+    Returns:
+        A FilaEscrita iniciada, ou None se a escrita agrupada está desativada
+    """
+    global _fila_escrita
+    
+    configuracao = get_escrita_agrupada()
+    if configuracao is None and janela_ms is None:
+        return None
+    
+    configuracao = configuracao or {}
+    if _fila_escrita is None:
+        _fila_escrita = FilaEscrita(
+            janela_ms if janela_ms is not None else configuracao.get('janela_ms', 2),
+            max_lote if max_lote is not None else configuracao.get('max_lote', 200)
+        )
+    
+    return _fila_escrita
+
+def encerrar_fila_escrita():
+    """Grava o que estiver pendente na fila e volta aos commits individuais."""
+    global _fila_escrita
+    
+    fila, _fila_escrita = _fila_escrita, None
+    if fila is not None:
+        fila.encerrar()
+
+def executar_escrita(funcao, *args):
+    """Executa funcao(cursor, *args) em uma transação e retorna o resultado.
+    
+    Usa a fila de escrita quando ativa (aguardando o commit do grupo);
+    caso contrário grava na hora, com commit próprio.
+    """
+    fila = _fila_escrita
+    if fila is not None and not fila.na_thread_de_escrita():
+        return fila.enviar(funcao, *args).result()
+    
+    with transacao_escrita() as cursor:
+        return funcao(cursor, *args)
+
+# ==================== OPERAÇÕES EM LOTE ====================
+# Inserem muitas linhas com executemany em uma única transação (um único
+# commit/fsync), para migrar cadernos de fiado ou planilhas antigas.
+# Aceitam qualquer iterável, inclusive geradores, sem carregar tudo na memória.
+
+def adicionar_clientes_lote(clientes):
+    """Adiciona vários clientes de uma vez.
+    
+    Args:
+        clientes: Iterável de tuplas (nome, telefone, limite_fiado);
+            limite_fiado None usa o limite padrão
+    
+    Returns:
+        Quantidade de clientes inseridos
+    """
+    limite_padrao = para_centavos(get_limite_padrao())
+    linhas = (
+        (nome, telefone, limite_padrao if limite is None else para_centavos(limite))
+        for nome, telefone, limite in clientes
+    )
+    
+    conn = get_conexao()
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            INSERT INTO clientes (nome, telefone, limite_fiado)
+            VALUES (?, ?, ?)
+        ''', linhas)
+        
+        total = cursor.rowcount
+    
+    limpar_cache()
+    
+    return total
+
+def adicionar_transacoes_lote(transacoes):
+    """Registra várias transações (vendas fiadas) de uma vez.
+    
+    Args:
+        transacoes: Iterável de tuplas (cliente_id, descricao, valor, data);
+            data None usa a data/hora atual
+    
+    Returns:
+        Quantidade de transações inseridas
+    """
+    clientes = set()
+    retroativas = False
+    
+    def linhas():
+        nonlocal retroativas
+        for cliente_id, descricao, valor, data in transacoes:
+            clientes.add(cliente_id)
+            retroativas = retroativas or data is not None
+            yield (cliente_id, descricao, para_centavos(valor), data)
+    
+    conn = get_conexao()
+    anexar_arquivo_morto(conn)
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        # Os resumos recebem o lote inteiro de uma vez, ao fim do bloco
+        with carga_em_lote_resumos(cursor, 'transacoes') as carga:
+            cursor.executemany('''
+                INSERT INTO transacoes (cliente_id, descricao, valor, data)
+                VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ''', linhas())
+            
+            total = cursor.rowcount
+            
+            # Crédito anterior dos clientes quita as novas compras; com datas
+            # informadas, uma compra pode ser anterior às já quitadas, e a
+            # quitação FIFO desses clientes é refeita
+            if retroativas:
+                recalcular_quitacoes(cursor, clientes)
+            else:
+                for cliente_id in clientes:
+                    quitar_compras(cursor, cliente_id)
+            
+            # Datas informadas (planilhas antigas) refazem os resumos
+            carga['retroativas'] = retroativas
+    
+    limpar_cache()
+    
+    return total
+
+def adicionar_pagamentos_lote(pagamentos):
+    """Registra vários pagamentos de uma vez.
+    
+    Args:
+        pagamentos: Iterável de tuplas (cliente_id, valor, observacao, data);
+            data None usa a data/hora atual
+    
+    Returns:
+        Quantidade de pagamentos inseridos
+    """
+    clientes = set()
+    retroativas = False
+    
+    def linhas():
+        nonlocal retroativas
+        for cliente_id, valor, observacao, data in pagamentos:
+            clientes.add(cliente_id)
+            retroativas = retroativas or data is not None
+            yield (cliente_id, para_centavos(valor), observacao, data)
+    
+    conn = get_conexao()
+    anexar_arquivo_morto(conn)
+    
+    with transacao_escrita(conn):
+        cursor = conn.cursor()
+        
+        # Os resumos recebem o lote inteiro de uma vez, ao fim do bloco
+        with carga_em_lote_resumos(cursor, 'pagamentos') as carga:
+            cursor.executemany('''
+                INSERT INTO pagamentos (cliente_id, valor, observacao, data)
+                VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ''', linhas())
+            
+            total = cursor.rowcount
+            
+            # Quitação FIFO uma vez por cliente, depois de todo o lote (refeita
+            # por inteiro quando há datas informadas, como nas compras)
+            if retroativas:
+                recalcular_quitacoes(cursor, clientes)
+            else:
+                for cliente_id in clientes:
+                    quitar_compras(cursor, cliente_id)
+            
+            # Datas informadas (planilhas antigas) refazem os resumos
+            carga['retroativas'] = retroativas
+    
+    limpar_cache()
+    
+    return total
+
+# ==================== CÁLCULOS E RELATÓRIOS ====================
+
+def calcular_saldo_cliente(cliente_id):
+    """Retorna o saldo devedor de um cliente (Transações - Pagamentos).
+    
+    O saldo é mantido pelos gatilhos da tabela saldos, então a consulta
+    é uma simples leitura pela chave primária (em centavos, sem erro de
+    arredondamento acumulado), ainda guardada no cache de leitura.
+    """
+    return ler_com_cache(('saldo', int(cliente_id)), ler_saldo_cliente, cliente_id)
+
+def ler_saldo_cliente(cliente_id):
+    """Lê o saldo direto da tabela saldos, sem o cache."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT total_dividas - total_pagamentos as saldo
+        FROM saldos
+        WHERE cliente_id = ?
+    ''', (cliente_id,))
+    resultado = cursor.fetchone()
+    
+    
+    if resultado is None:
+        return 0
+    return para_reais(max(0, resultado['saldo']))  # Não pode ser negativo
+
+def normalizar_data_limite(data):
+    """Converte date, datetime ou texto no instante final correspondente ('AAAA-MM-DD HH:MM:SS').
+    
+    Uma data sem hora vale até o fim do dia.
+    """
+    if isinstance(data, datetime):
+        return data.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(data, 'strftime'):  # date
+        return data.strftime('%Y-%m-%d') + ' 23:59:59'
+    
+    data = str(data).strip()
+    if len(data) == 10:
+        return data + ' 23:59:59'
+    return data
+
+def saldo_em(cliente_id, data):
+    """Retorna o saldo devedor de um cliente ao final de uma data.
+    
+    Parte do fechamento do mês anterior (tabela saldos_mensais) e soma só
+    os lançamentos do próprio mês até a data, pelos índices (cliente_id,
+    data). Datas anteriores a um histórico arquivado consideram apenas o
+    que ficou no banco principal.
+    
+    Args:
+        cliente_id: ID do cliente
+        data: date, datetime ou texto 'AAAA-MM-DD[ HH:MM:SS]'
+    """
+    limite = normalizar_data_limite(data)
+    parametros = {'cliente_id': cliente_id, 'mes': limite[:7], 'limite': limite}
+    
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT
+            COALESCE((SELECT saldo FROM saldos_mensais
+                      WHERE cliente_id = :cliente_id AND mes < :mes
+                      ORDER BY mes DESC LIMIT 1), 0)
+          + COALESCE((SELECT SUM(valor) FROM transacoes
+                      WHERE cliente_id = :cliente_id
+                        AND data >= :mes AND data <= :limite), 0)
+          - COALESCE((SELECT SUM(valor) FROM pagamentos
+                      WHERE cliente_id = :cliente_id
+                        AND data >= :mes AND data <= :limite), 0) as saldo
+    ''', parametros)
+    
+    return para_reais(max(0, cursor.fetchone()['saldo']))
+
+def buscar_fechamento_mensal(mes, somente_devedores=False):
+    """Saldo de fechamento de todos os clientes ativos em um mês.
+    
+    Cada saldo é o do último mês com movimento até `mes`, lido pela chave
+    primária de saldos_mensais, sem percorrer o histórico.
+    
+    Args:
+        mes: Mês no formato 'AAAA-MM'
+        somente_devedores: Se True, retorna apenas clientes com saldo > 0
+    
+    Returns:
+        Lista de linhas com id, nome, telefone e saldo, ordenada por nome
+    """
+    filtro = 'WHERE saldo > 0' if somente_devedores else ''
+    
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute(f'''
+        SELECT * FROM (
+            SELECT c.id, c.nome, c.telefone,
+                   MAX(0, COALESCE((SELECT s.saldo FROM saldos_mensais s
+                                    WHERE s.cliente_id = c.id AND s.mes <= :mes
+                                    ORDER BY s.mes DESC LIMIT 1), 0)) / 100.0 as saldo
+            FROM clientes c
+            WHERE c.ativo = 1
+        )
+        {filtro}
+        ORDER BY nome
+    ''', {'mes': mes})
+    
+    fechamento = cursor.fetchall()
+    
+    return fechamento
+
+def buscar_historico_cliente(cliente_id, incluir_arquivo=False):
+    """Busca o histórico completo de transações e pagamentos de um cliente.
+    
+    Com incluir_arquivo=True, inclui também o histórico movido para o
+    arquivo morto (ver arquivar_historico).
+    """
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    # União de transações e pagamentos ordenados por data
+    partes = []
+    for esquema in esquemas_historico(conn, incluir_arquivo):
+        partes.append(f'''
+            SELECT 'COMPRA' as tipo, descricao, valor / 100.0 as valor, data 
+            FROM {esquema}.transacoes WHERE cliente_id = :cliente_id
+            UNION ALL
+            SELECT 'PAGAMENTO' as tipo, observacao as descricao, valor / 100.0 as valor, data 
+            FROM {esquema}.pagamentos WHERE cliente_id = :cliente_id
+        ''')
+    
+    cursor.execute(
+        ' UNION ALL '.join(partes) + ' ORDER BY data DESC',
+        {'cliente_id': cliente_id}
+    )
+    
+    historico = cursor.fetchall()
+    
+    return historico
 
-# ==================== OPERAÇÕES COM CLIENTES ====================
+# Cada lado do histórico paginado: lê no máximo `limite` linhas pelo índice
+# (cliente_id, data) de uma tabela, em um dos arquivos do banco
+SQL_HISTORICO_PARTE = {
+    'COMPRA': '''
+        SELECT * FROM (
+            SELECT 'COMPRA' as tipo, id, descricao, valor / 100.0 as valor, data
+            FROM {esquema}.transacoes
+            WHERE cliente_id = :cliente_id {filtro}
+            ORDER BY data DESC, id DESC
+            LIMIT :limite
+        )
+    ''',
+    'PAGAMENTO': '''
+        SELECT * FROM (
+            SELECT 'PAGAMENTO' as tipo, id, observacao as descricao, valor / 100.0 as valor, data
+            FROM {esquema}.pagamentos
+            WHERE cliente_id = :cliente_id {filtro}
+            ORDER BY data DESC, id DESC
+            LIMIT :limite
+        )
+    ''',
+}
 
-def adicionar_cliente(nome, telefone="", limite_fiado=None):
-    """Adiciona um novo cliente ao banco de dados."""
-    if limite_fiado is None:
-        limite_fiado = get_limite_padrao()
+# Ordem do histórico paginado: data, depois tipo e id para desempatar
+# lançamentos no mesmo segundo
+ORDEM_HISTORICO_PAGINA = '''
+    ORDER BY data DESC, tipo DESC, id DESC
+    LIMIT :limite
+'''
+
+# Linhas estritamente posteriores ao cursor (data, tipo, id) na ordem acima
+FILTRO_APOS_CURSOR = '''
+    AND data <= :data
+    AND (data < :data OR :tipo > '{tipo}' OR (:tipo = '{tipo}' AND id < :id))
+'''
+
+def buscar_historico_pagina(cliente_id, antes_de=None, limite=100, incluir_arquivo=False):
+    """Busca uma página do histórico de um cliente (mais recentes primeiro).
+    
+    Usa paginação por chave (keyset): cada página começa logo depois da
+    última linha da anterior, lendo só as linhas necessárias pelos índices
+    (cliente_id, data), por mais longo que seja o histórico.
+    
+    Args:
+        cliente_id: ID do cliente
+        antes_de: Última linha da página anterior (ou tupla (data, tipo, id));
+            None para a primeira página
+        limite: Quantidade máxima de linhas da página
+        incluir_arquivo: Se True, inclui o histórico do arquivo morto (os IDs
+            são preservados ao arquivar, então a paginação continua única)
+    
+    Returns:
+        Lista de linhas com tipo, id, descricao, valor e data. Uma página
+        com menos de `limite` linhas indica o fim do histórico.
+    """
+    parametros = {'cliente_id': cliente_id, 'limite': limite}
+    filtros = {'COMPRA': '', 'PAGAMENTO': ''}
+    
+    if antes_de is not None:
+        if isinstance(antes_de, (tuple, list)):
+            data, tipo, id_ = antes_de
+        else:
+            data, tipo, id_ = antes_de['data'], antes_de['tipo'], antes_de['id']
+        parametros.update({'data': data, 'tipo': tipo, 'id': id_})
+        filtros = {tipo: FILTRO_APOS_CURSOR.format(tipo=tipo) for tipo in filtros}
     
     conn = get_conexao()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO clientes (nome, telefone, limite_fiado)
-        VALUES (?, ?, ?)
-    ''', (nome, telefone, limite_fiado))
+    partes = [
+        SQL_HISTORICO_PARTE[tipo].format(esquema=esquema, filtro=filtro)
+        for esquema in esquemas_historico(conn, incluir_arquivo)
+        for tipo, filtro in filtros.items()
+    ]
+    cursor.execute(' UNION ALL '.join(partes) + ORDEM_HISTORICO_PAGINA, parametros)
     
-    cliente_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    pagina = cursor.fetchall()
     
-    return cliente_id
+    return pagina
 
-def atualizar_cliente(cliente_id, nome, telefone, limite_fiado):
-    """Atualiza os dados de um cliente existente."""
+def iterar_historico_geral():
+    """Percorre o histórico de compras e pagamentos de todos os clientes ativos.
+    
+    Retorna um cursor ordenado por cliente (nome) e data decrescente. Cada
+    lado da união é lido já ordenado pelos índices e o SQLite apenas
+    intercala os dois fluxos, sem ordenar o histórico inteiro em memória.
+    """
     conn = get_conexao()
     cursor = conn.cursor()
     
     cursor.execute('''
-        UPDATE clientes 
-        SET nome = ?, telefone = ?, limite_fiado = ?
-        WHERE id = ?
-    ''', (nome, telefone, limite_fiado, cliente_id))
+        SELECT c.nome, c.id as cliente_id, 'COMPRA' as tipo,
+               t.descricao, t.valor / 100.0 as valor, t.data
+        FROM clientes c
+        JOIN transacoes t ON t.cliente_id = c.id
+        WHERE c.ativo = 1
+        UNION ALL
+        SELECT c.nome, c.id as cliente_id, 'PAGAMENTO' as tipo,
+               p.observacao as descricao, p.valor / 100.0 as valor, p.data
+        FROM clientes c
+        JOIN pagamentos p ON p.cliente_id = c.id
+        WHERE c.ativo = 1
+        ORDER BY nome, cliente_id, data DESC
+    ''')
     
-    conn.commit()
-    conn.close()
+    return cursor
 
-def excluir_cliente(cliente_id):
-    """Marca um cliente como inativo (exclusão lógica)."""
+def obter_estatisticas():
+    """Retorna estatísticas gerais do sistema.
+    
+    Os totais são mantidos pelos gatilhos da tabela estatisticas, então a
+    consulta é a leitura de uma única linha, qualquer que seja o tamanho
+    do banco. Use verificar_estatisticas() para conferi-los.
+    """
     conn = get_conexao()
     cursor = conn.cursor()
     
-    cursor.execute('UPDATE clientes SET ativo = 0 WHERE id = ?', (cliente_id,))
+    cursor.execute('SELECT * FROM estatisticas WHERE id = 1')
+    estatisticas = cursor.fetchone()
     
-    conn.commit()
-    conn.close()
+    total_dividas = estatisticas['total_dividas']
+    total_pagamentos = estatisticas['total_pagamentos']
+    total_aberto = max(0, total_dividas - total_pagamentos)
+    
+    return {
+        'total_clientes': estatisticas['total_clientes'],
+        'total_aberto': para_reais(total_aberto),
+        'total_dividas': para_reais(total_dividas),
+        'total_pagamentos': para_reais(total_pagamentos),
+        'clientes_com_divida': estatisticas['clientes_com_divida']
+    }
 
-def buscar_clientes(termo=""):
-    """Busca clientes por nome ou telefone."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+def obter_clientes_com_divida():
+    """Retorna lista de clientes que possuem dívidas em aberto."""
+    clientes = buscar_clientes_com_saldo(somente_devedores=True)
     
-    if termo:
-        cursor.execute('''
-            SELECT * FROM clientes 
-            WHERE ativo = 1 AND (nome LIKE ? OR telefone LIKE ?)
-            ORDER BY nome
-        ''', (f'%{termo}%', f'%{termo}%'))
-    else:
-        cursor.execute('SELECT * FROM clientes WHERE ativo = 1 ORDER BY nome')
+    return [
+        {
+            'id': cliente['id'],
+            'nome': cliente['nome'],
+            'telefone': cliente['telefone'],
+            'saldo': cliente['saldo']
+        }
+        for cliente in clientes
+    ]
+
+# ==================== RESUMOS DIÁRIO E MENSAL ====================
+# Vendido e recebido por dia e por mês, mantidos pelos gatilhos a cada
+# gravação (ver criar_gatilhos_resumos). O total a receber e a quantidade
+# de devedores ao fim de cada período são somas acumuladas das variações,
+# calculadas na consulta sobre tabelas de uma linha por período.
+
+SQL_RESUMO = '''
+    SELECT * FROM (
+        SELECT {periodo} as periodo,
+               vendido / 100.0 as vendido,
+               recebido / 100.0 as recebido,
+               compras,
+               pagamentos,
+               SUM(vendido - recebido) OVER (ORDER BY {periodo}) / 100.0 as a_receber,
+               SUM(variacao_devedores) OVER (ORDER BY {periodo}) as devedores
+        FROM {tabela}
+    )
+    WHERE (:inicio IS NULL OR periodo >= :inicio)
+      AND (:fim IS NULL OR periodo <= :fim)
+    ORDER BY periodo
+'''
+
+def buscar_resumo(tabela, inicio=None, fim=None):
+    """Lê um período de uma tabela de resumo (resumo_diario ou resumo_mensal).
     
-    clientes = cursor.fetchall()
-    conn.close()
+    Args:
+        tabela: 'resumo_diario' ou 'resumo_mensal'
+        inicio: Primeiro período incluído (None = desde o início)
+        fim: Último período incluído (None = até o último)
+    
+    Returns:
+        Lista de linhas com periodo, vendido, recebido, compras, pagamentos,
+        a_receber (total em aberto ao fim do período) e devedores
+    """
+    if tabela not in TABELAS_RESUMO:
+        raise ValueError(f"Tabela de resumo inválida: {tabela}")
     
-    return clientes
-
-def buscar_cliente_por_id(cliente_id):
-    """Busca um cliente específico pelo ID."""
     conn = get_conexao()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM clientes WHERE id = ?', (cliente_id,))
-    cliente = cursor.fetchone()
+    cursor.execute(
+        SQL_RESUMO.format(tabela=tabela, periodo=TABELAS_RESUMO[tabela]),
+        {'inicio': inicio, 'fim': fim}
+    )
     
-    conn.close()
-    return cliente
+    return cursor.fetchall()
 
-# ==================== OPERAÇÕES COM TRANSAÇÕES ====================
+def buscar_resumo_diario(inicio=None, fim=None):
+    """Resumo de cada dia com movimento, entre as datas 'AAAA-MM-DD' informadas."""
+    return buscar_resumo('resumo_diario', inicio, fim)
 
-def adicionar_transacao(cliente_id, descricao, valor):
-    """Registra uma nova transação (venda fiada)."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+def buscar_resumo_mensal(inicio=None, fim=None):
+    """Resumo de cada mês com movimento, entre os meses 'AAAA-MM' informados."""
+    return buscar_resumo('resumo_mensal', inicio, fim)
+
+# ==================== ENVELHECIMENTO DAS DÍVIDAS ====================
+# Quanto de cada dívida está em aberto há quanto tempo. Os pagamentos quitam
+# as compras mais antigas primeiro (FIFO, ver quitar_compras): o que resta
+# de cada compra fica em valor - valor_pago, e só as compras em aberto
+# (pago = 0, uma pequena parte do histórico) são lidas, pelo índice parcial
+# idx_transacoes_abertas, em uma única consulta para todos os clientes.
+
+# Ordenações aceitas pelo relatório de envelhecimento
+ORDENS_ENVELHECIMENTO = {
+    'atraso': 'dias_90 DESC, dias_60 DESC, dias_30 DESC, nome',
+    'total': 'total DESC, nome',
+    'nome': 'nome',
+}
+
+SQL_ENVELHECIMENTO = '''
+    WITH em_aberto AS (
+        SELECT cliente_id,
+               valor - valor_pago as restante,
+               julianday(:referencia) - julianday(data) as dias
+        FROM transacoes
+        WHERE pago = 0
+    )
+    SELECT c.id, c.nome, c.telefone,
+           SUM(e.restante) / 100.0 as total,
+           SUM(CASE WHEN e.dias < 30 THEN e.restante ELSE 0 END) / 100.0 as atual,
+           SUM(CASE WHEN e.dias >= 30 AND e.dias < 60 THEN e.restante ELSE 0 END) / 100.0 as dias_30,
+           SUM(CASE WHEN e.dias >= 60 AND e.dias < 90 THEN e.restante ELSE 0 END) / 100.0 as dias_60,
+           SUM(CASE WHEN e.dias >= 90 THEN e.restante ELSE 0 END) / 100.0 as dias_90,
+           CAST(MAX(e.dias) AS INTEGER) as dias_mais_antiga
+    FROM em_aberto e
+    JOIN clientes c ON c.id = e.cliente_id
+    WHERE c.ativo = 1
+    GROUP BY c.id
+    HAVING SUM(e.restante) > 0
+    ORDER BY {ordem}
+'''
+
+def iterar_envelhecimento_dividas(referencia=None, ordem='atraso'):
+    """Envelhecimento das dívidas em aberto de cada cliente (faixas de 30/60/90+ dias).
     
-    cursor.execute('''
-        INSERT INTO transacoes (cliente_id, descricao, valor)
-        VALUES (?, ?, ?)
-    ''', (cliente_id, descricao, valor))
+    Devolve o cursor, lido linha a linha conforme é percorrido (usado
+    pela exportação); a interface usa buscar_envelhecimento_dividas.
     
-    transacao_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    Args:
+        referencia: Data de referência para contar os dias (padrão: agora)
+        ordem: 'atraso' (mais atrasados primeiro), 'total' ou 'nome'
+    
+    Returns:
+        Cursor de linhas com id, nome, telefone, total, atual (até 29
+        dias), dias_30, dias_60, dias_90 (90 ou mais) e dias_mais_antiga
+    """
+    if ordem not in ORDENS_ENVELHECIMENTO:
+        raise ValueError(f"Ordem inválida: {ordem}")
+    
+    referencia = 'now' if referencia is None else normalizar_data_limite(referencia)
     
-    return transacao_id
-
-def buscar_transacoes_cliente(cliente_id):
-    """Busca todas as transações de um cliente."""
     conn = get_conexao()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT * FROM transacoes 
-        WHERE cliente_id = ?
-        ORDER BY data DESC
-    ''', (cliente_id,))
+    cursor.execute(
+        SQL_ENVELHECIMENTO.format(ordem=ORDENS_ENVELHECIMENTO[ordem]),
+        {'referencia': referencia}
+    )
     
-    transacoes = cursor.fetchall()
-    conn.close()
+    return cursor
+
+def buscar_envelhecimento_dividas(referencia=None, ordem='atraso'):
+    """Mesma consulta de iterar_envelhecimento_dividas, já como lista."""
+    return iterar_envelhecimento_dividas(referencia, ordem).fetchall()
+
+def exportar_envelhecimento_csv(caminho_arquivo, referencia=None):
+    """Exporta o envelhecimento das dívidas para CSV, linha a linha."""
+    import csv
     
-    return transacoes
+    with open(caminho_arquivo, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        
+        writer.writerow(['=== ENVELHECIMENTO DAS DÍVIDAS ==='])
+        writer.writerow(['Data de Geração:', datetime.now().strftime('%d/%m/%Y %H:%M:%S')])
+        writer.writerow([])
+        writer.writerow([
+            'Nome', 'Telefone', 'Total', 'Até 29 dias', '30 a 59 dias',
+            '60 a 89 dias', '90+ dias', 'Dias da mais antiga'
+        ])
+        
+        writer.writerows(
+            [
+                linha['nome'],
+                linha['telefone'] or '',
+                f"R$ {linha['total']:.2f}",
+                f"R$ {linha['atual']:.2f}",
+                f"R$ {linha['dias_30']:.2f}",
+                f"R$ {linha['dias_60']:.2f}",
+                f"R$ {linha['dias_90']:.2f}",
+                linha['dias_mais_antiga']
+            ]
+            for linha in iterar_envelhecimento_dividas(referencia)
+        )
+    
+    return caminho_arquivo
 
-# ==================== OPERAÇÕES COM PAGAMENTOS ====================
+# ==================== ARQUIVO MORTO ====================
+# O histórico já quitado e os clientes excluídos (ativo = 0) saem das tabelas
+# principais para um segundo arquivo SQLite, anexado com ATTACH somente
+# quando necessário. As tabelas do dia a dia ficam pequenas o bastante para
+# caber no cache, e os IDs são preservados, então o histórico pode ser
+# consultado nos dois arquivos como se fossem um só.
 
-def adicionar_pagamento(cliente_id, valor, observacao=""):
-    """Registra um novo pagamento."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+ESQUEMA_ARQUIVO_MORTO = 'arquivo_morto'
+
+# Descrição dos lançamentos que levam o saldo do histórico arquivado
+DESCRICAO_SALDO_ANTERIOR = 'Saldo anterior (histórico arquivado)'
+
+def caminho_arquivo_morto():
+    """Retorna o caminho do arquivo morto do banco atual."""
+    return os.path.splitext(ARQUIVO_DB)[0] + '_arquivo.db'
+
+def arquivo_morto_disponivel():
+    """Indica se já existe histórico arquivado para o banco atual."""
+    return os.path.exists(caminho_arquivo_morto())
+
+def anexar_arquivo_morto(conn, criar=False):
+    """Anexa o arquivo morto à conexão (uma única vez por conexão).
     
-    cursor.execute('''
-        INSERT INTO pagamentos (cliente_id, valor, observacao)
-        VALUES (?, ?, ?)
-    ''', (cliente_id, valor, observacao))
+    Args:
+        conn: Conexão que passará a enxergar o esquema arquivo_morto
+        criar: Se True, cria o arquivo e as tabelas caso ainda não existam
     
-    pagamento_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    Returns:
+        True se o arquivo morto está anexado
+    """
+    anexados = {linha['name'] for linha in conn.execute('PRAGMA database_list')}
+    if ESQUEMA_ARQUIVO_MORTO in anexados:
+        return True
     
-    return pagamento_id
+    if not criar and not arquivo_morto_disponivel():
+        return False
+    
+    conn.execute(f'ATTACH DATABASE ? AS {ESQUEMA_ARQUIVO_MORTO}', (caminho_arquivo_morto(),))
+    return True
 
-def buscar_pagamentos_cliente(cliente_id):
-    """Busca todos os pagamentos de um cliente."""
+def esquemas_historico(conn, incluir_arquivo=False):
+    """Esquemas em que o histórico deve ser lido ('main' e, se pedido, o arquivo morto)."""
+    if incluir_arquivo and anexar_arquivo_morto(conn):
+        return ['main', ESQUEMA_ARQUIVO_MORTO]
+    return ['main']
+
+# Colunas acrescentadas às tabelas depois da migração para centavos
+# (quitação FIFO e versão da exportação incremental), que o arquivo morto
+# também guarda
+COLUNAS_POSTERIORES = {
+    'clientes': {'versao': 'INTEGER NOT NULL DEFAULT 0'},
+    'transacoes': {
+        'valor_pago': 'INTEGER NOT NULL DEFAULT 0',
+        'versao': 'INTEGER NOT NULL DEFAULT 0',
+    },
+    'pagamentos': {'versao': 'INTEGER NOT NULL DEFAULT 0'},
+}
+
+def colunas_arquivo_morto(tabela):
+    """Lista das colunas de `tabela` copiadas para o arquivo morto."""
+    return TABELAS_EM_CENTAVOS[tabela][1].split(', ') + list(COLUNAS_POSTERIORES[tabela])
+
+def criar_tabelas_arquivo_morto(cursor):
+    """Cria no arquivo morto as tabelas de dados, com a mesma estrutura das principais.
+    
+    Arquivos mortos criados antes das colunas de COLUNAS_POSTERIORES as
+    recebem aqui.
+    """
+    for tabela, (definicao, _, _) in TABELAS_EM_CENTAVOS.items():
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {ESQUEMA_ARQUIVO_MORTO}.{tabela} ({definicao})')
+        
+        cursor.execute(f'PRAGMA {ESQUEMA_ARQUIVO_MORTO}.table_info({tabela})')
+        existentes = {linha['name'] for linha in cursor.fetchall()}
+        for coluna, tipo in COLUNAS_POSTERIORES[tabela].items():
+            if coluna not in existentes:
+                cursor.execute(f'ALTER TABLE {ESQUEMA_ARQUIVO_MORTO}.{tabela} ADD COLUMN {coluna} {tipo}')
+    
+    for tabela in ('transacoes', 'pagamentos'):
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {ESQUEMA_ARQUIVO_MORTO}.idx_{tabela}_cliente_data
+            ON {tabela} (cliente_id, data)
+        ''')
+
+def arquivar_historico(idade_dias=None, compactar=False):
+    """Move para o arquivo morto o histórico quitado antigo e os clientes excluídos.
+    
+    De cada cliente ativo é arquivado o histórico até o último momento,
+    anterior ao corte, em que o saldo estava quitado (zero ou a favor do
+    cliente). Um lançamento de "saldo anterior" fica no lugar quando o
+    trecho arquivado não soma zero, de modo que os saldos não mudam.
+    Clientes excluídos vão inteiros para o arquivo morto, com o histórico.
+    
+    O SQLite não confirma de forma atômica uma transação que grava em dois
+    arquivos com WAL, então são duas: a primeira só copia para o arquivo
+    morto; a segunda só remove do banco principal as linhas que já têm
+    cópia idêntica lá. Uma interrupção entre as duas deixa linhas
+    duplicadas, nunca perdidas, e como as linhas mantêm os IDs, repetir o
+    arquivamento completa o trabalho sem duplicar nada no arquivo morto.
+    
+    Args:
+        idade_dias: Só arquiva lançamentos mais antigos que isso (padrão:
+            arquivamento.idade_dias do config.json)
+        compactar: Se True, executa VACUUM no banco principal ao final
+    
+    Returns:
+        Dicionário com as quantidades de clientes, transações e pagamentos
+        movidos
+    """
+    if idade_dias is None:
+        idade_dias = get_arquivamento()['idade_dias']
+    
     conn = get_conexao()
+    anexar_arquivo_morto(conn, criar=True)
+    
     cursor = conn.cursor()
+    try:
+        # 1ª etapa: grava somente no arquivo morto
+        with transacao_escrita(conn):
+            criar_tabelas_arquivo_morto(cursor)
+            selecionar_historico_quitado(cursor, f'-{int(idade_dias)} days')
+            copiar_clientes_inativos(cursor)
+            copiar_historico_quitado(cursor)
     
-    cursor.execute('''
-        SELECT * FROM pagamentos 
-        WHERE cliente_id = ?
-        ORDER BY data DESC
-    ''', (cliente_id,))
+        # 2ª etapa: grava somente no banco principal
+        with transacao_escrita(conn):
+            resumo = remover_clientes_inativos(cursor)
+            quitado = remover_historico_quitado(cursor)
+            for tabela, total in quitado.items():
+                resumo[tabela] += total
     
-    pagamentos = cursor.fetchall()
-    conn.close()
+            # O histórico movido continua nos resumos, agora lido do arquivo morto
+            recalcular_resumos(cursor)
+    finally:
+        cursor.execute('DROP TABLE IF EXISTS temp.arquivamento')
     
-    return pagamentos
+    limpar_cache()
+    
+    if compactar:
+        conn.execute('VACUUM')  # Devolve ao sistema as páginas liberadas
+    
+    return resumo
 
-# ==================== CÁLCULOS E RELATÓRIOS ====================
+def copiar_para_arquivo_morto(cursor, tabela, filtro, parametros=()):
+    """Copia para o arquivo morto as linhas de `tabela` que atendem ao filtro."""
+    colunas = ', '.join(colunas_arquivo_morto(tabela))
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO {ESQUEMA_ARQUIVO_MORTO}.{tabela} ({colunas})
+        SELECT {colunas} FROM main.{tabela} WHERE {filtro}
+    ''', parametros)
+    return cursor.rowcount
 
-def calcular_saldo_cliente(cliente_id):
-    """Calcula o saldo devedor de um cliente (Transações - Pagamentos)."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+def filtro_copia_arquivada(tabela):
+    """Condição SQL: a linha de main.`tabela` tem cópia idêntica no arquivo morto.
     
-    # Soma das transações (dívidas)
-    cursor.execute('''
-        SELECT COALESCE(SUM(valor), 0) as total_dividas
-        FROM transacoes 
-        WHERE cliente_id = ? AND pago = 0
-    ''', (cliente_id,))
-    total_dividas = cursor.fetchone()['total_dividas']
+    A comparação pela chave primária e por todas as colunas copiadas deixa
+    no banco principal uma linha alterada depois da cópia.
+    """
+    colunas = colunas_arquivo_morto(tabela)
+    comparacoes = ' AND '.join(f'copia.{coluna} IS {tabela}.{coluna}' for coluna in colunas[1:])
+    return f'''EXISTS (
+        SELECT 1 FROM {ESQUEMA_ARQUIVO_MORTO}.{tabela} copia
+        WHERE copia.id = {tabela}.id AND {comparacoes}
+    )'''
+
+# Compras e pagamentos dos clientes excluídos
+FILTRO_CLIENTES_INATIVOS = 'cliente_id IN (SELECT id FROM main.clientes WHERE ativo = 0)'
+
+def copiar_clientes_inativos(cursor):
+    """Copia para o arquivo morto os clientes excluídos e todo o histórico deles (sem commit)."""
+    if copiar_para_arquivo_morto(cursor, 'clientes', 'ativo = 0') <= 0:
+        return
     
-    # Soma dos pagamentos
-    cursor.execute('''
-        SELECT COALESCE(SUM(valor), 0) as total_pagamentos
-        FROM pagamentos 
-        WHERE cliente_id = ?
-    ''', (cliente_id,))
-    total_pagamentos = cursor.fetchone()['total_pagamentos']
+    for tabela in ('transacoes', 'pagamentos'):
+        copiar_para_arquivo_morto(cursor, tabela, FILTRO_CLIENTES_INATIVOS)
+
+def remover_clientes_inativos(cursor):
+    """Remove do banco principal os clientes excluídos já copiados, com o histórico (sem commit).
     
-    conn.close()
+    Returns:
+        Dicionário com as quantidades de clientes, transações e pagamentos removidos
+    """
+    resumo = {'clientes': 0, 'transacoes': 0, 'pagamentos': 0}
     
-    saldo = total_dividas - total_pagamentos
-    return max(0, saldo)  # Não pode ser negativo
-
-def buscar_historico_cliente(cliente_id):
-    """Busca o histórico completo de transações e pagamentos de um cliente."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+    for tabela in ('transacoes', 'pagamentos'):
+        cursor.execute(f'''
+            DELETE FROM main.{tabela}
+            WHERE {FILTRO_CLIENTES_INATIVOS} AND {filtro_copia_arquivada(tabela)}
+        ''')
+        resumo[tabela] = cursor.rowcount
     
-    # União de transações e pagamentos ordenados por data
+    # O cliente só sai com todo o histórico: o que ficou (ainda sem cópia)
+    # volta no próximo arquivamento, junto com ele
+    cursor.execute(f'''
+        DELETE FROM main.clientes
+        WHERE ativo = 0 AND {filtro_copia_arquivada('clientes')}
+          AND NOT EXISTS (SELECT 1 FROM main.transacoes t WHERE t.cliente_id = clientes.id)
+          AND NOT EXISTS (SELECT 1 FROM main.pagamentos p WHERE p.cliente_id = clientes.id)
+    ''')
+    resumo['clientes'] = cursor.rowcount
     cursor.execute('''
-        SELECT 'COMPRA' as tipo, descricao, valor, data 
-        FROM transacoes WHERE cliente_id = ?
-        UNION ALL
-        SELECT 'PAGAMENTO' as tipo, observacao as descricao, valor, data 
-        FROM pagamentos WHERE cliente_id = ?
-        ORDER BY data DESC
-    ''', (cliente_id, cliente_id))
-    
-    historico = cursor.fetchall()
-    conn.close()
+        DELETE FROM main.saldos
+        WHERE cliente_id NOT IN (SELECT id FROM main.clientes)
+    ''')
     
-    return historico
+    return resumo
 
-def obter_estatisticas():
-    """Retorna estatísticas gerais do sistema."""
-    conn = get_conexao()
-    cursor = conn.cursor()
+def selecionar_historico_quitado(cursor, idade):
+    """Escolhe o trecho quitado, mais antigo que `idade` (ex.: '-365 days'), de cada cliente.
     
-    # Total de clientes ativos
-    cursor.execute('SELECT COUNT(*) as total FROM clientes WHERE ativo = 1')
-    total_clientes = cursor.fetchone()['total']
+    O ponto de corte de cada cliente fica em temp.arquivamento.
+    """
     
-    # Total em aberto (todas as dívidas)
+    # Ponto de corte de cada cliente: o último instante anterior ao corte em
+    # que o saldo acumulado (mesma regra da tabela saldos) estava quitado
     cursor.execute('''
-        SELECT COALESCE(SUM(t.valor), 0) - COALESCE(
-            (SELECT SUM(p.valor) FROM pagamentos p), 0
-        ) as total_aberto
-        FROM transacoes t WHERE t.pago = 0
+        CREATE TEMP TABLE arquivamento (
+            cliente_id INTEGER PRIMARY KEY,
+            ate_data TEXT NOT NULL,
+            dividas INTEGER NOT NULL DEFAULT 0,
+            pagamentos INTEGER NOT NULL DEFAULT 0
+        )
     ''')
+    cursor.execute('''
+        INSERT INTO temp.arquivamento (cliente_id, ate_data)
+        WITH movimentos AS (
+            SELECT cliente_id, data, valor
+            FROM main.transacoes WHERE data < datetime('now', :idade)
+            UNION ALL
+            SELECT cliente_id, data, -valor
+            FROM main.pagamentos WHERE data < datetime('now', :idade)
+        ),
+        acumulado AS (
+            SELECT cliente_id, data,
+                   SUM(valor) OVER (PARTITION BY cliente_id ORDER BY data) as saldo
+            FROM movimentos
+        )
+        SELECT cliente_id, MAX(data)
+        FROM acumulado
+        WHERE saldo <= 0
+        GROUP BY cliente_id
+    ''', {'idade': idade})
     
-    # Recalcula corretamente
-    cursor.execute('SELECT COALESCE(SUM(valor), 0) as total FROM transacoes WHERE pago = 0')
-    total_dividas = cursor.fetchone()['total']
+    # Um trecho que só tem o saldo anterior de um arquivamento passado seria
+    # apenas trocado por outro igual
+    cursor.execute('''
+        DELETE FROM temp.arquivamento
+        WHERE NOT EXISTS (SELECT 1 FROM main.transacoes t
+                          WHERE t.cliente_id = arquivamento.cliente_id
+                            AND t.data <= arquivamento.ate_data AND t.descricao IS NOT :descricao)
+          AND NOT EXISTS (SELECT 1 FROM main.pagamentos p
+                          WHERE p.cliente_id = arquivamento.cliente_id
+                            AND p.data <= arquivamento.ate_data AND p.observacao IS NOT :descricao)
+    ''', {'descricao': DESCRICAO_SALDO_ANTERIOR})
+
+# Linhas de main.{tabela} no trecho escolhido em temp.arquivamento
+FILTRO_TRECHO_QUITADO = '''{tabela}.id IN (
+    SELECT x.id FROM main.{tabela} x
+    JOIN temp.arquivamento a ON a.cliente_id = x.cliente_id
+    WHERE x.data <= a.ate_data
+)'''
+
+def copiar_historico_quitado(cursor):
+    """Copia para o arquivo morto o trecho escolhido por selecionar_historico_quitado (sem commit)."""
+    for tabela in ('transacoes', 'pagamentos'):
+        copiar_para_arquivo_morto(cursor, tabela, FILTRO_TRECHO_QUITADO.format(tabela=tabela))
+
+def remover_historico_quitado(cursor):
+    """Troca no banco principal o trecho já copiado pelo saldo anterior (sem commit).
     
-    cursor.execute('SELECT COALESCE(SUM(valor), 0) as total FROM pagamentos')
-    total_pagamentos = cursor.fetchone()['total']
+    Só saem as linhas com cópia idêntica no arquivo morto, e o saldo
+    anterior é a soma exata delas, então os saldos não mudam mesmo que algo
+    tenha sido gravado entre a cópia e a remoção.
     
-    total_aberto = max(0, total_dividas - total_pagamentos)
+    Returns:
+        Dicionário com as quantidades de transações e pagamentos removidos
+    """
+    trechos = {
+        tabela: f'{FILTRO_TRECHO_QUITADO.format(tabela=tabela)} AND {filtro_copia_arquivada(tabela)}'
+        for tabela in ('transacoes', 'pagamentos')
+    }
     
-    # Clientes com dívida
-    cursor.execute('''
-        SELECT COUNT(DISTINCT c.id) as total
-        FROM clientes c
-        WHERE c.ativo = 1 AND (
-            SELECT COALESCE(SUM(t.valor), 0) - COALESCE(SUM(p.valor), 0)
-            FROM transacoes t
-            LEFT JOIN pagamentos p ON p.cliente_id = c.id
-            WHERE t.cliente_id = c.id AND t.pago = 0
-        ) > 0
+    # Quanto do saldo sai com o trecho arquivado
+    cursor.execute(f'''
+        UPDATE temp.arquivamento
+        SET dividas = (SELECT COALESCE(SUM(transacoes.valor), 0) FROM main.transacoes
+                       WHERE transacoes.cliente_id = arquivamento.cliente_id
+                         AND {trechos['transacoes']}),
+            pagamentos = (SELECT COALESCE(SUM(pagamentos.valor), 0) FROM main.pagamentos
+                          WHERE pagamentos.cliente_id = arquivamento.cliente_id
+                            AND {trechos['pagamentos']})
     ''')
     
-    conn.close()
+    resumo = {}
+    for tabela, trecho in trechos.items():
+        cursor.execute(f'DELETE FROM main.{tabela} WHERE {trecho}')
+        resumo[tabela] = cursor.rowcount
     
-    return {
-        'total_clientes': total_clientes,
-        'total_aberto': total_aberto,
-        'total_dividas': total_dividas,
-        'total_pagamentos': total_pagamentos
-    }
+    # Saldo anterior: mantém o saldo (e as estatísticas em aberto) iguais
+    cursor.execute('''
+        INSERT INTO main.transacoes (cliente_id, descricao, valor, data)
+        SELECT cliente_id, :descricao, dividas - pagamentos, ate_data
+        FROM temp.arquivamento WHERE dividas > pagamentos
+    ''', {'descricao': DESCRICAO_SALDO_ANTERIOR})
+    cursor.execute('''
+        INSERT INTO main.pagamentos (cliente_id, valor, observacao, data)
+        SELECT cliente_id, pagamentos - dividas, :descricao, ate_data
+        FROM temp.arquivamento WHERE pagamentos > dividas
+    ''', {'descricao': DESCRICAO_SALDO_ANTERIOR})
+    
+    return resumo
 
-def obter_clientes_com_divida():
-    """Retorna lista de clientes que possuem dívidas em aberto."""
-    clientes = buscar_clientes()
-    clientes_com_divida = []
+# ==================== BACKUP ====================
+
+# Páginas copiadas por etapa da API de backup do SQLite. Entre as etapas
+# o banco fica livre, então o sistema continua funcionando durante o backup.
+PAGINAS_POR_ETAPA_BACKUP = 1024
+
+PREFIXO_BACKUP = 'fiado_facil_backup_'
+FORMATO_DATA_BACKUP = '%Y%m%d_%H%M%S'
+
+# Arquivo, dentro da pasta de backups, com o marcador do último backup feito
+ARQUIVO_ULTIMO_BACKUP = 'ultimo_backup.json'
+
+def obter_marcador_alteracoes():
+    """Retorna o contador de alterações do banco (muda a cada gravação)."""
+    conn = get_conexao()
+    cursor = conn.cursor()
     
-    for cliente in clientes:
-        saldo = calcular_saldo_cliente(cliente['id'])
-        if saldo > 0:
-            clientes_com_divida.append({
-                'id': cliente['id'],
-                'nome': cliente['nome'],
-                'telefone': cliente['telefone'],
-                'saldo': saldo
-            })
+    cursor.execute('SELECT contador FROM controle_alteracoes WHERE id = 1')
+    resultado = cursor.fetchone()
     
-    return clientes_com_divida
+    return resultado['contador'] if resultado else None
 
-# ==================== BACKUP ====================
+def ler_ultimo_backup(backup_dir):
+    """Lê o registro do último backup (banco, marcador e arquivo), se houver."""
+    caminho = os.path.join(backup_dir, ARQUIVO_ULTIMO_BACKUP)
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def registrar_ultimo_backup(backup_dir, marcador, backup_file):
+    """Grava o marcador de alterações correspondente ao último backup."""
+    caminho = os.path.join(backup_dir, ARQUIVO_ULTIMO_BACKUP)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({
+            'banco': os.path.abspath(ARQUIVO_DB),
+            'marcador': marcador,
+            'arquivo': backup_file
+        }, f, indent=4, ensure_ascii=False)
 
-def fazer_backup():
-    """Realiza backup do banco de dados."""
+def fazer_backup(forcar=False):
+    """Realiza backup do banco de dados com a API de backup do SQLite.
+    
+    Ao contrário de copiar o arquivo, a API gera sempre uma cópia consistente,
+    mesmo com gravações em andamento. Depois do backup é aplicada a política
+    de retenção configurada em config.json.
+    
+    Se nada mudou no banco desde o último backup (e o arquivo dele ainda
+    existe), nenhuma cópia é feita, a menos que forcar seja True.
+    
+    Returns:
+        Caminho do backup criado, ou None se não foi necessário
+    """
     config = carregar_config()
     backup_dir = config.get('backup_dir', 'backups')
+    if LOJA_ATUAL is not None:
+        backup_dir = os.path.join(backup_dir, LOJA_ATUAL)  # Uma pasta por loja
+    
+    if not os.path.exists(ARQUIVO_DB):
+        return None
+    
+    # Lido antes da cópia: gravações feitas durante o backup fazem o
+    # próximo backup acontecer, em vez de serem perdidas
+    marcador = obter_marcador_alteracoes()
+    
+    ultimo = ler_ultimo_backup(backup_dir)
+    if (not forcar and ultimo
+            and ultimo.get('banco') == os.path.abspath(ARQUIVO_DB)
+            and ultimo.get('marcador') == marcador
+            and os.path.exists(ultimo.get('arquivo') or '')):
+        print("Backup ignorado: nenhuma alteração desde o último backup.")
+        return None
     
     # Cria o diretório de backup se não existir
     if not os.path.exists(backup_dir):
         os.makedirs(backup_dir)
     
     # Nome do arquivo de backup com timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_file = os.path.join(backup_dir, f'fiado_facil_backup_{timestamp}.db')
+    timestamp = datetime.now().strftime(FORMATO_DATA_BACKUP)
+    backup_file = os.path.join(backup_dir, f'{PREFIXO_BACKUP}{timestamp}.db')
+    
+    # Grava em um arquivo temporário: um backup interrompido nunca fica
+    # com cara de backup completo
+    arquivo_temporario = backup_file + '.tmp'
+    destino = sqlite3.connect(arquivo_temporario)
+    try:
+        get_conexao().backup(destino, pages=PAGINAS_POR_ETAPA_BACKUP)
+    finally:
+        destino.close()
+    os.replace(arquivo_temporario, backup_file)
+    registrar_ultimo_backup(backup_dir, marcador, backup_file)
+    
+    print(f"Backup realizado: {backup_file}")
+    
+    aplicar_retencao_backups(backup_dir, get_retencao_backup())
+    
+    return backup_file
+
+def fazer_backup_em_segundo_plano():
+    """Inicia o backup em uma thread separada e retorna a thread.
+    
+    A thread usa a própria conexão com o banco e a fecha ao terminar.
+    """
+    def executar():
+        try:
+            fazer_backup()
+        except Exception as e:
+            print(f"Erro no backup em segundo plano: {e}")
+        finally:
+            fechar_conexao()
+    
+    thread = threading.Thread(target=executar, name='backup')
+    thread.start()
+    return thread
+
+def listar_backups(backup_dir):
+    """Lista os backups do diretório como tuplas (data, caminho), do mais recente ao mais antigo."""
+    backups = []
+    
+    if not os.path.isdir(backup_dir):
+        return backups
+    
+    for nome in os.listdir(backup_dir):
+        if not (nome.startswith(PREFIXO_BACKUP) and nome.endswith('.db')):
+            continue
+        try:
+            data = datetime.strptime(nome[len(PREFIXO_BACKUP):-len('.db')], FORMATO_DATA_BACKUP)
+        except ValueError:
+            continue  # Arquivo com nome fora do padrão: não é mexido
+        backups.append((data, os.path.join(backup_dir, nome)))
+    
+    backups.sort(reverse=True)
+    return backups
+
+def selecionar_backups_mantidos(backups, politica):
+    """Escolhe quais backups manter segundo a política de retenção.
+    
+    Mantém os N mais recentes e, além deles, o backup mais recente de cada
+    um dos últimos dias, semanas e meses configurados.
+    
+    Args:
+        backups: Lista de (data, caminho), do mais recente ao mais antigo
+        politica: Dicionário com manter_ultimos, diarios, semanais e mensais
     
-    # Copia o arquivo do banco de dados
-    if os.path.exists(ARQUIVO_DB):
-        shutil.copy2(ARQUIVO_DB, backup_file)
-        print(f"Backup realizado: {backup_file}")
-        return backup_file
+    Returns:
+        Conjunto de caminhos que devem ser mantidos
+    """
+    mantidos = {caminho for _, caminho in backups[:max(1, politica.get('manter_ultimos', 0))]}
     
-    return None
+    periodos = (
+        (politica.get('diarios', 0), lambda data: data.date()),
+        (politica.get('semanais', 0), lambda data: data.isocalendar()[:2]),
+        (politica.get('mensais', 0), lambda data: (data.year, data.month)),
+    )
+    
+    for quantidade, periodo_de in periodos:
+        vistos = set()
+        for data, caminho in backups:
+            if len(vistos) >= quantidade:
+                break
+            periodo = periodo_de(data)
+            if periodo not in vistos:
+                vistos.add(periodo)
+                mantidos.add(caminho)
+    
+    return mantidos
+
+def aplicar_retencao_backups(backup_dir, politica):
+    """Remove os backups que não são mais necessários pela política de retenção.
+    
+    Returns:
+        Lista com os caminhos removidos
+    """
+    if not politica:
+        return []  # Retenção desativada: mantém todos os backups
+    
+    backups = listar_backups(backup_dir)
+    mantidos = selecionar_backups_mantidos(backups, politica)
+    
+    removidos = []
+    for _, caminho in backups:
+        if caminho in mantidos:
+            continue
+        try:
+            os.remove(caminho)
+            removidos.append(caminho)
+        except OSError as e:
+            print(f"Erro ao remover backup antigo {caminho}: {e}")
+    
+    if removidos:
+        print(f"Backups antigos removidos: {len(removidos)}")
+    
+    return removidos
 
 # ==================== EXPORTAÇÃO CSV ====================
 
 def exportar_relatorio_csv(caminho_arquivo):
-    """Exporta um relatório completo para CSV."""
+    """Exporta um relatório completo para CSV.
+    
+    O resumo e o histórico são gravados linha a linha direto dos cursores,
+    então o uso de memória não cresce com o tamanho do banco.
+    """
     import csv
     
-    clientes = buscar_clientes()
+    conn = get_conexao()
     
     with open(caminho_arquivo, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -357,30 +3239,223 @@ def exportar_relatorio_csv(caminho_arquivo):
         writer.writerow(['=== RESUMO DE CLIENTES ==='])
         writer.writerow(['Nome', 'Telefone', 'Limite', 'Saldo Devedor'])
         
-        for cliente in clientes:
-            saldo = calcular_saldo_cliente(cliente['id'])
-            writer.writerow([
-                cliente['nome'],
-                cliente['telefone'] or '',
-                f"R$ {cliente['limite_fiado']:.2f}",
-                f"R$ {saldo:.2f}"
-            ])
-        
-        writer.writerow([])
-        writer.writerow(['=== HISTÓRICO DE TRANSAÇÕES ==='])
-        writer.writerow(['Cliente', 'Tipo', 'Descrição', 'Valor', 'Data'])
-        
-        for cliente in clientes:
-            historico = buscar_historico_cliente(cliente['id'])
-            for item in historico:
-                writer.writerow([
+        # Transação de leitura: resumo e histórico vêm do mesmo instante do banco
+        conn.execute('BEGIN')
+        try:
+            writer.writerows(
+                [
                     cliente['nome'],
+                    cliente['telefone'] or '',
+                    f"R$ {cliente['limite_fiado']:.2f}",
+                    f"R$ {cliente['saldo']:.2f}"
+                ]
+                for cliente in iterar_clientes_com_saldo()
+            )
+            
+            writer.writerow([])
+            writer.writerow(['=== HISTÓRICO DE TRANSAÇÕES ==='])
+            writer.writerow(['Cliente', 'Tipo', 'Descrição', 'Valor', 'Data'])
+            
+            writer.writerows(
+                [
+                    item['nome'],
                     item['tipo'],
                     item['descricao'] or '',
                     f"R$ {item['valor']:.2f}",
                     item['data']
-                ])
+                ]
+                for item in iterar_historico_geral()
+            )
+        finally:
+            conn.rollback()  # Somente leitura: apenas encerra a transação
     
     return caminho_arquivo
 
+# ==================== EXPORTAÇÃO INCREMENTAL ====================
+# Para a sincronização diária com a contabilidade: cada exportação grava só
+# o que mudou desde a anterior. As marcas (último ID e versão exportados de
+# cada tabela) ficam em marcas_exportacao; linhas novas têm ID maior que a
+# marca e linhas alteradas, versão maior (ver criar_gatilhos_versao), então
+# as duas consultas usam índices e o custo acompanha o movimento do dia.
+
+# Tabela -> colunas exportadas (valores em reais), na ordem de gravação:
+# clientes antes das compras e pagamentos que os referenciam
+COLUNAS_EXPORTACAO = {
+    'clientes': 'id, nome, telefone, limite_fiado / 100.0 as limite_fiado, data_cadastro, ativo',
+    'transacoes': '''id, cliente_id, descricao, valor / 100.0 as valor,
+                     valor_pago / 100.0 as valor_pago, pago, data''',
+    'pagamentos': 'id, cliente_id, valor / 100.0 as valor, observacao, data',
+}
+
+# Lançamentos de saldo anterior (arquivamento) não são movimento novo: o
+# histórico que eles resumem já foi exportado antes de ser arquivado
+FILTROS_EXPORTACAO = {
+    'clientes': '1',
+    'transacoes': 'descricao IS NOT :anterior',
+    'pagamentos': 'observacao IS NOT :anterior',
+}
+
+FORMATOS_EXPORTACAO = ('jsonl', 'csv')
 
+# Alteradas (pelo índice de versao, na ordem das alterações) e depois as
+# novas (pela chave primária, na ordem de inclusão). O + em +id impede que
+# a chave primária seja usada na primeira consulta, que leria todas as
+# linhas antigas.
+SQL_EXPORTACAO_INCREMENTAL = '''
+    SELECT 'alterado' as operacao, {colunas} FROM {tabela}
+    WHERE versao > 0 AND versao > :ultima_versao AND +id <= :ultimo_id AND {filtro}
+    UNION ALL
+    SELECT 'novo' as operacao, {colunas} FROM {tabela}
+    WHERE id > :ultimo_id AND {filtro}
+'''
+
+SQL_EXPORTACAO_COMPLETA = '''
+    SELECT 'novo' as operacao, {colunas} FROM {tabela}
+    ORDER BY id
+'''
+
+def ler_marcas_exportacao():
+    """Marcas da última exportação de cada tabela ({tabela: linha}, vazio se nunca exportou)."""
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT * FROM marcas_exportacao')
+    return {linha['tabela']: linha for linha in cursor.fetchall()}
+
+def iterar_exportacao(cursor, tabela, marca=None):
+    """Linhas de `tabela` a exportar desde a marca (todas se marca for None).
+    
+    Returns:
+        Cursor de linhas com operacao ('novo' ou 'alterado') e as colunas
+        de COLUNAS_EXPORTACAO
+    """
+    if marca is None:
+        sql = SQL_EXPORTACAO_COMPLETA.format(colunas=COLUNAS_EXPORTACAO[tabela], tabela=tabela)
+        return cursor.execute(sql)
+    
+    sql = SQL_EXPORTACAO_INCREMENTAL.format(
+        colunas=COLUNAS_EXPORTACAO[tabela],
+        tabela=tabela,
+        filtro=FILTROS_EXPORTACAO[tabela]
+    )
+    return cursor.execute(sql, {
+        'ultimo_id': marca['ultimo_id'],
+        'ultima_versao': marca['ultima_versao'],
+        'anterior': DESCRICAO_SALDO_ANTERIOR,
+    })
+
+@contextmanager
+def abrir_saida_exportacao(caminho_arquivo, compactar):
+    """Abre o arquivo de exportação para escrita de texto, com ou sem gzip.
+    
+    O arquivo é gravado com extensão .tmp e só recebe o nome final quando
+    completo. Com caminho '-', grava na saída padrão (para encadear com
+    outro programa).
+    """
+    import gzip
+    import io
+    import sys
+    
+    if caminho_arquivo == '-':
+        if compactar:
+            with gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') as compactado:
+                with io.TextIOWrapper(compactado, encoding='utf-8', newline='') as saida:
+                    yield saida
+        else:
+            yield sys.stdout
+            sys.stdout.flush()
+        return
+    
+    arquivo_temporario = caminho_arquivo + '.tmp'
+    try:
+        if compactar:
+            saida = gzip.open(arquivo_temporario, 'wt', encoding='utf-8', newline='')
+        else:
+            saida = open(arquivo_temporario, 'w', encoding='utf-8', newline='')
+        with saida:
+            yield saida
+    except BaseException:
+        if os.path.exists(arquivo_temporario):
+            os.remove(arquivo_temporario)
+        raise
+    os.replace(arquivo_temporario, caminho_arquivo)
+
+def exportar_alteracoes(caminho_arquivo, formato='jsonl', completo=False, compactar=None):
+    """Exporta os clientes, compras e pagamentos novos ou alterados desde a última exportação.
+    
+    A primeira exportação (ou com completo=True) grava tudo o que está no
+    banco principal. As linhas são gravadas direto dos cursores, dentro de
+    uma transação de leitura, e as marcas só avançam depois que o arquivo
+    está completo: uma exportação que falha é repetida por inteiro na
+    próxima vez. O que for gravado durante a exportação fica para a próxima.
+    
+    Args:
+        caminho_arquivo: Arquivo de saída ('-' para a saída padrão)
+        formato: 'jsonl' (um objeto JSON por linha, com a tabela e a
+            operação) ou 'csv' (uma seção por tabela)
+        completo: Se True, ignora as marcas e exporta tudo
+        compactar: Grava com gzip; None compacta se o caminho termina em .gz
+    
+    Returns:
+        Dicionário {tabela: quantidade de linhas exportadas}
+    """
+    import csv
+    
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato inválido: {formato}")
+    if compactar is None:
+        compactar = caminho_arquivo.endswith('.gz')
+    
+    marcas = {} if completo else ler_marcas_exportacao()
+    
+    conn = get_conexao()
+    cursor = conn.cursor()
+    
+    quantidades = {}
+    novas_marcas = {}
+    
+    with abrir_saida_exportacao(caminho_arquivo, compactar) as saida:
+        writer = csv.writer(saida)
+    
+        # Transação de leitura: linhas e novas marcas vêm do mesmo instante do banco
+        conn.execute('BEGIN')
+        try:
+            versao = ler_contador_alteracoes(cursor)
+    
+            for tabela in COLUNAS_EXPORTACAO:
+                cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {tabela}')
+                novas_marcas[tabela] = (cursor.fetchone()[0], versao)
+    
+                linhas = iterar_exportacao(cursor, tabela, marcas.get(tabela))
+    
+                if formato == 'csv':
+                    writer.writerow([f'=== {tabela.upper()} ==='])
+                    writer.writerow([descricao[0] for descricao in linhas.description])
+    
+                quantidade = 0
+                for linha in linhas:
+                    if formato == 'csv':
+                        writer.writerow(linha)
+                    else:
+                        saida.write(json.dumps({'tabela': tabela, **dict(linha)}, ensure_ascii=False))
+                        saida.write('\n')
+                    quantidade += 1
+    
+                if formato == 'csv':
+                    writer.writerow([])
+                quantidades[tabela] = quantidade
+        finally:
+            conn.rollback()  # Somente leitura: apenas encerra a transação
+    
+    # Arquivo completo: as marcas avançam até o instante lido na exportação
+    with transacao_escrita(conn):
+        conn.executemany('''
+            INSERT INTO marcas_exportacao (tabela, ultimo_id, ultima_versao, exportado_em)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (tabela) DO UPDATE SET
+                ultimo_id = excluded.ultimo_id,
+                ultima_versao = excluded.ultima_versao,
+                exportado_em = excluded.exportado_em
+        ''', [(tabela, *marca) for tabela, marca in novas_marcas.items()])
+    
+    return quantidades
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+estresse.py - Teste de estresse de gravação concorrente do FiadoFácil
+=====================================================================
+
+Simula vários caixas gravando ao mesmo tempo no mesmo banco: cada processo
+registra compras (e alguns pagamentos) pelas funções do database.py, como
+a interface faz. Ao final confere que nenhuma venda se perdeu (contagem e
+soma dos valores, saldos e estatísticas) e mede a latência das gravações.
+
+Por padrão usa um banco novo em uma pasta temporária; com --banco, grava
+no arquivo informado (nunca use o banco de produção).
+
+Uso:
+    python estresse.py
+    python estresse.py --processos 8 --vendas 1000 --p99-maximo-ms 250
+
+Retorna 1 se alguma gravação falhou, se faltou alguma venda ou se a
+latência p99 passou do limite. A mesma conferência, em escala menor e sem
+o limite de latência, roda na suíte de testes (tests/test_concorrencia.py);
+este script fica como medição de desempenho.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database as db
+
+# Clientes disputados pelos processos (poucos, para forçar conflitos)
+TOTAL_CLIENTES = 10
+
+# Valor de cada venda simulada, em centavos
+VALOR_VENDA = 150
+
+# A cada quantas vendas o processo registra também um pagamento
+INTERVALO_PAGAMENTO = 10
+
+
+def gravar_vendas(arquivo, processo, vendas, inicio):
+    """Registra as vendas de um processo.
+
+    Returns:
+        Tupla (latências em segundos, erros, vendas gravadas, pagamentos gravados)
+    """
+    db.selecionar_banco(arquivo)
+
+    # Todos os processos começam juntos, para disputarem o banco de verdade
+    time.sleep(max(0, inicio - time.time()))
+
+    latencias = []
+    erros = []
+    gravadas = 0
+    pagamentos = 0
+    try:
+        for venda in range(vendas):
+            cliente_id = (processo + venda) % TOTAL_CLIENTES + 1
+
+            antes = time.perf_counter()
+            try:
+                db.adicionar_transacao(cliente_id, f'Estresse {processo}-{venda}', db.para_reais(VALOR_VENDA))
+                gravadas += 1
+                if venda % INTERVALO_PAGAMENTO == 0:
+                    db.adicionar_pagamento(cliente_id, db.para_reais(VALOR_VENDA), 'estresse')
+                    pagamentos += 1
+            except db.sqlite3.Error as e:
+                erros.append(str(e))
+            latencias.append(time.perf_counter() - antes)
+    finally:
+        db.fechar_conexoes()
+
+    return latencias, erros, gravadas, pagamentos
+
+
+def percentil(valores, fracao):
+    """Percentil de uma lista já ordenada (vizinho mais próximo)."""
+    if not valores:
+        return 0
+    return valores[min(len(valores) - 1, int(len(valores) * fracao))]
+
+
+def conferir_banco(vendas_esperadas, pagamentos_esperados):
+    """Compara o banco com o que os processos gravaram; retorna a lista de divergências."""
+    conn = db.get_conexao()
+    cursor = conn.cursor()
+
+    problemas = []
+
+    vendas, total_vendas = cursor.execute(
+        "SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM transacoes WHERE descricao LIKE 'Estresse %'"
+    ).fetchone()
+    if vendas != vendas_esperadas or total_vendas != vendas_esperadas * VALOR_VENDA:
+        problemas.append(f"vendas gravadas: {vendas} de {vendas_esperadas}")
+
+    pagamentos = cursor.execute(
+        "SELECT COUNT(*) FROM pagamentos WHERE observacao = 'estresse'"
+    ).fetchone()[0]
+    if pagamentos != pagamentos_esperados:
+        problemas.append(f"pagamentos gravados: {pagamentos} de {pagamentos_esperados}")
+
+    divergentes = cursor.execute('''
+        SELECT COUNT(*)
+        FROM clientes c
+        LEFT JOIN saldos s ON s.cliente_id = c.id
+        WHERE COALESCE(s.total_dividas, 0) != (SELECT COALESCE(SUM(valor), 0) FROM transacoes WHERE cliente_id = c.id)
+           OR COALESCE(s.total_pagamentos, 0) != (SELECT COALESCE(SUM(valor), 0) FROM pagamentos WHERE cliente_id = c.id)
+    ''').fetchone()[0]
+    if divergentes:
+        problemas.append(f"saldos divergentes em {divergentes} cliente(s)")
+
+    if db.verificar_estatisticas():
+        problemas.append("estatísticas divergentes")
+
+    return problemas
+
+
+def preparar_banco(arquivo):
+    """Cria (ou atualiza) o banco de teste com os clientes disputados."""
+    db.selecionar_banco(arquivo)
+    db.inicializar_banco()
+    if not db.buscar_cliente_por_id(TOTAL_CLIENTES):
+        db.adicionar_clientes_lote((f'Cliente Estresse {i}', '', None) for i in range(TOTAL_CLIENTES))
+    db.fechar_conexoes()
+
+
+def executar_processos(arquivo, processos, vendas):
+    """Grava as vendas de todos os processos ao mesmo tempo.
+
+    Returns:
+        Tupla (resultados de gravar_vendas, um por processo; segundos gastos)
+    """
+    inicio = time.time() + 1  # Tempo para todos os processos subirem
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [
+            executor.submit(gravar_vendas, arquivo, processo, vendas, inicio)
+            for processo in range(processos)
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+    return resultados, time.time() - inicio
+
+
+def main():
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Vários processos gravando vendas no mesmo banco ao mesmo tempo."
+    )
+    parser.add_argument('--processos', type=int, default=4, help="Processos gravando (padrão: 4)")
+    parser.add_argument('--vendas', type=int, default=500, help="Vendas por processo (padrão: 500)")
+    parser.add_argument(
+        '--p99-maximo-ms', type=float, default=250,
+        help="Latência p99 máxima aceita por gravação (padrão: 250 ms)"
+    )
+    parser.add_argument('--banco', help="Banco a usar (padrão: um banco novo em pasta temporária)")
+    args = parser.parse_args()
+
+    arquivo = args.banco or os.path.join(tempfile.mkdtemp(prefix='fiado_estresse_'), 'estresse.db')
+    preparar_banco(arquivo)
+
+    print(f"[INFO] {args.processos} processo(s) x {args.vendas} venda(s) em {arquivo}")
+
+    resultados, segundos = executar_processos(arquivo, args.processos, args.vendas)
+
+    latencias = sorted(latencia for resultado in resultados for latencia in resultado[0])
+    erros = [erro for resultado in resultados for erro in resultado[1]]
+    gravadas = sum(resultado[2] for resultado in resultados)
+    pagamentos = sum(resultado[3] for resultado in resultados)
+
+    # Confere o que foi confirmado aos processos: nada pode faltar nem sobrar
+    problemas = conferir_banco(gravadas, pagamentos)
+    db.fechar_conexoes()
+
+    p99 = percentil(latencias, 0.99) * 1000
+    print(
+        f"[INFO] {len(latencias)} gravação(ões) em {segundos:.1f}s "
+        f"({len(latencias) / segundos:.0f}/s): p50 {percentil(latencias, 0.5) * 1000:.1f} ms, "
+        f"p99 {p99:.1f} ms, máximo {latencias[-1] * 1000 if latencias else 0:.1f} ms"
+    )
+
+    if erros:
+        problemas.append(f"{len(erros)} gravação(ões) com erro (ex.: {erros[0]})")
+    if p99 > args.p99_maximo_ms:
+        problemas.append(f"p99 de {p99:.1f} ms acima do limite de {args.p99_maximo_ms:.0f} ms")
+
+    for problema in problemas:
+        print(f"[ERRO] {problema}", file=sys.stderr)
+    if not problemas:
+        print("[INFO] Nenhuma venda perdida; saldos e estatísticas conferem.")
+
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+executor.py - Acesso ao banco em segundo plano para a interface
+================================================================
+
+As consultas e gravações da interface rodam em uma thread de trabalho,
+para que a janela continue respondendo mesmo com o banco lento ou
+bloqueado por outro processo. Os resultados voltam para a thread do Tk
+por uma fila, verificada periodicamente com root.after (o Tk não pode ser
+usado fora da própria thread).
+
+Pedidos com a mesma chave se substituem: ao digitar na busca, apenas a
+última consulta é executada e entregue; uma consulta antiga que ainda
+esteja rodando é interrompida.
+"""
+
+import queue
+import sqlite3
+import threading
+
+import database as db
+
+# Intervalo entre as verificações de resultados prontos (~60 quadros/s)
+INTERVALO_ENTREGA_MS = 16
+
+
+class ExecutorBanco:
+    """Executa funções do banco em uma thread própria e entrega os resultados ao Tk."""
+    
+    def __init__(self, root, intervalo_ms=INTERVALO_ENTREGA_MS):
+        """
+        Inicia a thread de trabalho e as entregas periódicas.
+        
+        Args:
+            root: Janela raiz do Tk, usada para agendar as entregas
+            intervalo_ms: Intervalo entre as verificações de resultados prontos
+        """
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        
+        self._pedidos = queue.Queue()
+        self._resultados = queue.Queue()
+        
+        # Chave -> geração do pedido mais recente; gerações antigas são descartadas
+        self._geracoes = {}
+        self._lock = threading.Lock()
+        self._em_execucao = None
+        self._conexao = None
+        self._ativo = True
+        
+        self._thread = threading.Thread(target=self._trabalhar, name='executor-banco', daemon=True)
+        self._thread.start()
+        
+        self.root.after(self.intervalo_ms, self._entregar_resultados)
+    
+    def executar(self, funcao, *args, chave=None, ao_concluir=None, ao_falhar=None, **kwargs):
+        """Agenda funcao(*args, **kwargs) na thread de trabalho.
+        
+        Args:
+            funcao: Função a executar (normalmente uma função do database.py)
+            chave: Identifica pedidos que se substituem (ex.: 'lista_clientes').
+                Use somente em consultas: um pedido com chave pode ser
+                descartado ou interrompido por um mais novo.
+            ao_concluir: Chamada na thread do Tk com o retorno da função
+            ao_falhar: Chamada na thread do Tk com a exceção, se houver
+        """
+        geracao = None
+        if chave is not None:
+            with self._lock:
+                geracao = self._geracoes.get(chave, 0) + 1
+                self._geracoes[chave] = geracao
+                self._interromper_obsoleto(chave)
+        
+        self._pedidos.put((chave, geracao, funcao, args, kwargs, ao_concluir, ao_falhar))
+    
+    def cancelar(self, chave):
+        """Descarta os pedidos pendentes com esta chave (o resultado não é entregue)."""
+        with self._lock:
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._interromper_obsoleto(chave)
+    
+    def encerrar(self, timeout=5):
+        """Termina a thread de trabalho depois dos pedidos já agendados."""
+        self._ativo = False
+        self._pedidos.put(None)
+        self._thread.join(timeout)
+    
+    def _atual(self, chave, geracao):
+        """Indica se o pedido ainda é o mais recente da sua chave."""
+        return chave is None or self._geracoes.get(chave) == geracao
+    
+    def _interromper_obsoleto(self, chave):
+        """Interrompe a consulta em execução se ela ficou obsoleta (com o lock)."""
+        if self._em_execucao is None or self._conexao is None:
+            return
+        
+        chave_atual, geracao_atual = self._em_execucao
+        if chave_atual == chave and not self._atual(chave_atual, geracao_atual):
+            self._conexao.interrupt()
+    
+    def _trabalhar(self):
+        """Laço da thread de trabalho."""
+        self._conexao = db.get_conexao()
+        
+        while True:
+            pedido = self._pedidos.get()
+            if pedido is None:
+                break
+            
+            chave, geracao, funcao, args, kwargs, ao_concluir, ao_falhar = pedido
+            
+            with self._lock:
+                if not self._atual(chave, geracao):
+                    continue  # Substituído antes de começar
+                self._em_execucao = (chave, geracao)
+            
+            try:
+                resultado, erro = funcao(*args, **kwargs), None
+            except Exception as e:
+                resultado, erro = None, e
+            finally:
+                with self._lock:
+                    self._em_execucao = None
+            
+            # Consulta interrompida por ter ficado obsoleta: nada a entregar
+            if isinstance(erro, sqlite3.OperationalError) and not self._atual(chave, geracao):
+                continue
+            
+            self._resultados.put((chave, geracao, resultado, erro, ao_concluir, ao_falhar))
+        
+        db.fechar_conexao()
+    
+    def _entregar_resultados(self):
+        """Chama, na thread do Tk, os retornos dos pedidos concluídos."""
+        # Reagenda antes, para que um erro em um retorno não pare as entregas
+        if self._ativo:
+            self.root.after(self.intervalo_ms, self._entregar_resultados)
+        
+        while True:
+            try:
+                chave, geracao, resultado, erro, ao_concluir, ao_falhar = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            
+            if not self._atual(chave, geracao):
+                continue
+            
+            if erro is not None:
+                if ao_falhar:
+                    ao_falhar(erro)
+                else:
+                    print(f"Erro no acesso ao banco de dados: {erro}")
+            elif ao_concluir:
+                ao_concluir(resultado)
+
+
+class ExecutorSincrono:
+    """Mesma interface do ExecutorBanco, executando tudo na hora.
+    
+    Usado pelas janelas quando abertas sem um ExecutorBanco.
+    """
+    
+    def executar(self, funcao, *args, chave=None, ao_concluir=None, ao_falhar=None, **kwargs):
+        """Executa funcao(*args, **kwargs) na hora e chama ao_concluir (ou ao_falhar).
+        
+        A chave é ignorada: sem fila, não há pedido a substituir. Sem
+        ao_falhar, a exceção é propagada para quem chamou.
+        """
+        try:
+            resultado = funcao(*args, **kwargs)
+        except Exception as e:
+            if ao_falhar is None:
+                raise
+            ao_falhar(e)
+            return
+        
+        if ao_concluir:
+            ao_concluir(resultado)
+    
+    def cancelar(self, chave):
+        """Nada a cancelar: cada pedido já terminou ao retornar de executar."""
+    
+    def encerrar(self, timeout=None):
+        """Nada a encerrar: não há thread de trabalho."""
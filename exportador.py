@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+exportador.py - Exportação incremental do FiadoFácil
+====================================================
+
+Grava os clientes, compras e pagamentos novos ou alterados desde a última
+exportação, para a sincronização diária com a contabilidade. A primeira
+exportação (ou com --completo) grava tudo; as seguintes, só o movimento
+desde a anterior, então o tempo e o tamanho do arquivo acompanham o dia e
+não o histórico inteiro.
+
+Em JSON Lines cada linha é um objeto com "tabela", "operacao" ("novo" ou
+"alterado") e as colunas da linha; em CSV há uma seção por tabela. Um
+caminho terminado em .gz é compactado com gzip, e '-' grava na saída padrão.
+
+Uso:
+    python exportador.py alteracoes.jsonl.gz
+    python exportador.py --formato csv alteracoes.csv
+    python exportador.py --compactar - | ssh contabilidade 'cat > fiado.jsonl.gz'
+"""
+
+import argparse
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import database as db
+from config import get_lojas
+
+
+def main():
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Exporta o que mudou no banco desde a última exportação."
+    )
+    parser.add_argument('arquivo', help="Arquivo de saída ('-' para a saída padrão)")
+    parser.add_argument(
+        '--formato', choices=db.FORMATOS_EXPORTACAO, default='jsonl',
+        help="Formato do arquivo (padrão: jsonl)"
+    )
+    parser.add_argument(
+        '--compactar', action='store_true',
+        help="Compacta com gzip (automático para arquivos .gz)"
+    )
+    parser.add_argument(
+        '--completo', action='store_true',
+        help="Exporta tudo, ignorando a exportação anterior"
+    )
+    parser.add_argument(
+        '--loja', choices=sorted(get_lojas()) or None,
+        help="Loja a exportar (padrão: a loja do config.json)"
+    )
+    args = parser.parse_args()
+
+    # Com a exportação na saída padrão, as mensagens vão para a de erros
+    mensagens = sys.stderr if args.arquivo == '-' else sys.stdout
+
+    db.selecionar_loja(args.loja)
+    with redirect_stdout(mensagens):
+        db.inicializar_banco()
+
+    inicio = datetime.now()
+
+    try:
+        quantidades = db.exportar_alteracoes(
+            args.arquivo, args.formato, args.completo, args.compactar or None
+        )
+    except (OSError, db.sqlite3.Error) as e:
+        print(f"[ERRO] Exportação cancelada; a próxima repete este trecho: {e}", file=sys.stderr)
+        return 1
+    finally:
+        with redirect_stdout(mensagens):
+            db.fechar_conexoes()
+
+    segundos = (datetime.now() - inicio).total_seconds()
+    print(
+        f"[INFO] Exportados em {segundos:.1f}s: {quantidades['clientes']} cliente(s), "
+        f"{quantidades['transacoes']} compra(s) e {quantidades['pagamentos']} pagamento(s).",
+        file=mensagens
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
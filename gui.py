@@ -11,12 +11,24 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 import database as db
 from config import carregar_config, salvar_config, get_limite_padrao
+from executor import ExecutorBanco, ExecutorSincrono
+
+# Linhas do histórico carregadas por vez no painel de detalhes
+TAMANHO_PAGINA_HISTORICO = 100
+
+# Intervalo de atualização das estatísticas do cabeçalho (leitura de uma linha)
+INTERVALO_ESTATISTICAS_MS = 1000
+
+
+def buscar_detalhes_cliente(cliente_id):
+    """Busca o cliente e o saldo atual (executada na thread do banco)."""
+    return db.buscar_cliente_por_id(cliente_id), db.calcular_saldo_cliente(cliente_id)
 
 
 class JanelaPagamento:
     """Janela para registrar pagamentos de clientes."""
     
-    def __init__(self, parent, cliente_id, callback_atualizar=None):
+    def __init__(self, parent, cliente_id, callback_atualizar=None, executor=None):
         """
         Inicializa a janela de pagamento.
         
@@ -24,17 +36,23 @@ class JanelaPagamento:
             parent: Janela pai
             cliente_id: ID do cliente
             callback_atualizar: Função para atualizar a tela principal após o pagamento
+            executor: ExecutorBanco das consultas e da gravação (sem ele, roda na hora)
         """
         self.parent = parent
         self.cliente_id = cliente_id
         self.callback_atualizar = callback_atualizar
+        self.executor = executor or ExecutorSincrono()
+        self.gravando = False
         
-        # Buscar dados do cliente
-        self.cliente = db.buscar_cliente_por_id(cliente_id)
-        self.saldo_atual = db.calcular_saldo_cliente(cliente_id)
+        # Buscar dados do cliente; a janela é criada quando chegarem
+        self.executor.executar(buscar_detalhes_cliente, cliente_id, ao_concluir=self.criar_janela)
+    
+    def criar_janela(self, detalhes):
+        """Cria a janela com o cliente e o saldo carregados."""
+        self.cliente, self.saldo_atual = detalhes
         
         # Criar janela
-        self.janela = tk.Toplevel(parent)
+        self.janela = tk.Toplevel(self.parent)
         self.janela.title("Registrar Pagamento")
         self.janela.geometry("500x400")
         self.janela.resizable(False, False)
@@ -224,24 +242,29 @@ class JanelaPagamento:
         }
     
     def registrar_pagamento(self):
-        """Registra o pagamento no banco de dados."""
+        """Registra o pagamento no banco de dados (em segundo plano)."""
+        if self.gravando:
+            return
         
         # Validar dados
         dados = self.validar_dados()
         if not dados:
             return
         
-        try:
-            # Registrar pagamento no banco
-            pagamento_id = db.adicionar_pagamento(
-                self.cliente_id,
-                dados['valor'],
-                dados['observacao']
-            )
-            
-            # Calcular novo saldo
-            novo_saldo = db.calcular_saldo_cliente(self.cliente_id)
-            
+        def gravar():
+            db.adicionar_pagamento(self.cliente_id, dados['valor'], dados['observacao'])
+            return db.calcular_saldo_cliente(self.cliente_id)
+        
+        self.gravando = True
+        self.executor.executar(
+            gravar,
+            ao_concluir=lambda novo_saldo: self.pagamento_registrado(dados, novo_saldo),
+            ao_falhar=self.falha_ao_registrar
+        )
+    
+    def pagamento_registrado(self, dados, novo_saldo):
+        """Informa o resultado e atualiza a tela principal."""
+        if self.janela.winfo_exists():
             # Mensagem de sucesso
             if novo_saldo <= 0:
                 mensagem = (
@@ -259,18 +282,21 @@ class JanelaPagamento:
                 mensagem,
                 parent=self.janela
             )
-            
-            # Chamar callback para atualizar tela principal
-            if self.callback_atualizar:
-                self.callback_atualizar()
-            
-            # Fechar janela
-            self.janela.destroy()
-            
-        except Exception as e:
+        
+        # Chamar callback para atualizar tela principal
+        if self.callback_atualizar:
+            self.callback_atualizar()
+        
+        # Fechar janela
+        self.janela.destroy()
+    
+    def falha_ao_registrar(self, erro):
+        """Mostra o erro da gravação e permite tentar novamente."""
+        self.gravando = False
+        if self.janela.winfo_exists():
             messagebox.showerror(
                 "Erro",
-                f"Erro ao registrar pagamento:\n{str(e)}",
+                f"Erro ao registrar pagamento:\n{str(erro)}",
                 parent=self.janela
             )
     
@@ -295,16 +321,22 @@ class JanelaPagamento:
 class JanelaNovaTransacao:
     """Janela para registrar uma nova compra fiada."""
     
-    def __init__(self, parent, cliente_id, callback_atualizar=None):
+    def __init__(self, parent, cliente_id, callback_atualizar=None, executor=None):
         self.parent = parent
         self.cliente_id = cliente_id
         self.callback_atualizar = callback_atualizar
+        self.executor = executor or ExecutorSincrono()
+        self.gravando = False
         
-        # Buscar dados do cliente
-        self.cliente = db.buscar_cliente_por_id(cliente_id)
+        # Buscar dados do cliente; a janela é criada quando chegarem
+        self.executor.executar(db.buscar_cliente_por_id, cliente_id, ao_concluir=self.criar_janela)
+    
+    def criar_janela(self, cliente):
+        """Cria a janela com os dados do cliente carregados."""
+        self.cliente = cliente
         
         # Criar janela
-        self.janela = tk.Toplevel(parent)
+        self.janela = tk.Toplevel(self.parent)
         self.janela.title("Nova Compra Fiada")
         self.janela.geometry("500x350")
         self.janela.resizable(False, False)
@@ -448,38 +480,78 @@ class JanelaNovaTransacao:
             'valor': valor
         }
     
-    def registrar_compra(self):
-        """Registra a compra no banco de dados."""
+    def registrar_compra(self, liberar_excesso=False):
+        """Verifica o limite e registra a compra no banco de dados (em segundo plano)."""
+        if self.gravando:
+            return
         
         dados = self.validar_dados()
         if not dados:
             return
         
-        try:
-            # Registrar transação
-            db.adicionar_transacao(
-                self.cliente_id,
-                dados['descricao'],
-                dados['valor']
+        # Limite e registro na mesma transação (outro caixa não passa na frente)
+        self.gravando = True
+        self.executor.executar(
+            db.autorizar_e_registrar_compra,
+            self.cliente_id,
+            dados['valor'],
+            dados['descricao'],
+            liberar_excesso,
+            ao_concluir=lambda autorizacao: self.compra_autorizada(dados, autorizacao),
+            ao_falhar=self.falha_ao_registrar
+        )
+    
+    def compra_autorizada(self, dados, autorizacao):
+        """Trata o resultado da autorização: registrada, acima do limite ou negada."""
+        self.gravando = False
+        
+        if autorizacao['resultado'] == db.AUTORIZACAO_APROVADA:
+            self.compra_registrada(dados)
+            return
+        
+        if not self.janela.winfo_exists():
+            return
+        
+        if autorizacao['resultado'] == db.AUTORIZACAO_REQUER_LIBERACAO:
+            resposta = messagebox.askyesno(
+                "Limite de Fiado",
+                f"⚠️ Esta compra ultrapassa o limite de fiado do cliente.\n\n"
+                f"Limite: R$ {autorizacao['limite']:.2f}\n"
+                f"Saldo atual: R$ {autorizacao['saldo']:.2f}\n"
+                f"Disponível: R$ {autorizacao['disponivel']:.2f}\n"
+                f"Excedente: R$ {autorizacao['excedente']:.2f}\n\n"
+                f"Deseja registrar a compra mesmo assim?",
+                parent=self.janela
             )
-            
+            if resposta:
+                self.registrar_compra(liberar_excesso=True)
+            return
+        
+        messagebox.showerror("Compra Negada", autorizacao['motivo'], parent=self.janela)
+    
+    def compra_registrada(self, dados):
+        """Informa o resultado e atualiza a tela principal."""
+        if self.janela.winfo_exists():
             messagebox.showinfo(
                 "Sucesso",
                 f"✅ Compra de R$ {dados['valor']:.2f} registrada com sucesso!",
                 parent=self.janela
             )
-            
-            # Atualizar tela principal
-            if self.callback_atualizar:
-                self.callback_atualizar()
-            
-            # Fechar janela
-            self.janela.destroy()
-            
-        except Exception as e:
+        
+        # Atualizar tela principal
+        if self.callback_atualizar:
+            self.callback_atualizar()
+        
+        # Fechar janela
+        self.janela.destroy()
+    
+    def falha_ao_registrar(self, erro):
+        """Mostra o erro da gravação e permite tentar novamente."""
+        self.gravando = False
+        if self.janela.winfo_exists():
             messagebox.showerror(
                 "Erro",
-                f"Erro ao registrar compra:\n{str(e)}",
+                f"Erro ao registrar compra:\n{str(erro)}",
                 parent=self.janela
             )
     
@@ -501,10 +573,12 @@ class JanelaNovaTransacao:
 class JanelaCliente:
     """Janela para adicionar ou editar cliente."""
     
-    def __init__(self, parent, cliente_id=None, callback_atualizar=None):
+    def __init__(self, parent, cliente_id=None, callback_atualizar=None, executor=None):
         self.parent = parent
         self.cliente_id = cliente_id
         self.callback_atualizar = callback_atualizar
+        self.executor = executor or ExecutorSincrono()
+        self.gravando = False
         
         # Modo edição ou novo
         self.modo_edicao = cliente_id is not None
@@ -621,8 +695,15 @@ class JanelaCliente:
     
     def carregar_dados(self):
         """Carrega dados do cliente para edição."""
-        cliente = db.buscar_cliente_por_id(self.cliente_id)
-        if cliente:
+        self.executor.executar(
+            db.buscar_cliente_por_id,
+            self.cliente_id,
+            ao_concluir=self.preencher_dados
+        )
+    
+    def preencher_dados(self, cliente):
+        """Preenche o formulário com os dados carregados."""
+        if cliente and self.janela.winfo_exists():
             self.entry_nome.insert(0, cliente['nome'])
             self.entry_telefone.insert(0, cliente['telefone'] or '')
             self.entry_limite.delete(0, tk.END)
@@ -649,34 +730,46 @@ class JanelaCliente:
         return {'nome': nome, 'telefone': telefone, 'limite': limite}
     
     def salvar(self):
-        """Salva o cliente."""
+        """Salva o cliente (em segundo plano)."""
+        if self.gravando:
+            return
+        
         dados = self.validar_dados()
         if not dados:
             return
         
-        try:
-            if self.modo_edicao:
-                db.atualizar_cliente(
-                    self.cliente_id,
-                    dados['nome'],
-                    dados['telefone'],
-                    dados['limite']
-                )
-                messagebox.showinfo("Sucesso", "Cliente atualizado!", parent=self.janela)
-            else:
-                db.adicionar_cliente(
-                    dados['nome'],
-                    dados['telefone'],
-                    dados['limite']
-                )
-                messagebox.showinfo("Sucesso", "Cliente adicionado!", parent=self.janela)
-            
-            if self.callback_atualizar:
-                self.callback_atualizar()
-            
-            self.janela.destroy()
-        except Exception as e:
-            messagebox.showerror("Erro", str(e), parent=self.janela)
+        if self.modo_edicao:
+            funcao = db.atualizar_cliente
+            argumentos = (self.cliente_id, dados['nome'], dados['telefone'], dados['limite'])
+            mensagem = "Cliente atualizado!"
+        else:
+            funcao = db.adicionar_cliente
+            argumentos = (dados['nome'], dados['telefone'], dados['limite'])
+            mensagem = "Cliente adicionado!"
+        
+        self.gravando = True
+        self.executor.executar(
+            funcao,
+            *argumentos,
+            ao_concluir=lambda _: self.cliente_salvo(mensagem),
+            ao_falhar=self.falha_ao_salvar
+        )
+    
+    def cliente_salvo(self, mensagem):
+        """Informa o resultado e atualiza a tela principal."""
+        if self.janela.winfo_exists():
+            messagebox.showinfo("Sucesso", mensagem, parent=self.janela)
+        
+        if self.callback_atualizar:
+            self.callback_atualizar()
+        
+        self.janela.destroy()
+    
+    def falha_ao_salvar(self, erro):
+        """Mostra o erro da gravação e permite tentar novamente."""
+        self.gravando = False
+        if self.janela.winfo_exists():
+            messagebox.showerror("Erro", str(erro), parent=self.janela)
     
     def cancelar(self):
         self.janela.destroy()
@@ -691,6 +784,347 @@ class JanelaCliente:
 
 
 
+# JANELA DE ENVELHECIMENTO DAS DÍVIDAS
+class JanelaEnvelhecimento:
+    """Janela com as dívidas em aberto por faixa de atraso (30/60/90+ dias)."""
+    
+    # Coluna da tabela -> (título, largura)
+    COLUNAS = {
+        'nome': ('Nome', 180),
+        'total': ('Total', 90),
+        'atual': ('Até 29 dias', 90),
+        'dias_30': ('30-59 dias', 90),
+        'dias_60': ('60-89 dias', 90),
+        'dias_90': ('90+ dias', 90),
+        'dias_mais_antiga': ('Mais antiga (dias)', 110),
+    }
+    
+    def __init__(self, parent, executor=None):
+        self.parent = parent
+        self.executor = executor or ExecutorSincrono()
+        
+        self.janela = tk.Toplevel(parent)
+        self.janela.title("Envelhecimento das Dívidas")
+        self.janela.geometry("800x500")
+        
+        self.criar_widgets()
+        self.centralizar_janela()
+        
+        # O cálculo roda na thread do banco; a tabela é preenchida quando terminar.
+        # A chave é desta janela: outra janela aberta não cancela a carga desta
+        self.executor.executar(
+            db.buscar_envelhecimento_dividas,
+            chave=f'envelhecimento-{id(self)}',
+            ao_concluir=self.preencher_tabela,
+            ao_falhar=self.falha_ao_carregar
+        )
+    
+    def criar_widgets(self):
+        """Cria os widgets da janela."""
+        frame_principal = tk.Frame(self.janela, bg='white', padx=15, pady=15)
+        frame_principal.pack(fill='both', expand=True)
+        
+        frame_topo = tk.Frame(frame_principal, bg='white')
+        frame_topo.pack(fill='x', pady=(0, 10))
+        
+        tk.Label(
+            frame_topo,
+            text="⏳ Envelhecimento das Dívidas",
+            font=('Arial', 14, 'bold'),
+            bg='white'
+        ).pack(side='left')
+        
+        tk.Button(
+            frame_topo,
+            text="Exportar CSV",
+            font=('Arial', 10),
+            bg='#3498db',
+            fg='white',
+            relief='flat',
+            cursor='hand2',
+            command=self.exportar_csv
+        ).pack(side='right')
+        
+        self.label_status = tk.Label(
+            frame_principal,
+            text="Calculando...",
+            font=('Arial', 10),
+            bg='white',
+            fg='#7f8c8d'
+        )
+        self.label_status.pack(anchor='w', pady=(0, 5))
+        
+        frame_tabela = tk.Frame(frame_principal, bg='white')
+        frame_tabela.pack(fill='both', expand=True)
+        
+        self.tree = ttk.Treeview(
+            frame_tabela,
+            columns=tuple(self.COLUNAS),
+            show='headings'
+        )
+        for coluna, (titulo, largura) in self.COLUNAS.items():
+            self.tree.heading(coluna, text=titulo)
+            self.tree.column(coluna, width=largura, anchor='w' if coluna == 'nome' else 'e')
+        
+        self.tree.tag_configure('atrasado', foreground='#e74c3c')
+        
+        scrollbar = ttk.Scrollbar(frame_tabela, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+    
+    def preencher_tabela(self, linhas):
+        """Mostra o resultado do cálculo."""
+        if not self.janela.winfo_exists():
+            return
+        
+        for linha in linhas:
+            self.tree.insert(
+                '',
+                'end',
+                values=(
+                    linha['nome'],
+                    f"R$ {linha['total']:.2f}",
+                    f"R$ {linha['atual']:.2f}",
+                    f"R$ {linha['dias_30']:.2f}",
+                    f"R$ {linha['dias_60']:.2f}",
+                    f"R$ {linha['dias_90']:.2f}",
+                    linha['dias_mais_antiga']
+                ),
+                tags=('atrasado',) if linha['dias_90'] > 0 else ()
+            )
+        
+        self.label_status.config(text=f"{len(linhas)} cliente(s) com dívida em aberto")
+    
+    def falha_ao_carregar(self, erro):
+        if self.janela.winfo_exists():
+            self.label_status.config(text=f"Erro ao calcular: {erro}", fg='#e74c3c')
+    
+    def exportar_csv(self):
+        """Grava o relatório em um arquivo CSV escolhido pelo usuário."""
+        caminho = filedialog.asksaveasfilename(
+            parent=self.janela,
+            title="Exportar envelhecimento das dívidas",
+            defaultextension='.csv',
+            initialfile=f"envelhecimento_{datetime.now().strftime('%Y%m%d')}.csv",
+            filetypes=[('CSV', '*.csv')]
+        )
+        if not caminho:
+            return
+        
+        self.executor.executar(
+            db.exportar_envelhecimento_csv,
+            caminho,
+            ao_concluir=lambda arquivo: messagebox.showinfo(
+                "Sucesso", f"Relatório exportado:\n{arquivo}", parent=self.janela
+            ),
+            ao_falhar=lambda erro: messagebox.showerror(
+                "Erro", f"Erro ao exportar:\n{erro}", parent=self.janela
+            )
+        )
+    
+    def centralizar_janela(self):
+        self.janela.update_idletasks()
+        largura = self.janela.winfo_width()
+        altura = self.janela.winfo_height()
+        x = (self.janela.winfo_screenwidth() // 2) - (largura // 2)
+        y = (self.janela.winfo_screenheight() // 2) - (altura // 2)
+        self.janela.geometry(f'{largura}x{altura}+{x}+{y}')
+
+
+# JANELA DE RESUMOS (VENDIDO E RECEBIDO POR DIA E POR MÊS)
+class JanelaResumos:
+    """Janela com o vendido, o recebido e o total a receber por dia ou por mês."""
+    
+    # Coluna da tabela -> (título, largura)
+    COLUNAS = {
+        'periodo': ('Período', 100),
+        'vendido': ('Vendido', 100),
+        'recebido': ('Recebido', 100),
+        'compras': ('Compras', 70),
+        'pagamentos': ('Pagamentos', 80),
+        'a_receber': ('A receber', 110),
+        'devedores': ('Devedores', 80),
+    }
+    
+    # Visão -> (função de consulta, períodos mostrados no gráfico)
+    VISOES = {
+        'diario': (db.buscar_resumo_diario, 30),
+        'mensal': (db.buscar_resumo_mensal, 12),
+    }
+    
+    COR_VENDIDO = '#e74c3c'
+    COR_RECEBIDO = '#27ae60'
+    
+    def __init__(self, parent, executor=None):
+        self.parent = parent
+        self.executor = executor or ExecutorSincrono()
+        self.linhas = []
+    
+        self.janela = tk.Toplevel(parent)
+        self.janela.title("Resumo de Vendas e Recebimentos")
+        self.janela.geometry("800x600")
+    
+        self.visao = tk.StringVar(value='mensal')
+    
+        self.criar_widgets()
+        self.centralizar_janela()
+        self.carregar()
+    
+    def criar_widgets(self):
+        """Cria os widgets da janela."""
+        frame_principal = tk.Frame(self.janela, bg='white', padx=15, pady=15)
+        frame_principal.pack(fill='both', expand=True)
+    
+        frame_topo = tk.Frame(frame_principal, bg='white')
+        frame_topo.pack(fill='x', pady=(0, 10))
+    
+        tk.Label(
+            frame_topo,
+            text="📊 Resumo de Vendas e Recebimentos",
+            font=('Arial', 14, 'bold'),
+            bg='white'
+        ).pack(side='left')
+    
+        for visao, texto in (('mensal', "Por mês"), ('diario', "Por dia")):
+            tk.Radiobutton(
+                frame_topo,
+                text=texto,
+                variable=self.visao,
+                value=visao,
+                font=('Arial', 10),
+                bg='white',
+                command=self.carregar
+            ).pack(side='right')
+    
+        self.label_status = tk.Label(
+            frame_principal,
+            text="Carregando...",
+            font=('Arial', 10),
+            bg='white',
+            fg='#7f8c8d'
+        )
+        self.label_status.pack(anchor='w', pady=(0, 5))
+    
+        # Gráfico de barras: vendido e recebido dos últimos períodos
+        self.grafico = tk.Canvas(frame_principal, bg='white', height=200, highlightthickness=0)
+        self.grafico.pack(fill='x', pady=(0, 10))
+        self.grafico.bind('<Configure>', lambda evento: self.desenhar_grafico())
+    
+        frame_tabela = tk.Frame(frame_principal, bg='white')
+        frame_tabela.pack(fill='both', expand=True)
+    
+        self.tree = ttk.Treeview(
+            frame_tabela,
+            columns=tuple(self.COLUNAS),
+            show='headings'
+        )
+        for coluna, (titulo, largura) in self.COLUNAS.items():
+            self.tree.heading(coluna, text=titulo)
+            self.tree.column(coluna, width=largura, anchor='w' if coluna == 'periodo' else 'e')
+    
+        scrollbar = ttk.Scrollbar(frame_tabela, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+    
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+    
+    def carregar(self):
+        """Lê o resumo da visão escolhida na thread do banco."""
+        buscar, _ = self.VISOES[self.visao.get()]
+    
+        self.label_status.config(text="Carregando...", fg='#7f8c8d')
+        # A chave é desta janela: trocar de visão cancela só a carga anterior dela
+        self.executor.executar(
+            buscar,
+            chave=f'resumos-{id(self)}',
+            ao_concluir=self.preencher,
+            ao_falhar=self.falha_ao_carregar
+        )
+    
+    def preencher(self, linhas):
+        """Mostra o resumo na tabela (mais recente primeiro) e no gráfico."""
+        if not self.janela.winfo_exists():
+            return
+    
+        self.linhas = linhas
+    
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+    
+        for linha in reversed(linhas):
+            self.tree.insert(
+                '',
+                'end',
+                values=(
+                    linha['periodo'],
+                    f"R$ {linha['vendido']:.2f}",
+                    f"R$ {linha['recebido']:.2f}",
+                    linha['compras'],
+                    linha['pagamentos'],
+                    f"R$ {linha['a_receber']:.2f}",
+                    linha['devedores']
+                )
+            )
+    
+        self.label_status.config(text=f"{len(linhas)} período(s) com movimento", fg='#7f8c8d')
+        self.desenhar_grafico()
+    
+    def desenhar_grafico(self):
+        """Desenha as barras de vendido e recebido dos últimos períodos."""
+        self.grafico.delete('all')
+    
+        _, quantidade = self.VISOES[self.visao.get()]
+        linhas = self.linhas[-quantidade:]
+        if not linhas:
+            return
+    
+        largura = self.grafico.winfo_width()
+        altura = self.grafico.winfo_height()
+        margem = 20
+        base = altura - margem
+        maximo = max(max(linha['vendido'], linha['recebido']) for linha in linhas) or 1
+    
+        faixa = (largura - 2 * margem) / len(linhas)
+        barra = max(1, faixa * 0.4)
+    
+        for i, linha in enumerate(linhas):
+            x = margem + i * faixa
+            for deslocamento, valor, cor in (
+                (0, linha['vendido'], self.COR_VENDIDO),
+                (barra, linha['recebido'], self.COR_RECEBIDO),
+            ):
+                topo = base - (base - margem) * valor / maximo
+                self.grafico.create_rectangle(
+                    x + deslocamento, topo, x + deslocamento + barra, base,
+                    fill=cor, outline=''
+                )
+    
+        # Períodos das pontas, para situar o gráfico
+        self.grafico.create_text(margem, altura - 2, text=linhas[0]['periodo'], anchor='sw', font=('Arial', 8))
+        self.grafico.create_text(
+            largura - margem, altura - 2, text=linhas[-1]['periodo'], anchor='se', font=('Arial', 8)
+        )
+    
+        self.grafico.create_text(margem, 2, text="■ Vendido", fill=self.COR_VENDIDO, anchor='nw', font=('Arial', 9))
+        self.grafico.create_text(
+            margem + 80, 2, text="■ Recebido", fill=self.COR_RECEBIDO, anchor='nw', font=('Arial', 9)
+        )
+    
+    def falha_ao_carregar(self, erro):
+        if self.janela.winfo_exists():
+            self.label_status.config(text=f"Erro ao carregar: {erro}", fg='#e74c3c')
+    
+    def centralizar_janela(self):
+        self.janela.update_idletasks()
+        largura = self.janela.winfo_width()
+        altura = self.janela.winfo_height()
+        x = (self.janela.winfo_screenwidth() // 2) - (largura // 2)
+        y = (self.janela.winfo_screenheight() // 2) - (altura // 2)
+        self.janela.geometry(f'{largura}x{altura}+{x}+{y}')
+
+
 # APLICAÇÃO PRINCIPAL
 
 class FiadoFacilApp:
@@ -698,15 +1132,29 @@ class FiadoFacilApp:
     
     def __init__(self, root):
         self.root = root
-        self.root.title("FiadoFácil - Sistema de Gestão de Crédito")
+        titulo = "FiadoFácil - Sistema de Gestão de Crédito"
+        if db.LOJA_ATUAL:
+            titulo += f" - {db.LOJA_ATUAL}"
+        self.root.title(titulo)
         self.root.geometry("1200x700")
         
+        # Consultas e gravações rodam fora da thread da interface
+        self.executor = ExecutorBanco(root)
+        
         # Cliente selecionado
         self.cliente_selecionado = None
+        self.saldo_selecionado = 0
+        
+        # Paginação do histórico do cliente selecionado
+        self.historico_ultima_linha = None
+        self.historico_completo = True
+        self.historico_carregando = False
+        self.incluir_arquivo_morto = tk.BooleanVar(value=False)
         
         # Criar interface
         self.criar_widgets()
         self.atualizar_lista_clientes()
+        self.atualizar_estatisticas()
         
     def criar_widgets(self):
         """Cria a interface principal."""
@@ -724,6 +1172,38 @@ class FiadoFacilApp:
             fg='white'
         ).pack(side='left', padx=20, pady=10)
         
+        # Estatísticas gerais, atualizadas periodicamente
+        self.label_estatisticas = tk.Label(
+            frame_topo,
+            text="",
+            font=('Arial', 11),
+            bg='#2c3e50',
+            fg='#ecf0f1'
+        )
+        self.label_estatisticas.pack(side='right', padx=20, pady=10)
+        
+        tk.Button(
+            frame_topo,
+            text="⏳ Vencimentos",
+            font=('Arial', 10, 'bold'),
+            bg='#34495e',
+            fg='white',
+            relief='flat',
+            cursor='hand2',
+            command=self.abrir_janela_envelhecimento
+        ).pack(side='right', pady=10)
+        
+        tk.Button(
+            frame_topo,
+            text="📊 Resumos",
+            font=('Arial', 10, 'bold'),
+            bg='#34495e',
+            fg='white',
+            relief='flat',
+            cursor='hand2',
+            command=self.abrir_janela_resumos
+        ).pack(side='right', padx=(0, 5), pady=10)
+        
         # Frame principal dividido
         frame_principal = tk.Frame(self.root)
         frame_principal.pack(fill='both', expand=True)
@@ -825,28 +1305,63 @@ class FiadoFacilApp:
             self.entry_busca.insert(0, "Buscar cliente...")
     
     def atualizar_lista_clientes(self):
-        """Atualiza a lista de clientes."""
-        # Limpar lista
-        for item in self.tree_clientes.get_children():
-            self.tree_clientes.delete(item)
+        """Atualiza a lista de clientes.
         
+        A busca roda em segundo plano; cada tecla substitui a busca anterior,
+        que é descartada mesmo se já estiver em andamento.
+        """
         # Buscar termo
         termo = self.entry_busca.get()
         if termo == "Buscar cliente...":
             termo = ""
         
-        # Buscar clientes
-        clientes = db.buscar_clientes(termo)
+        # Buscar clientes (já com o saldo calculado)
+        self.executor.executar(
+            db.buscar_clientes_com_saldo,
+            termo,
+            ordem='relevancia',
+            chave='lista_clientes',
+            ao_concluir=self.preencher_lista_clientes
+        )
+    
+    def preencher_lista_clientes(self, clientes):
+        """Mostra na lista os clientes encontrados pela busca."""
+        # Limpar lista
+        for item in self.tree_clientes.get_children():
+            self.tree_clientes.delete(item)
         
         for cliente in clientes:
-            saldo = db.calcular_saldo_cliente(cliente['id'])
             self.tree_clientes.insert(
                 '',
                 'end',
-                values=(cliente['nome'], f"R$ {saldo:.2f}"),
+                values=(cliente['nome'], f"R$ {cliente['saldo']:.2f}"),
                 tags=(cliente['id'],)
             )
     
+    def atualizar_estatisticas(self):
+        """Pede as estatísticas do cabeçalho e agenda a próxima leitura.
+        
+        Os totais são mantidos pelo banco a cada gravação, então cada
+        atualização é apenas a leitura de uma linha.
+        """
+        self.executor.executar(
+            db.obter_estatisticas,
+            chave='estatisticas',
+            ao_concluir=self.mostrar_estatisticas
+        )
+        
+        self.root.after(INTERVALO_ESTATISTICAS_MS, self.atualizar_estatisticas)
+    
+    def mostrar_estatisticas(self, estatisticas):
+        """Mostra as estatísticas no cabeçalho."""
+        self.label_estatisticas.config(
+            text=(
+                f"Clientes: {estatisticas['total_clientes']}   |   "
+                f"Devedores: {estatisticas['clientes_com_divida']}   |   "
+                f"Em aberto: R$ {estatisticas['total_aberto']:.2f}"
+            )
+        )
+    
     def ao_selecionar_cliente(self, event):
         """Evento ao selecionar um cliente na lista."""
         selecao = self.tree_clientes.selection()
@@ -858,7 +1373,25 @@ class FiadoFacilApp:
         cliente_id = item['tags'][0]
         
         # Buscar dados completos
-        self.cliente_selecionado = db.buscar_cliente_por_id(cliente_id)
+        self.carregar_cliente(cliente_id)
+    
+    def carregar_cliente(self, cliente_id):
+        """Busca o cliente e o saldo em segundo plano e depois mostra os detalhes."""
+        self.executor.executar(
+            buscar_detalhes_cliente,
+            cliente_id,
+            chave='cliente',
+            ao_concluir=self.exibir_cliente
+        )
+    
+    def exibir_cliente(self, resultado):
+        """Atualiza o painel direito com o cliente carregado."""
+        cliente, saldo = resultado
+        if cliente is None:
+            return
+        
+        self.cliente_selecionado = cliente
+        self.saldo_selecionado = saldo
         
         # Atualizar painel direito
         self.mostrar_detalhes_cliente()
@@ -873,7 +1406,7 @@ class FiadoFacilApp:
             widget.destroy()
         
         cliente = self.cliente_selecionado
-        saldo = db.calcular_saldo_cliente(cliente['id'])
+        saldo = self.saldo_selecionado
         
         # Header com nome e saldo
         frame_header = tk.Frame(self.frame_direito, bg='#ecf0f1', height=120)
@@ -993,6 +1526,17 @@ class FiadoFacilApp:
             bg='white'
         ).pack(pady=(20, 10))
         
+        # Histórico arquivado: lido do arquivo morto apenas quando pedido
+        if db.arquivo_morto_disponivel():
+            tk.Checkbutton(
+                self.frame_direito,
+                text="Incluir histórico arquivado",
+                font=('Arial', 9),
+                bg='white',
+                variable=self.incluir_arquivo_morto,
+                command=self.atualizar_historico
+            ).pack(anchor='e', padx=20)
+        
         frame_historico = tk.Frame(self.frame_direito, bg='white')
         frame_historico.pack(fill='both', expand=True, padx=20, pady=(0, 20))
         
@@ -1015,21 +1559,29 @@ class FiadoFacilApp:
         self.tree_historico.column('Valor', width=100)
         self.tree_historico.column('Data', width=150)
         
-        scrollbar_hist = ttk.Scrollbar(
+        self.scrollbar_historico = ttk.Scrollbar(
             frame_historico,
             orient='vertical',
             command=self.tree_historico.yview
         )
-        self.tree_historico.configure(yscrollcommand=scrollbar_hist.set)
+        self.tree_historico.configure(yscrollcommand=self.ao_rolar_historico)
+        
+        # Configurar cores
+        self.tree_historico.tag_configure('red', foreground='#e74c3c')
+        self.tree_historico.tag_configure('green', foreground='#27ae60')
         
         self.tree_historico.pack(side='left', fill='both', expand=True)
-        scrollbar_hist.pack(side='right', fill='y')
+        self.scrollbar_historico.pack(side='right', fill='y')
         
         # Carregar histórico
         self.atualizar_historico()
     
     def atualizar_historico(self):
-        """Atualiza o histórico de transações do cliente."""
+        """Atualiza o histórico de transações do cliente.
+        
+        Carrega apenas a primeira página; as seguintes são carregadas
+        conforme o usuário rola a lista (ver ao_rolar_historico).
+        """
         if not self.cliente_selecionado:
             return
         
@@ -1037,10 +1589,40 @@ class FiadoFacilApp:
         for item in self.tree_historico.get_children():
             self.tree_historico.delete(item)
         
-        # Buscar histórico
-        historico = db.buscar_historico_cliente(self.cliente_selecionado['id'])
+        # Páginas ainda a caminho são do histórico anterior
+        self.executor.cancelar('historico')
+        self.historico_ultima_linha = None
+        self.historico_completo = False
+        self.historico_carregando = False
+        
+        self.carregar_pagina_historico()
+    
+    def carregar_pagina_historico(self):
+        """Pede a próxima página do histórico (inserida no final da lista)."""
+        if not self.cliente_selecionado or self.historico_completo:
+            return
+        
+        self.historico_carregando = True
+        self.executor.executar(
+            db.buscar_historico_pagina,
+            self.cliente_selecionado['id'],
+            antes_de=self.historico_ultima_linha,
+            limite=TAMANHO_PAGINA_HISTORICO,
+            incluir_arquivo=self.incluir_arquivo_morto.get(),
+            chave='historico',
+            ao_concluir=self.inserir_pagina_historico
+        )
+    
+    def inserir_pagina_historico(self, pagina):
+        """Insere uma página do histórico no final da lista."""
+        self.historico_carregando = False
         
-        for item in historico:
+        if len(pagina) < TAMANHO_PAGINA_HISTORICO:
+            self.historico_completo = True
+        if pagina:
+            self.historico_ultima_linha = pagina[-1]
+        
+        for item in pagina:
             tipo = item['tipo']
             descricao = item['descricao'] or '-'
             valor = item['valor']
@@ -1056,14 +1638,21 @@ class FiadoFacilApp:
                 values=(tipo, descricao, f"{sinal}R$ {valor:.2f}", data),
                 tags=(cor,)
             )
+    
+    def ao_rolar_historico(self, primeiro, ultimo):
+        """Atualiza a barra de rolagem e carrega mais linhas perto do fim da lista."""
+        self.scrollbar_historico.set(primeiro, ultimo)
         
-        # Configurar cores
-        self.tree_historico.tag_configure('red', foreground='#e74c3c')
-        self.tree_historico.tag_configure('green', foreground='#27ae60')
+        if float(ultimo) >= 0.9 and not self.historico_completo and not self.historico_carregando:
+            self.carregar_pagina_historico()
     
     def abrir_janela_novo_cliente(self):
         """Abre janela para adicionar novo cliente."""
-        JanelaCliente(self.root, callback_atualizar=self.atualizar_lista_clientes)
+        JanelaCliente(
+            self.root,
+            callback_atualizar=self.atualizar_lista_clientes,
+            executor=self.executor
+        )
     
     def editar_cliente(self):
         """Abre janela para editar cliente."""
@@ -1073,7 +1662,8 @@ class FiadoFacilApp:
         JanelaCliente(
             self.root,
             cliente_id=self.cliente_selecionado['id'],
-            callback_atualizar=self.atualizar_apos_edicao
+            callback_atualizar=self.atualizar_apos_edicao,
+            executor=self.executor
         )
     
     def excluir_cliente(self):
@@ -1088,23 +1678,34 @@ class FiadoFacilApp:
         )
         
         if resposta:
-            db.excluir_cliente(self.cliente_selecionado['id'])
-            messagebox.showinfo("Sucesso", "Cliente excluído com sucesso!")
-            self.cliente_selecionado = None
-            self.atualizar_lista_clientes()
-            
-            # Limpar painel direito
-            for widget in self.frame_direito.winfo_children():
-                widget.destroy()
-            
-            self.label_sem_selecao = tk.Label(
-                self.frame_direito,
-                text="📋 Selecione um cliente para ver os detalhes",
-                font=('Arial', 14),
-                bg='white',
-                fg='#7f8c8d'
+            self.executor.executar(
+                db.excluir_cliente,
+                self.cliente_selecionado['id'],
+                ao_concluir=lambda _: self.cliente_excluido(),
+                ao_falhar=lambda erro: messagebox.showerror(
+                    "Erro", f"Erro ao excluir cliente:\n{str(erro)}"
+                )
             )
-            self.label_sem_selecao.pack(expand=True)
+    
+    def cliente_excluido(self):
+        """Limpa o painel do cliente após a exclusão."""
+        messagebox.showinfo("Sucesso", "Cliente excluído com sucesso!")
+        self.cliente_selecionado = None
+        self.executor.cancelar('cliente')
+        self.atualizar_lista_clientes()
+        
+        # Limpar painel direito
+        for widget in self.frame_direito.winfo_children():
+            widget.destroy()
+        
+        self.label_sem_selecao = tk.Label(
+            self.frame_direito,
+            text="📋 Selecione um cliente para ver os detalhes",
+            font=('Arial', 14),
+            bg='white',
+            fg='#7f8c8d'
+        )
+        self.label_sem_selecao.pack(expand=True)
     
     def abrir_janela_nova_compra(self):
         """Abre janela para registrar nova compra."""
@@ -1115,18 +1716,26 @@ class FiadoFacilApp:
         JanelaNovaTransacao(
             self.root,
             self.cliente_selecionado['id'],
-            callback_atualizar=self.atualizar_detalhes_cliente
+            callback_atualizar=self.atualizar_detalhes_cliente,
+            executor=self.executor
         )
     
+    def abrir_janela_envelhecimento(self):
+        """Abre o relatório de envelhecimento das dívidas."""
+        JanelaEnvelhecimento(self.root, executor=self.executor)
+    
+    def abrir_janela_resumos(self):
+        """Abre o resumo de vendas e recebimentos por dia e por mês."""
+        JanelaResumos(self.root, executor=self.executor)
+    
     def abrir_janela_pagamento(self):
         """Abre janela para registrar pagamento."""
         if not self.cliente_selecionado:
             messagebox.showwarning("Atenção", "Selecione um cliente primeiro.")
             return
         
-        # Verificar se tem dívida
-        saldo = db.calcular_saldo_cliente(self.cliente_selecionado['id'])
-        if saldo <= 0:
+        # Verificar se tem dívida (saldo carregado junto com o cliente)
+        if self.saldo_selecionado <= 0:
             messagebox.showinfo(
                 "Informação",
                 f"{self.cliente_selecionado['nome']} não possui dívidas em aberto."
@@ -1136,17 +1745,15 @@ class FiadoFacilApp:
         JanelaPagamento(
             self.root,
             self.cliente_selecionado['id'],
-            callback_atualizar=self.atualizar_detalhes_cliente
+            callback_atualizar=self.atualizar_detalhes_cliente,
+            executor=self.executor
         )
     
     def atualizar_detalhes_cliente(self):
         """Atualiza os detalhes do cliente após uma ação."""
         if self.cliente_selecionado:
             # Recarregar dados do cliente
-            self.cliente_selecionado = db.buscar_cliente_por_id(
-                self.cliente_selecionado['id']
-            )
-            self.mostrar_detalhes_cliente()
+            self.carregar_cliente(self.cliente_selecionado['id'])
         
         # Atualizar lista também
         self.atualizar_lista_clientes()
@@ -1155,7 +1762,4 @@ class FiadoFacilApp:
         """Atualiza tudo após editar cliente."""
         self.atualizar_lista_clientes()
         if self.cliente_selecionado:
-            self.cliente_selecionado = db.buscar_cliente_por_id(
-                self.cliente_selecionado['id']
-            )
-            self.mostrar_detalhes_cliente()
+            self.carregar_cliente(self.cliente_selecionado['id'])
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+importador.py - Importação de dados do FiadoFácil
+==================================================
+
+Importa clientes, compras fiadas e pagamentos a partir de arquivos CSV
+(por exemplo, a planilha ou o caderno de fiado digitado de uma loja).
+
+O arquivo é lido linha a linha e gravado em uma única transação com as
+operações em lote do database.py, então mesmo arquivos com milhões de
+linhas usam pouca memória e apenas um commit. Linhas inválidas são
+ignoradas e informadas ao final, com o número da linha e o motivo.
+
+Colunas esperadas (primeira linha do arquivo):
+    clientes:   nome, telefone, limite_fiado
+    transacoes: cliente_id, descricao, valor, data
+    pagamentos: cliente_id, valor, observacao, data
+
+As colunas telefone, limite_fiado, observacao e data são opcionais.
+Datas aceitas: AAAA-MM-DD, AAAA-MM-DD HH:MM:SS, DD/MM/AAAA e DD/MM/AAAA HH:MM.
+
+Uso:
+    python importador.py transacoes caderno.csv
+    python importador.py clientes clientes.csv --rejeitados erros.csv
+"""
+
+import argparse
+import csv
+import math
+import sys
+from datetime import datetime
+
+import database as db
+from config import get_lojas
+
+# Quantidade máxima de erros exibidos no terminal
+MAX_ERROS_EXIBIDOS = 20
+
+
+def converter_valor(texto, campo='valor'):
+    """Converte um valor monetário ('1.234,56', '10,5' ou '10.50') para float."""
+    try:
+        valor = float(texto)  # Caminho rápido: '10.50'
+    except (TypeError, ValueError):
+        texto = (texto or '').replace('R$', '').strip()
+        if not texto:
+            raise ValueError(f"{campo} não informado")
+
+        if ',' in texto:
+            texto = texto.replace('.', '').replace(',', '.')
+
+        try:
+            valor = float(texto)
+        except ValueError:
+            raise ValueError(f"{campo} inválido: {texto}")
+
+    if not math.isfinite(valor):
+        raise ValueError(f"{campo} inválido: {texto}")
+    if valor < 0:
+        raise ValueError(f"{campo} não pode ser negativo: {texto}")
+    return valor
+
+
+def converter_data(texto):
+    """Converte a data para o formato do banco (AAAA-MM-DD HH:MM:SS)."""
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+
+    try:
+        data = datetime.fromisoformat(texto)
+        if len(texto) == 19 and texto[10] == ' ':
+            return texto  # Já está no formato do banco
+    except ValueError:
+        for formato in ('%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S'):
+            try:
+                data = datetime.strptime(texto, formato)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"data inválida: {texto}")
+
+    return data.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def converter_cliente_id(texto, clientes_existentes):
+    """Valida o ID do cliente contra os clientes cadastrados."""
+    try:
+        cliente_id = int((texto or '').strip())
+    except ValueError:
+        raise ValueError(f"cliente_id inválido: {texto}")
+
+    if cliente_id not in clientes_existentes:
+        raise ValueError(f"cliente {cliente_id} não cadastrado")
+    return cliente_id
+
+
+def validar_cliente(linha, clientes_existentes):
+    """Valida uma linha de cliente e retorna a tupla para o lote."""
+    nome = (linha.get('nome') or '').strip()
+    if not nome:
+        raise ValueError("nome não informado")
+
+    telefone = (linha.get('telefone') or '').strip()
+    limite = linha.get('limite_fiado')
+    limite = converter_valor(limite, 'limite_fiado') if limite and limite.strip() else None
+
+    return (nome, telefone, limite)
+
+
+def validar_transacao(linha, clientes_existentes):
+    """Valida uma linha de compra fiada e retorna a tupla para o lote."""
+    cliente_id = converter_cliente_id(linha.get('cliente_id'), clientes_existentes)
+
+    descricao = (linha.get('descricao') or '').strip()
+    if not descricao:
+        raise ValueError("descricao não informada")
+
+    valor = converter_valor(linha.get('valor'))
+    if valor == 0:
+        raise ValueError("valor deve ser positivo")
+
+    return (cliente_id, descricao, valor, converter_data(linha.get('data')))
+
+
+def validar_pagamento(linha, clientes_existentes):
+    """Valida uma linha de pagamento e retorna a tupla para o lote."""
+    cliente_id = converter_cliente_id(linha.get('cliente_id'), clientes_existentes)
+
+    valor = converter_valor(linha.get('valor'))
+    if valor == 0:
+        raise ValueError("valor deve ser positivo")
+
+    observacao = (linha.get('observacao') or '').strip()
+
+    return (cliente_id, valor, observacao, converter_data(linha.get('data')))
+
+
+# Tipo de importação -> (validador, função de gravação em lote)
+TIPOS_IMPORTACAO = {
+    'clientes': (validar_cliente, db.adicionar_clientes_lote),
+    'transacoes': (validar_transacao, db.adicionar_transacoes_lote),
+    'pagamentos': (validar_pagamento, db.adicionar_pagamentos_lote),
+}
+
+
+def detectar_delimitador(arquivo):
+    """Detecta se o CSV usa vírgula ou ponto e vírgula (padrão do Excel no Brasil)."""
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=',;\t').delimiter
+    except csv.Error:
+        return ','
+
+
+def importar_csv(tipo, caminho_arquivo, delimitador=None, erros=None):
+    """Importa um arquivo CSV para o banco de dados.
+
+    Args:
+        tipo: 'clientes', 'transacoes' ou 'pagamentos'
+        caminho_arquivo: Caminho do CSV
+        delimitador: Separador de colunas (detectado automaticamente se None)
+        erros: Lista que recebe tuplas (numero_linha, linha, motivo) das
+            linhas rejeitadas
+
+    Returns:
+        Quantidade de linhas importadas
+    """
+    validar, gravar_lote = TIPOS_IMPORTACAO[tipo]
+    if erros is None:
+        erros = []
+
+    # IDs de clientes válidos para compras e pagamentos
+    clientes_existentes = set()
+    if tipo != 'clientes':
+        cursor = db.get_conexao().execute('SELECT id FROM clientes')
+        clientes_existentes = {linha['id'] for linha in cursor}
+
+    with open(caminho_arquivo, 'r', newline='', encoding='utf-8-sig') as f:
+        leitor = csv.DictReader(f, delimiter=delimitador or detectar_delimitador(f))
+        leitor.fieldnames = [(campo or '').strip().lower() for campo in leitor.fieldnames or []]
+
+        def linhas_validas():
+            for linha in leitor:
+                try:
+                    yield validar(linha, clientes_existentes)
+                except ValueError as e:
+                    erros.append((leitor.line_num, linha, str(e)))
+
+        return gravar_lote(linhas_validas())
+
+
+def salvar_rejeitados(caminho_arquivo, erros):
+    """Grava as linhas rejeitadas em CSV, com o motivo em uma coluna extra."""
+    with open(caminho_arquivo, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['linha', 'motivo', 'conteudo'])
+        for numero_linha, linha, motivo in erros:
+            conteudo = ';'.join(str(v) for v in linha.values() if v is not None)
+            writer.writerow([numero_linha, motivo, conteudo])
+
+
+def main():
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Importa clientes, compras fiadas ou pagamentos de um arquivo CSV."
+    )
+    parser.add_argument('tipo', choices=sorted(TIPOS_IMPORTACAO), help="O que será importado")
+    parser.add_argument('arquivo', help="Arquivo CSV de origem")
+    parser.add_argument('--delimitador', help="Separador de colunas (padrão: detectar)")
+    parser.add_argument('--rejeitados', help="Grava as linhas inválidas neste arquivo CSV")
+    parser.add_argument(
+        '--loja', choices=sorted(get_lojas()) or None,
+        help="Loja de destino (padrão: a loja do config.json)"
+    )
+    args = parser.parse_args()
+
+    db.selecionar_loja(args.loja)
+    db.inicializar_banco()
+
+    inicio = datetime.now()
+    erros = []
+
+    try:
+        total = importar_csv(args.tipo, args.arquivo, args.delimitador, erros)
+    except (OSError, db.sqlite3.Error) as e:
+        print(f"[ERRO] Importação cancelada, nada foi gravado: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.fechar_conexoes()
+
+    segundos = (datetime.now() - inicio).total_seconds()
+    print(f"[INFO] {total} linha(s) importada(s) em {segundos:.1f}s.")
+
+    if erros:
+        print(f"[AVISO] {len(erros)} linha(s) rejeitada(s):", file=sys.stderr)
+        for numero_linha, _, motivo in erros[:MAX_ERROS_EXIBIDOS]:
+            print(f"  Linha {numero_linha}: {motivo}", file=sys.stderr)
+        if len(erros) > MAX_ERROS_EXIBIDOS:
+            print(f"  ... e mais {len(erros) - MAX_ERROS_EXIBIDOS}.", file=sys.stderr)
+
+        if args.rejeitados:
+            salvar_rejeitados(args.rejeitados, erros)
+            print(f"[INFO] Linhas rejeitadas salvas em {args.rejeitados}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,40 +25,101 @@ Requisitos:
 
 Uso:
     python main.py
+    python main.py --api    (servidor HTTP/JSON para o PDV, sem janela)
 """
 
-import tkinter as tk
+import argparse
 from datetime import datetime
 import os
 
 # Importar módulos do sistema
 import database as db
-from gui import FiadoFacilApp
 from config import carregar_config
 
-def fazer_backup_automatico():
-    """Realiza backup automático se configurado."""
+def fazer_backup_automatico(em_segundo_plano=False):
+    """Realiza backup automático se configurado.
+    
+    Com em_segundo_plano=True o backup roda em outra thread e a função
+    retorna a thread imediatamente (ou None se o backup está desativado).
+    """
     config = carregar_config()
-    if config.get('backup_automatico', True):
-        backup_file = db.fazer_backup()
-        if backup_file:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Backup automático: {backup_file}")
+    if not config.get('backup_automatico', True):
+        return None
+    
+    if em_segundo_plano:
+        return db.fazer_backup_em_segundo_plano()
+    
+    backup_file = db.fazer_backup()
+    if backup_file:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Backup automático: {backup_file}")
+    return None
+
+def ler_argumentos():
+    """Lê as opções da linha de comando."""
+    parser = argparse.ArgumentParser(description="FiadoFácil - Sistema de Gestão de Crédito")
+    parser.add_argument(
+        '--api', action='store_true',
+        help="Inicia o servidor HTTP/JSON para o PDV em vez da interface gráfica"
+    )
+    parser.add_argument('--host', help="Endereço da API (padrão: config.json)")
+    parser.add_argument('--porta', type=int, help="Porta da API (padrão: config.json)")
+    return parser.parse_args()
 
 def main():
     """Função principal do sistema."""
+    args = ler_argumentos()
+    
     print("=" * 50)
     print("  FiadoFácil - Sistema de Gestão de Crédito")
     print("=" * 50)
     print()
     
-    # Inicializar banco de dados
+    # Inicializar banco de dados (o da loja configurada, se houver)
     print("[INFO] Inicializando banco de dados...")
+    arquivo_db = db.selecionar_loja()
+    if db.LOJA_ATUAL:
+        print(f"[INFO] Loja: {db.LOJA_ATUAL} ({arquivo_db})")
     db.inicializar_banco()
     
-    # Fazer backup automático ao iniciar
+    # Escrita agrupada (group commit), se ativada no config.json
+    if db.iniciar_fila_escrita():
+        print("[INFO] Escrita agrupada ativada.")
+    
+    # Fazer backup automático ao iniciar (sem atrasar a abertura da janela)
     print("[INFO] Verificando backup automático...")
+    thread_backup = fazer_backup_automatico(em_segundo_plano=True)
+    
+    if args.api:
+        executar_api(args.host, args.porta)
+    else:
+        executar_interface()
+    
+    # Fazer backup ao fechar (aguardando o backup de abertura, se ainda estiver rodando)
+    print("\n[INFO] Encerrando sistema...")
+    db.encerrar_fila_escrita()  # Grava as vendas ainda na fila
+    if thread_backup:
+        thread_backup.join()
     fazer_backup_automatico()
     
+    # Fechar conexões com o banco de dados
+    db.fechar_conexoes()
+    print("[INFO] Sistema encerrado com sucesso!")
+
+def executar_api(host, porta):
+    """Atende o PDV pela API HTTP/JSON até Ctrl+C."""
+    from api import iniciar_api
+    
+    print("[INFO] Iniciando API para o PDV...")
+    print("Pressione Ctrl+C para encerrar.")
+    print()
+    iniciar_api(host, porta)
+
+def executar_interface():
+    """Abre a janela principal e espera ela ser fechada."""
+    # Importados aqui para que o modo --api funcione sem tkinter
+    import tkinter as tk
+    from gui import FiadoFacilApp
+    
     # Criar janela principal
     print("[INFO] Iniciando interface gráfica...")
     root = tk.Tk()
@@ -81,10 +142,7 @@ def main():
     # Loop principal
     root.mainloop()
     
-    # Fazer backup ao fechar
-    print("\n[INFO] Encerrando sistema...")
-    fazer_backup_automatico()
-    print("[INFO] Sistema encerrado com sucesso!")
+    app.executor.encerrar()
 
 if __name__ == "__main__":
     main()
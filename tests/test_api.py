@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""API do PDV: valores e requisições inválidos recebem 400, não 500."""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import api
+
+
+class TestLerValor(unittest.TestCase):
+    
+    def assertInvalido(self, valor):
+        with self.assertRaises(api.ErroAPI) as contexto:
+            api.ler_valor({'valor': valor})
+        self.assertEqual(contexto.exception.status, HTTPStatus.BAD_REQUEST)
+    
+    def test_valores_validos(self):
+        self.assertEqual(api.ler_valor({'valor': 12.5}), 12.5)
+        self.assertEqual(api.ler_valor({'valor': '0.285'}), 0.29)
+        self.assertEqual(api.ler_valor({'valor': api.VALOR_MAXIMO}), api.VALOR_MAXIMO)
+    
+    def test_ausente_ou_de_outro_tipo(self):
+        for valor in (None, True, [10], {'reais': 10}):
+            with self.subTest(valor=valor):
+                self.assertInvalido(valor)
+    
+    def test_texto_que_nao_e_numero(self):
+        for valor in ('abc', '', 'nan', 'inf', '1e400'):
+            with self.subTest(valor=valor):
+                self.assertInvalido(valor)
+    
+    def test_zero_e_negativo(self):
+        for valor in (0, '0.001', -5, '-1'):
+            with self.subTest(valor=valor):
+                self.assertInvalido(valor)
+    
+    def test_acima_do_maximo(self):
+        for valor in ('1e18', 1e300, api.VALOR_MAXIMO + 0.01, str(2 ** 63)):
+            with self.subTest(valor=valor):
+                self.assertInvalido(valor)
+
+
+class TestServidorAPI(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        db.selecionar_banco(os.path.join(self.pasta.name, 'teste.db'))
+        db.inicializar_banco()
+        db.adicionar_clientes_lote([('Ana', '', 500)])
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def requisitar(self, *requisicoes):
+        """Envia cada requisição (bytes) em uma conexão nova; devolve [(status, corpo)]."""
+        async def principal():
+            servidor = await api.ServidorAPI(porta=0, conexoes=2).iniciar()
+            parar = asyncio.Event()
+            tarefa = asyncio.create_task(servidor.executar_ate_parar(parar))
+            
+            respostas = []
+            for requisicao in requisicoes:
+                reader, writer = await asyncio.open_connection('127.0.0.1', servidor.porta)
+                writer.write(requisicao)
+                await writer.drain()
+                resposta = await reader.read()
+                writer.close()
+                
+                cabecalho, corpo = resposta.split(b'\r\n\r\n', 1)
+                respostas.append((int(cabecalho.split(b' ')[1]), json.loads(corpo)))
+            
+            parar.set()
+            await tarefa
+            servidor.encerrar()
+            return respostas
+        
+        return asyncio.run(principal())
+    
+    def pagamento(self, corpo, tamanho=None):
+        tamanho = len(corpo) if tamanho is None else tamanho
+        return (
+            f'POST /clientes/1/pagamentos HTTP/1.1\r\n'
+            f'Connection: close\r\nContent-Length: {tamanho}\r\n\r\n'
+        ).encode('latin-1') + corpo
+    
+    def test_valor_enorme_recebe_400(self):
+        (status, corpo), = self.requisitar(self.pagamento(b'{"valor": "1e18"}'))
+        
+        self.assertEqual(status, 400)
+        self.assertIn('máximo', corpo['erro'])
+        self.assertEqual(db.obter_estatisticas()['total_pagamentos'], 0)
+    
+    def test_content_length_invalido_recebe_400(self):
+        respostas = self.requisitar(
+            self.pagamento(b'', 'abc'),
+            self.pagamento(b'', '-5'),
+        )
+        
+        self.assertEqual([status for status, _ in respostas], [400, 400])
+    
+    def test_corpo_grande_demais_recebe_413(self):
+        (status, _), = self.requisitar(self.pagamento(b'', api.TAMANHO_MAXIMO_CORPO + 1))
+        
+        self.assertEqual(status, 413)
+    
+    def test_pagamento_valido(self):
+        (status, corpo), = self.requisitar(self.pagamento(b'{"valor": 10}'))
+        
+        self.assertEqual(status, 201)
+        self.assertEqual(corpo['valor'], 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Arquivo morto: o histórico arquivado mantém todas as colunas e os saldos não mudam."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+class TestArquivamento(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        db.selecionar_banco(os.path.join(self.pasta.name, 'teste.db'))
+        db.inicializar_banco()
+        db.adicionar_clientes_lote([('Ana', '', 500), ('Bruno', '', 500)])
+        
+        # Ana: compra antiga quitada e alterada depois (versão > 0), e uma
+        # compra em aberto, que fica no banco principal
+        db.adicionar_transacoes_lote([
+            (1, 'Arroz', 30, '2020-01-10 10:00:00'),
+            (1, 'Feijão', 20, '2020-02-10 10:00:00'),
+        ])
+        db.adicionar_pagamentos_lote([(1, 30, '', '2020-01-20 10:00:00')])
+        conn = db.get_conexao()
+        with db.transacao_escrita(conn):
+            conn.execute("UPDATE transacoes SET descricao = 'Arroz 5kg' WHERE descricao = 'Arroz'")
+        
+        # Bruno: excluído com uma compra paga pela metade
+        db.adicionar_transacoes_lote([(2, 'Leite', 10, '2020-01-05 10:00:00')])
+        db.adicionar_pagamentos_lote([(2, 4, '', '2020-01-06 10:00:00')])
+        db.excluir_cliente(2)
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def linha_arquivada(self, descricao):
+        cursor = db.get_conexao().execute(
+            f'SELECT * FROM {db.ESQUEMA_ARQUIVO_MORTO}.transacoes WHERE descricao = ?', (descricao,)
+        )
+        return cursor.fetchone()
+    
+    def test_copia_mantem_quitacao_e_versao(self):
+        versao = db.get_conexao().execute(
+            "SELECT versao FROM transacoes WHERE descricao = 'Arroz 5kg'"
+        ).fetchone()[0]
+        self.assertGreater(versao, 0)
+        
+        db.arquivar_historico(idade_dias=30)
+        
+        arroz = self.linha_arquivada('Arroz 5kg')
+        self.assertEqual((arroz['pago'], arroz['valor_pago'], arroz['versao']), (1, 3000, versao))
+        leite = self.linha_arquivada('Leite')
+        self.assertEqual((leite['pago'], leite['valor_pago']), (0, 400))
+    
+    def test_saldos_nao_mudam(self):
+        antes = db.calcular_saldo_cliente(1)
+        devedores = db.obter_estatisticas()['clientes_com_divida']
+        
+        resumo = db.arquivar_historico(idade_dias=30)
+        
+        self.assertEqual(resumo, {'clientes': 1, 'transacoes': 2, 'pagamentos': 2})
+        self.assertEqual(db.calcular_saldo_cliente(1), antes)
+        self.assertEqual(db.obter_estatisticas()['clientes_com_divida'], devedores)
+        feijao = db.get_conexao().execute(
+            "SELECT pago FROM main.transacoes WHERE descricao = 'Feijão'"
+        ).fetchone()
+        self.assertEqual(feijao['pago'], 0)
+    
+    def test_arquivo_morto_antigo_recebe_colunas_novas(self):
+        # Arquivo morto criado antes da quitação FIFO e da versão
+        conn = db.get_conexao()
+        db.anexar_arquivo_morto(conn, criar=True)
+        for tabela in ('clientes', 'transacoes', 'pagamentos'):
+            conn.execute(f'DROP TABLE IF EXISTS {db.ESQUEMA_ARQUIVO_MORTO}.{tabela}')
+            conn.execute(
+                f'CREATE TABLE {db.ESQUEMA_ARQUIVO_MORTO}.{tabela} ({db.TABELAS_EM_CENTAVOS[tabela][0]})'
+            )
+        conn.commit()
+        
+        db.arquivar_historico(idade_dias=30)
+        
+        self.assertEqual(self.linha_arquivada('Leite')['valor_pago'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Cache de leitura: gravações de um cliente não descartam as leituras dos outros."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+class TestInvalidacaoCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        db.selecionar_banco(os.path.join(self.pasta.name, 'teste.db'))
+        db.inicializar_banco()
+        db.adicionar_clientes_lote([('Ana', '', 500), ('Bruno', '', 500)])
+        db.adicionar_transacao(1, 'Arroz', 30)
+        
+        # Leituras do cliente 2, que nenhuma gravação abaixo altera
+        db.buscar_cliente_por_id(2)
+        db.calcular_saldo_cliente(2)
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def assertCacheDoCliente2(self):
+        itens = db._cache_leitura._itens
+        self.assertIn(('cliente', 2), itens)
+        self.assertIn(('saldo', 2), itens)
+    
+    def test_atualizar_cliente_mantem_outros_clientes(self):
+        db.atualizar_cliente(1, 'Ana Maria', '9999', 600)
+        db.buscar_cliente_por_id(1)  # Passa por verificar_alteracoes_externas
+        
+        self.assertCacheDoCliente2()
+        self.assertEqual(db.buscar_cliente_por_id(1)['nome'], 'Ana Maria')
+    
+    def test_pagamento_que_quita_compra_mantem_outros_clientes(self):
+        db.adicionar_pagamento(1, 30)
+        db.calcular_saldo_cliente(1)
+        
+        self.assertCacheDoCliente2()
+        self.assertEqual(db.calcular_saldo_cliente(1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
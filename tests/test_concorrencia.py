@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Gravação concorrente: vários processos gravando no mesmo banco não perdem vendas."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import estresse
+
+# Escala pequena, para a suíte: o suficiente para os processos disputarem o banco
+PROCESSOS = 3
+VENDAS_POR_PROCESSO = 100
+
+
+class TestGravacaoConcorrente(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.arquivo = os.path.join(self.pasta.name, 'estresse.db')
+        estresse.preparar_banco(self.arquivo)
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def test_nenhuma_gravacao_perdida(self):
+        resultados, _ = estresse.executar_processos(self.arquivo, PROCESSOS, VENDAS_POR_PROCESSO)
+        
+        erros = [erro for _, erros_processo, _, _ in resultados for erro in erros_processo]
+        gravadas = sum(resultado[2] for resultado in resultados)
+        pagamentos = sum(resultado[3] for resultado in resultados)
+        
+        # Com o busy_timeout e as novas tentativas, nenhuma gravação falha
+        self.assertEqual(erros, [])
+        self.assertEqual(gravadas, PROCESSOS * VENDAS_POR_PROCESSO)
+        self.assertEqual(
+            pagamentos,
+            PROCESSOS * len(range(0, VENDAS_POR_PROCESSO, estresse.INTERVALO_PAGAMENTO))
+        )
+        
+        # Contagens, somas, saldos e estatísticas conferem com o que foi confirmado
+        db.selecionar_banco(self.arquivo)
+        self.assertEqual(estresse.conferir_banco(gravadas, pagamentos), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Migrações: um banco da primeira versão (valores REAL) chega à última com os dados intactos."""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+# Estrutura criada pela primeira versão do sistema, antes das migrações
+ESQUEMA_ORIGINAL = '''
+    CREATE TABLE clientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        telefone TEXT,
+        limite_fiado REAL DEFAULT 500.00,
+        data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP,
+        ativo INTEGER DEFAULT 1
+    );
+    CREATE TABLE transacoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER NOT NULL,
+        descricao TEXT NOT NULL,
+        valor REAL NOT NULL,
+        data TEXT DEFAULT CURRENT_TIMESTAMP,
+        pago INTEGER DEFAULT 0,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+    );
+    CREATE TABLE pagamentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER NOT NULL,
+        valor REAL NOT NULL,
+        observacao TEXT,
+        data TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+    );
+'''
+
+
+class TestMigracoes(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        arquivo = os.path.join(self.pasta.name, 'antigo.db')
+        
+        conn = sqlite3.connect(arquivo)
+        conn.executescript(ESQUEMA_ORIGINAL)
+        conn.executemany(
+            'INSERT INTO clientes (nome, telefone, limite_fiado, ativo) VALUES (?, ?, ?, ?)',
+            [('Ana', '1111', 300.5, 1), ('Bruno', '', 500.0, 1), ('Carla', '', 150.0, 0)]
+        )
+        conn.executemany(
+            'INSERT INTO transacoes (cliente_id, descricao, valor, data) VALUES (?, ?, ?, ?)',
+            [
+                (1, 'Arroz', 19.99, '2023-01-10 10:00:00'),
+                (1, 'Feijão', 0.1, '2023-02-10 10:00:00'),
+                (1, 'Café', 12.5, '2023-03-10 10:00:00'),
+                (2, 'Leite', 7.35, '2023-01-15 10:00:00'),
+                (3, 'Pão', 4.2, '2023-01-20 10:00:00'),
+            ]
+        )
+        conn.executemany(
+            'INSERT INTO pagamentos (cliente_id, valor, observacao, data) VALUES (?, ?, ?, ?)',
+            [(1, 20.09, '', '2023-04-01 10:00:00'), (2, 2.35, '', '2023-02-01 10:00:00')]
+        )
+        # Linha apagada: o próximo ID do AUTOINCREMENT não pode voltar
+        conn.execute("INSERT INTO transacoes (cliente_id, descricao, valor) VALUES (2, 'Erro', 1)")
+        conn.execute("DELETE FROM transacoes WHERE descricao = 'Erro'")
+        conn.commit()
+        conn.close()
+        
+        db.selecionar_banco(arquivo)
+        db.inicializar_banco()
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def test_todas_as_migracoes_aplicadas(self):
+        versao = db.get_conexao().execute('PRAGMA user_version').fetchone()[0]
+        self.assertEqual(versao, len(db.MIGRACOES))
+        
+        # Abrir de novo não reaplica nada
+        db.fechar_conexoes()
+        db.inicializar_banco()
+        self.assertEqual(db.get_conexao().execute('PRAGMA user_version').fetchone()[0], versao)
+    
+    def test_valores_em_centavos(self):
+        conn = db.get_conexao()
+        
+        valores = conn.execute('SELECT typeof(valor), valor FROM transacoes ORDER BY id').fetchall()
+        self.assertEqual([tuple(linha) for linha in valores], [
+            ('integer', 1999), ('integer', 10), ('integer', 1250), ('integer', 735), ('integer', 420)
+        ])
+        pagamentos = conn.execute('SELECT valor FROM pagamentos ORDER BY id').fetchall()
+        self.assertEqual([linha[0] for linha in pagamentos], [2009, 235])
+        self.assertEqual(db.buscar_cliente_por_id(1)['limite_fiado'], 300.5)
+    
+    def test_saldos_e_estatisticas(self):
+        self.assertEqual(db.calcular_saldo_cliente(1), 12.5)
+        self.assertEqual(db.calcular_saldo_cliente(2), 5.0)
+        self.assertEqual(db.verificar_estatisticas(), {})
+    
+    def test_quitacao_fifo_do_historico(self):
+        cursor = db.get_conexao().execute(
+            'SELECT descricao, pago, valor_pago FROM transacoes WHERE cliente_id = 1 ORDER BY data'
+        )
+        self.assertEqual([tuple(linha) for linha in cursor], [
+            ('Arroz', 1, 1999), ('Feijão', 1, 10), ('Café', 0, 0)
+        ])
+    
+    def test_resumos_do_historico(self):
+        janeiro, = db.buscar_resumo_mensal('2023-01', '2023-01')
+        self.assertEqual(janeiro['vendido'], 31.54)
+        self.assertEqual(janeiro['compras'], 3)
+    
+    def test_autoincrement_preservado(self):
+        transacao_id = db.adicionar_transacao(2, 'Nova', 1)
+        self.assertEqual(transacao_id, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
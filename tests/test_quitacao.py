@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Quitação FIFO: os pagamentos quitam as compras mais antigas primeiro."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+class TestQuitacaoRetroativa(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        db.selecionar_banco(os.path.join(self.pasta.name, 'teste.db'))
+        db.inicializar_banco()
+        db.adicionar_clientes_lote([('Ana', '', 500), ('Bruno', '', 500)])
+        
+        # Compra de janeiro já quitada pelo pagamento de fevereiro
+        db.adicionar_transacoes_lote([(1, 'Janeiro', 10, '2024-01-10 10:00:00')])
+        db.adicionar_pagamentos_lote([(1, 10, '', '2024-02-10 10:00:00')])
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def quitacoes(self, cliente_id):
+        """{descricao: (pago, valor_pago em reais)} das compras do cliente."""
+        cursor = db.get_conexao().execute(
+            'SELECT descricao, pago, valor_pago FROM transacoes WHERE cliente_id = ?',
+            (cliente_id,)
+        )
+        return {linha['descricao']: (linha['pago'], db.para_reais(linha['valor_pago'])) for linha in cursor}
+    
+    def test_compra_retroativa_em_lote_refaz_fifo(self):
+        db.adicionar_transacoes_lote([(1, 'Dezembro', 10, '2023-12-10 10:00:00')])
+        
+        self.assertEqual(self.quitacoes(1), {'Dezembro': (1, 10.0), 'Janeiro': (0, 0.0)})
+    
+    def test_compra_retroativa_no_envelhecimento(self):
+        db.adicionar_transacoes_lote([(1, 'Dezembro', 10, '2023-12-10 10:00:00')])
+        
+        # Em aberto fica a compra de janeiro: 65 dias em 15/03
+        linha, = db.buscar_envelhecimento_dividas('2024-03-15')
+        self.assertEqual(linha['dias_60'], 10.0)
+        self.assertEqual(linha['dias_90'], 0.0)
+    
+    def test_lote_retroativo_igual_a_reconstrucao(self):
+        db.adicionar_transacoes_lote([
+            (1, 'Dezembro', 4, '2023-12-10 10:00:00'),
+            (2, 'Bruno', 7, '2023-11-01 10:00:00'),
+        ])
+        db.adicionar_pagamentos_lote([(2, 5, '', '2023-10-01 10:00:00')])
+        antes = {cliente_id: self.quitacoes(cliente_id) for cliente_id in (1, 2)}
+        
+        db.reconstruir_quitacoes()
+        
+        self.assertEqual({cliente_id: self.quitacoes(cliente_id) for cliente_id in (1, 2)}, antes)
+        self.assertEqual(antes[1]['Janeiro'], (0, 6.0))
+        self.assertEqual(antes[2]['Bruno'], (0, 5.0))
+    
+    def test_lote_sem_data_usa_credito_restante(self):
+        db.adicionar_pagamentos_lote([(1, 3, '', None)])
+        db.adicionar_transacoes_lote([(1, 'Hoje', 5, None)])
+        
+        self.assertEqual(self.quitacoes(1)['Hoje'], (0, 3.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Relatórios: envelhecimento das dívidas, resumos diário/mensal e exportação incremental."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+class TestRelatorios(unittest.TestCase):
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        db.selecionar_banco(os.path.join(self.pasta.name, 'teste.db'))
+        db.inicializar_banco()
+        db.adicionar_clientes_lote([('Ana', '', 1000), ('Bruno', '', 1000), ('Carla', '', 1000)])
+    
+    def tearDown(self):
+        db.fechar_conexoes()
+        db.limpar_cache()
+        self.pasta.cleanup()
+    
+    def exportar(self, **opcoes):
+        """Exporta para um arquivo JSON Lines; devolve a lista de objetos."""
+        caminho = os.path.join(self.pasta.name, 'exportacao.jsonl')
+        db.exportar_alteracoes(caminho, 'jsonl', **opcoes)
+        with open(caminho, encoding='utf-8') as arquivo:
+            return [json.loads(linha) for linha in arquivo]
+
+
+class TestEnvelhecimento(TestRelatorios):
+    
+    def test_faixas_pela_idade_de_cada_compra(self):
+        # Referência 2024-06-30: 10, 40, 70 e 100 dias antes
+        db.adicionar_transacoes_lote([
+            (1, 'Atual', 1, '2024-06-20 10:00:00'),
+            (1, '30', 2, '2024-05-21 10:00:00'),
+            (1, '60', 4, '2024-04-21 10:00:00'),
+            (1, '90', 8, '2024-03-22 10:00:00'),
+        ])
+        
+        linha, = db.buscar_envelhecimento_dividas('2024-06-30')
+        
+        self.assertEqual(
+            (linha['atual'], linha['dias_30'], linha['dias_60'], linha['dias_90'], linha['total']),
+            (1.0, 2.0, 4.0, 8.0, 15.0)
+        )
+        self.assertEqual(linha['dias_mais_antiga'], 100)
+    
+    def test_limites_das_faixas(self):
+        # Exatamente 29, 30, 59, 60, 89 e 90 dias antes de 2024-06-30
+        db.adicionar_transacoes_lote([
+            (1, '29', 1, '2024-06-01 00:00:00'),
+            (1, '30', 10, '2024-05-31 00:00:00'),
+            (1, '59', 100, '2024-05-02 00:00:00'),
+            (1, '60', 1000, '2024-05-01 00:00:00'),
+            (2, '89', 1, '2024-04-02 00:00:00'),
+            (2, '90', 10, '2024-04-01 00:00:00'),
+        ])
+        
+        ana, bruno = sorted(db.buscar_envelhecimento_dividas('2024-06-30', ordem='nome'), key=lambda l: l['nome'])
+        
+        self.assertEqual((ana['atual'], ana['dias_30'], ana['dias_60']), (1.0, 110.0, 1000.0))
+        self.assertEqual((bruno['dias_60'], bruno['dias_90']), (1.0, 10.0))
+    
+    def test_pagamento_quita_as_mais_antigas(self):
+        db.adicionar_transacoes_lote([
+            (1, 'Antiga', 10, '2024-03-01 10:00:00'),
+            (1, 'Recente', 10, '2024-06-20 10:00:00'),
+        ])
+        db.adicionar_pagamento(1, 15)
+        
+        linha, = db.buscar_envelhecimento_dividas('2024-06-30')
+        
+        self.assertEqual((linha['atual'], linha['dias_90'], linha['total']), (5.0, 0.0, 5.0))
+    
+    def test_clientes_sem_divida_nao_aparecem(self):
+        db.adicionar_transacao(1, 'Quitada', 10)
+        db.adicionar_pagamento(1, 10)
+        
+        self.assertEqual(db.buscar_envelhecimento_dividas(), [])
+
+
+class TestResumos(TestRelatorios):
+    
+    def conteudo_resumos(self):
+        conn = db.get_conexao()
+        return (
+            [tuple(linha) for linha in conn.execute('SELECT * FROM resumo_diario ORDER BY dia')],
+            [tuple(linha) for linha in conn.execute('SELECT * FROM resumo_mensal ORDER BY mes')],
+        )
+    
+    def test_gatilhos_iguais_a_reconstrucao(self):
+        db.adicionar_transacao(1, 'Hoje', 10)
+        db.adicionar_pagamento(1, 4)
+        db.adicionar_transacao(2, 'Hoje', 5)
+        db.adicionar_pagamento(2, 5)
+        db.adicionar_transacao(3, 'Hoje', 7)
+        incremental = self.conteudo_resumos()
+        
+        db.reconstruir_resumos()
+        
+        self.assertEqual(self.conteudo_resumos(), incremental)
+    
+    def test_periodos_com_a_receber_e_devedores(self):
+        db.adicionar_transacoes_lote([
+            (1, 'Jan', 10, '2024-01-10 10:00:00'),
+            (2, 'Jan', 20, '2024-01-15 10:00:00'),
+            (1, 'Fev', 5, '2024-02-05 10:00:00'),
+        ])
+        db.adicionar_pagamentos_lote([(2, 20, '', '2024-02-10 10:00:00')])
+        
+        janeiro, fevereiro = db.buscar_resumo_mensal('2024-01', '2024-02')
+        
+        self.assertEqual((janeiro['vendido'], janeiro['a_receber'], janeiro['devedores']), (30.0, 30.0, 2))
+        self.assertEqual(
+            (fevereiro['vendido'], fevereiro['recebido'], fevereiro['a_receber'], fevereiro['devedores']),
+            (5.0, 20.0, 15.0, 1)
+        )
+    
+    def test_cliente_excluido_deixa_de_ser_devedor(self):
+        db.adicionar_transacao(1, 'Hoje', 10)
+        db.adicionar_transacao(2, 'Hoje', 10)
+        db.excluir_cliente(2)
+        
+        hoje, = db.buscar_resumo_diario()
+        
+        self.assertEqual(hoje['devedores'], db.obter_estatisticas()['clientes_com_divida'])
+        self.assertEqual(hoje['devedores'], 1)
+
+
+class TestExportacaoIncremental(TestRelatorios):
+    
+    def test_primeira_exportacao_completa(self):
+        db.adicionar_transacao(1, 'Arroz', 10)
+        
+        linhas = self.exportar()
+        
+        self.assertEqual(
+            sorted((linha['tabela'], linha['operacao']) for linha in linhas),
+            [('clientes', 'novo')] * 3 + [('transacoes', 'novo')]
+        )
+    
+    def test_seguinte_so_com_novos_e_alterados(self):
+        db.adicionar_transacao(1, 'Arroz', 10)
+        self.exportar()
+        
+        db.atualizar_cliente(2, 'Bruno Silva', '9999', 1000)
+        db.adicionar_pagamento(1, 10)  # Quita a compra: ela volta como alterada
+        linhas = self.exportar()
+        
+        self.assertEqual(
+            sorted((linha['tabela'], linha['operacao'], linha['id']) for linha in linhas),
+            [('clientes', 'alterado', 2), ('pagamentos', 'novo', 1), ('transacoes', 'alterado', 1)]
+        )
+        compra = next(linha for linha in linhas if linha['tabela'] == 'transacoes')
+        self.assertEqual((compra['pago'], compra['valor_pago']), (1, 10.0))
+    
+    def test_sem_movimento_exporta_nada(self):
+        db.adicionar_transacao(1, 'Arroz', 10)
+        self.exportar()
+        
+        self.assertEqual(self.exportar(), [])
+        self.assertEqual(len(self.exportar(completo=True)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()